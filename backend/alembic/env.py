@@ -6,7 +6,15 @@ from alembic import context
 
 from app.core.config import settings
 from app.db.base import Base  # noqa: F401
-from app.models import Bot, Configuracao, LogExecucao, Regra, Agendamento, User  # noqa: F401
+from app.models import (  # noqa: F401
+    Agendamento,
+    Bot,
+    Configuracao,
+    LogExecucao,
+    LogRollup,
+    Regra,
+    User,
+)
 
 # Alembic Config object
 config = context.config
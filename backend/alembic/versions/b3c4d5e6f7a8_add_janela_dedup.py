@@ -0,0 +1,29 @@
+"""add_janela_dedup
+
+Revision ID: b3c4d5e6f7a8
+Revises: a2b3c4d5e6f7
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3c4d5e6f7a8'
+down_revision: Union[str, None] = 'a2b3c4d5e6f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Janela de deduplicação por regra (NULL = padrão global)
+    with op.batch_alter_table('regra', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('janela_dedup', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('regra', schema=None) as batch_op:
+        batch_op.drop_column('janela_dedup')
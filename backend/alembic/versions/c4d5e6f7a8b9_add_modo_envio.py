@@ -0,0 +1,31 @@
+"""add_modo_envio
+
+Revision ID: c4d5e6f7a8b9
+Revises: b3c4d5e6f7a8
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d5e6f7a8b9'
+down_revision: Union[str, None] = 'b3c4d5e6f7a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Modo de entrega por regra (envio | encaminhar | copiar)
+    with op.batch_alter_table('regra', schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column('modo_envio', sa.String(length=20), nullable=False, server_default='envio')
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('regra', schema=None) as batch_op:
+        batch_op.drop_column('modo_envio')
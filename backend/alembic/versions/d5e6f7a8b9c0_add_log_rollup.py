@@ -0,0 +1,48 @@
+"""add_log_rollup
+
+Revision ID: d5e6f7a8b9c0
+Revises: c4d5e6f7a8b9
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e6f7a8b9c0'
+down_revision: Union[str, None] = 'c4d5e6f7a8b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Regra que gerou o log (dimensão dos rollups; NULL em logs antigos)
+    with op.batch_alter_table('logexecucao', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('regra_id', sa.Integer(), nullable=True))
+
+    # Contagens pré-agregadas por bot/regra/destino e hora/dia
+    op.create_table('logrollup',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('bot_id', sa.Integer(), nullable=False),
+    sa.Column('regra_id', sa.Integer(), nullable=False),
+    sa.Column('destino', sa.String(length=255), nullable=False),
+    sa.Column('granularidade', sa.String(length=4), nullable=False),
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    sa.Column('sucesso', sa.Integer(), nullable=False),
+    sa.Column('erro', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['bot_id'], ['bot.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('bot_id', 'granularidade', 'bucket', 'regra_id', 'destino', name='uq_logrollup_chave')
+    )
+
+    # Logs já existentes entram nos rollups pela compactação
+    # (python -m app.workers.rollup)
+
+
+def downgrade() -> None:
+    op.drop_table('logrollup')
+    with op.batch_alter_table('logexecucao', schema=None) as batch_op:
+        batch_op.drop_column('regra_id')
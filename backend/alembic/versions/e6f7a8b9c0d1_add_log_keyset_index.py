@@ -0,0 +1,28 @@
+"""add_log_keyset_index
+
+Revision ID: e6f7a8b9c0d1
+Revises: d5e6f7a8b9c0
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6f7a8b9c0d1'
+down_revision: Union[str, None] = 'd5e6f7a8b9c0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Paginação dos logs por cursor (data_hora, id) dentro do bot
+    with op.batch_alter_table('logexecucao', schema=None) as batch_op:
+        batch_op.create_index('ix_logexecucao_bot_data_hora_id', ['bot_id', 'data_hora', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('logexecucao', schema=None) as batch_op:
+        batch_op.drop_index('ix_logexecucao_bot_data_hora_id')
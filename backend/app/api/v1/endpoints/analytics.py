@@ -1,14 +1,19 @@
 """Endpoints de logs e analytics."""
 
-from fastapi import APIRouter, Depends, Query
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user
+from app.core.exceptions import BadRequestException, NotFoundException
 from app.db.session import get_db
 from app.models.user import User
-from app.schemas.log import LogResponse
+from app.schemas.log import LogResponse, SerieResponse
+from app.services.analytics_service import AnalyticsService
 from app.services.bot_service import BotService
-from app.services.log_service import LogService
+from app.services.log_service import FORMATOS_EXPORT, LogService
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
@@ -16,16 +21,67 @@ router = APIRouter(prefix="/analytics", tags=["Analytics"])
 @router.get("/logs/{bot_id}", response_model=list[LogResponse])
 async def get_logs_by_bot(
     bot_id: int,
+    response: Response,
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Retorna logs de execução de um bot (paginado)."""
+    """Retorna logs de execução de um bot (paginado).
+
+    Paginação por cursor: o header X-Next-Cursor traz o valor a passar em
+    `cursor` para a próxima página (ausente na última). `offset` continua
+    aceito, mas fica lento em páginas profundas.
+    """
     bot = BotService.get_by_id(db, bot_id, current_user.id)
     if not bot:
         return []
-    return LogService.get_by_bot(db, bot_id, limit=limit, offset=offset)
+    if offset and not cursor:
+        return LogService.get_by_bot(db, bot_id, limit=limit, offset=offset)
+    try:
+        logs, proximo = LogService.get_page_by_bot(
+            db, bot_id, limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise BadRequestException(detail=str(e))
+    if proximo:
+        response.headers["X-Next-Cursor"] = proximo
+    return logs
+
+
+@router.get("/logs/{bot_id}/export")
+async def export_logs(
+    bot_id: int,
+    formato: str = Query(default="ndjson"),
+    inicio: datetime | None = Query(default=None),
+    fim: datetime | None = Query(default=None),
+    gzip: bool = Query(default=False),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Exporta os logs do bot no intervalo (NDJSON ou CSV, em streaming)."""
+    bot = BotService.get_by_id(db, bot_id, current_user.id)
+    if not bot:
+        raise NotFoundException("Bot")
+    try:
+        chunks = LogService.exportar(
+            db.get_bind(),
+            bot_id,
+            formato=formato,
+            inicio=inicio,
+            fim=fim,
+            compactar=gzip,
+        )
+    except ValueError as e:
+        raise BadRequestException(detail=str(e))
+
+    arquivo = f"logs_bot{bot_id}.{formato}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        chunks,
+        media_type="application/gzip" if gzip else FORMATOS_EXPORT[formato],
+        headers={"Content-Disposition": f'attachment; filename="{arquivo}"'},
+    )
 
 
 @router.get("/logs/recent", response_model=list[LogResponse])
@@ -38,6 +94,35 @@ async def get_recent_logs(
     return LogService.get_recent(db, limit=limit)
 
 
+@router.get("/series/{bot_id}", response_model=SerieResponse)
+async def get_series(
+    bot_id: int,
+    granularidade: str = Query(default="hora"),
+    inicio: datetime | None = Query(default=None),
+    fim: datetime | None = Query(default=None),
+    regra_id: int | None = Query(default=None),
+    destino: str | None = Query(default=None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Série temporal de sucesso/erro do bot (por hora ou dia), lida dos rollups."""
+    bot = BotService.get_by_id(db, bot_id, current_user.id)
+    if not bot:
+        raise NotFoundException("Bot")
+    try:
+        return AnalyticsService.serie(
+            db,
+            bot_id,
+            granularidade=granularidade,
+            inicio=inicio,
+            fim=fim,
+            regra_id=regra_id,
+            destino=destino,
+        )
+    except ValueError as e:
+        raise BadRequestException(detail=str(e))
+
+
 @router.get("/dashboard")
 async def dashboard_stats(
     db: Session = Depends(get_db),
@@ -1,19 +1,37 @@
 """Endpoints de CRUD de Regras."""
 
-from fastapi import APIRouter, Depends
+from anyio import from_thread
+from fastapi import APIRouter, Depends, File, Query, UploadFile
 from sqlalchemy.orm import Session
 from starlette import status
+from starlette.concurrency import run_in_threadpool
 
 from app.api.deps import get_current_user
-from app.core.exceptions import NotFoundException
+from app.core.config import settings
+from app.core.exceptions import BadRequestException, NotFoundException
 from app.db.session import get_db
 from app.models.user import User
-from app.schemas.rule import RuleCreate, RuleResponse, RuleUpdate
+from app.schemas.rule import (
+    ReplayMensagem,
+    ReplayRequest,
+    ReplayResponse,
+    RuleCreate,
+    RuleResponse,
+    RuleUpdate,
+)
 from app.services.bot_service import BotService
+from app.services.replay_service import ReplayService, avaliar_plano
+from app.services.rule_engine import RuleSet
 from app.services.rule_service import RuleService
+from app.workers.regex_sandbox import RegexSandbox, RegexTimeoutError
 
 router = APIRouter(prefix="/rules", tags=["Regras"])
 
+# Regex do usuário no replay: processos separados com orçamento de tempo, como
+# no worker (uma regex patológica não trava uma thread da API). Encerrado no
+# shutdown da aplicação
+sandbox_replay = RegexSandbox()
+
 
 def _verify_bot_ownership(db: Session, bot_id: int, user: User):
     bot = BotService.get_by_id(db, bot_id, user.id)
@@ -49,6 +67,86 @@ async def list_rules(
     return RuleService.get_all_by_bot(db, bot_id)
 
 
+def _avaliar_no_sandbox(plano, texto, normalizado, encontradas):
+    """Chamado na thread do replay: delega a regra ao sandbox no event loop."""
+    try:
+        return from_thread.run(
+            sandbox_replay.executar,
+            avaliar_plano,
+            plano,
+            texto,
+            normalizado,
+            encontradas,
+        )
+    except RegexTimeoutError:
+        return "regex_timeout", None
+
+
+async def _executar_replay(
+    regras: RuleSet, mensagens: list[ReplayMensagem]
+) -> ReplayResponse:
+    try:
+        # CPU-bound: roda fora do event loop da API
+        return await run_in_threadpool(
+            ReplayService.executar, regras, mensagens, _avaliar_no_sandbox
+        )
+    except ValueError as e:
+        raise BadRequestException(detail=str(e))
+
+
+def _compilar_replay(
+    db: Session, bot_id: int, regra_ids: list[int] | None, incluir_inativas: bool
+) -> RuleSet:
+    return ReplayService.compilar(
+        ReplayService.carregar_regras(db, bot_id, regra_ids, incluir_inativas)
+    )
+
+
+@router.post("/bot/{bot_id}/replay", response_model=ReplayResponse)
+async def replay_rules(
+    bot_id: int,
+    data: ReplayRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Dry-run: avalia as regras do bot sobre mensagens enviadas ou do histórico."""
+    _verify_bot_ownership(db, bot_id, current_user)
+    regras = _compilar_replay(db, bot_id, data.regra_ids, data.incluir_inativas)
+    if data.fonte == "logs":
+        try:
+            ReplayService.verificar_fonte_logs(regras)
+        except ValueError as e:
+            raise BadRequestException(detail=str(e))
+        mensagens = ReplayService.mensagens_dos_logs(db, bot_id, data.limite_logs)
+    else:
+        mensagens = data.mensagens
+    return await _executar_replay(regras, mensagens)
+
+
+@router.post("/bot/{bot_id}/replay/upload", response_model=ReplayResponse)
+async def replay_rules_upload(
+    bot_id: int,
+    arquivo: UploadFile = File(...),
+    regra_ids: list[int] | None = Query(default=None),
+    incluir_inativas: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Dry-run sobre um arquivo (.json, export do Telegram, .jsonl ou .txt)."""
+    _verify_bot_ownership(db, bot_id, current_user)
+    conteudo = await arquivo.read(settings.REPLAY_MAX_BYTES + 1)
+    if len(conteudo) > settings.REPLAY_MAX_BYTES:
+        raise BadRequestException(
+            detail=f"Arquivo maior que {settings.REPLAY_MAX_BYTES} bytes"
+        )
+    try:
+        mensagens = ReplayService.ler_arquivo(arquivo.filename, conteudo)
+    except ValueError as e:
+        raise BadRequestException(detail=str(e))
+    regras = _compilar_replay(db, bot_id, regra_ids, incluir_inativas)
+    return await _executar_replay(regras, mensagens)
+
+
 @router.get("/{rule_id}/bot/{bot_id}", response_model=RuleResponse)
 async def get_rule(
     rule_id: int,
@@ -69,7 +167,10 @@ async def create_rule(
 ):
     """Cria uma nova regra para um bot."""
     _verify_bot_ownership(db, data.bot_id, current_user)
-    return RuleService.create(db, data)
+    try:
+        return RuleService.create(db, data)
+    except ValueError as e:
+        raise BadRequestException(detail=str(e))
 
 
 @router.patch("/{rule_id}/bot/{bot_id}", response_model=RuleResponse)
@@ -83,7 +184,10 @@ async def update_rule(
     """Atualiza campos de uma regra (partial update)."""
     _verify_bot_ownership(db, bot_id, current_user)
     regra = _get_rule_or_404(db, rule_id, bot_id)
-    return RuleService.update(db, regra, data)
+    try:
+        return RuleService.update(db, regra, data)
+    except ValueError as e:
+        raise BadRequestException(detail=str(e))
 
 
 @router.patch("/{rule_id}/bot/{bot_id}/toggle", response_model=RuleResponse)
@@ -28,5 +28,70 @@ class Settings(BaseSettings):
     # Timezone
     TIMEZONE: str = "America/Sao_Paulo"
 
+    # Regras — regex de filtro/somente_se_tiver (proteção contra ReDoS)
+    REGEX_MAX_LENGTH: int = 300
+    REGEX_TIMEOUT_MS: int = 250
+    REGEX_SANDBOX_WORKERS: int = 2
+
+    # Deduplicação antes da fila de envio (janela padrão das regras)
+    DEDUP_JANELA_SEGUNDOS: int = 300
+    DEDUP_MAX_ENTRADAS: int = 10000
+
+    # Limites de envio (token bucket): por chat de destino e por conta
+    SEND_LIMITE_DESTINO_POR_MINUTO: float = 20
+    SEND_RAJADA_DESTINO: int = 3
+    SEND_LIMITE_GLOBAL_POR_MINUTO: float = 30
+    SEND_RAJADA_GLOBAL: int = 5
+    # Workers de envio por bot (destinos diferentes em paralelo)
+    SEND_WORKERS: int = 4
+    # Fila de envio limitada: capacidade por bot (0 = sem limite) e política
+    # quando cheia (drop-oldest | drop-newest | coalesce | block)
+    SEND_FILA_CAPACIDADE: int = 5000
+    SEND_FILA_POLITICA: str = "drop-oldest"
+    SEND_FILA_BLOQUEIO_MAX_SEGUNDOS: float = 30
+    # Pesos do round-robin entre as classes agendado,encaminhado,reenvio e
+    # espera (s) a partir da qual um item concorre como a classe mais alta
+    SEND_PESOS_PRIORIDADE: str = "6,3,1"
+    SEND_ENVELHECIMENTO_SEGUNDOS: float = 60
+    # Reenvios após falha transitória (rede/servidor), com backoff exponencial
+    SEND_MAX_TENTATIVAS: int = 3
+    SEND_REENVIO_ESPERA_SEGUNDOS: float = 5
+    METRICAS_INTERVALO_SEGUNDOS: int = 60
+    # Máximo de medidores por destino (latência) mantidos por bot
+    METRICAS_MAX_ROTULOS: int = 200
+    # FloodWait em 2+ destinos dentro desta janela = limite da conta inteira
+    FLOOD_JANELA_CONTA_SEGUNDOS: int = 30
+
+    # Outbox durável da fila de envio (SQLite/WAL, arquivo próprio)
+    OUTBOX_ATIVO: bool = False
+    OUTBOX_PATH: str = "./data/outbox.db"
+    OUTBOX_LOTE: int = 200
+    OUTBOX_FLUSH_MS: int = 200
+
+    # Logs de execução dos workers: gravados em lote (INSERT único) a cada
+    # LOG_LOTE registros ou LOG_FLUSH_MS; buffer limitado a LOG_MAX_PENDENTES
+    LOG_LOTE: int = 200
+    LOG_FLUSH_MS: int = 500
+    LOG_MAX_PENDENTES: int = 10000
+    # Retenção dos logs de execução: dias por plano ("plano:dias", 0 = manter
+    # para sempre) e padrão dos planos não listados. O manager apaga em lotes
+    # de LOG_RETENCAO_LOTE a cada LOG_RETENCAO_INTERVALO_MINUTOS e devolve até
+    # LOG_RETENCAO_VACUUM_PAGINAS páginas livres ao disco (incremental vacuum)
+    LOG_RETENCAO_DIAS: str = "free:30,pro:90"
+    LOG_RETENCAO_PADRAO_DIAS: int = 30
+    LOG_RETENCAO_LOTE: int = 1000
+    LOG_RETENCAO_PAUSA_MS: int = 50
+    LOG_RETENCAO_INTERVALO_MINUTOS: int = 60
+    LOG_RETENCAO_VACUUM_PAGINAS: int = 2000
+    # Exportação de logs (NDJSON/CSV em streaming): linhas por chunk enviado
+    LOG_EXPORT_LOTE: int = 1000
+
+    # Replay (dry-run) de regras: máximo de mensagens por requisição e
+    # tamanho máximo do arquivo enviado
+    REPLAY_MAX_MENSAGENS: int = 5000
+    REPLAY_MAX_BYTES: int = 5_000_000
+    # Orçamento de tempo das regras com regex em um replay
+    REPLAY_TEMPO_MAX_SEGUNDOS: float = 30
+
 
 settings = Settings()
@@ -1,6 +1,6 @@
 from collections.abc import Generator
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.config import settings
@@ -11,6 +11,15 @@ engine = create_engine(
     echo=False,
 )
 
+if engine.dialect.name == "sqlite":
+
+    @event.listens_for(engine, "connect")
+    def _auto_vacuum_incremental(dbapi_connection, _connection_record):
+        # Só vale para bancos novos (antes da primeira tabela): permite à
+        # retenção de logs devolver espaço ao disco com incremental vacuum
+        dbapi_connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
 
@@ -6,6 +6,7 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.api.v1.endpoints.rules import sandbox_replay
 from app.api.v1.router import router as api_v1_router
 from app.core.config import settings
 from app.core.exception_handlers import register_exception_handlers
@@ -30,6 +31,7 @@ async def lifespan(app: FastAPI):
     yield
     # Shutdown
     logger.info("👋 ConektaBots API encerrando...")
+    sandbox_replay.fechar()
 
 
 app = FastAPI(
@@ -48,6 +50,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cursor da próxima página de logs (paginação por keyset)
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Exception handlers globais
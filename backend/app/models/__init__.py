@@ -1,8 +1,17 @@
 from app.models.bot import Bot
 from app.models.configuracao import Configuracao
 from app.models.log import LogExecucao
+from app.models.log_rollup import LogRollup
 from app.models.rule import Regra
 from app.models.schedule import Agendamento
 from app.models.user import User
 
-__all__ = ["Bot", "Configuracao", "LogExecucao", "Regra", "Agendamento", "User"]
+__all__ = [
+    "Bot",
+    "Configuracao",
+    "LogExecucao",
+    "LogRollup",
+    "Regra",
+    "Agendamento",
+    "User",
+]
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
@@ -8,12 +8,17 @@ from app.db.base import Base
 
 class LogExecucao(Base):
     __tablename__ = "logexecucao"
+    __table_args__ = (
+        # Paginação por keyset: (bot_id, data_hora, id) DESC sem ordenar
+        Index("ix_logexecucao_bot_data_hora_id", "bot_id", "data_hora", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     bot_id: Mapped[int] = mapped_column(Integer, ForeignKey("bot.id"))
     bot_nome: Mapped[str] = mapped_column(String(100))
     origem: Mapped[str] = mapped_column(String(255))
     destino: Mapped[str] = mapped_column(String(255))
+    regra_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
     status: Mapped[str] = mapped_column(String(20))
     mensagem: Mapped[str] = mapped_column(Text)
     data_hora: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
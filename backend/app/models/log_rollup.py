@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class LogRollup(Base):
+    """Contagem de envios por bot/regra/destino em um bucket de hora ou dia.
+
+    Mantida junto com a gravação dos logs (AnalyticsService.acumular); os
+    gráficos leem daqui em vez de agregar a logexecucao inteira.
+    """
+
+    __tablename__ = "logrollup"
+    __table_args__ = (
+        UniqueConstraint(
+            "bot_id",
+            "granularidade",
+            "bucket",
+            "regra_id",
+            "destino",
+            name="uq_logrollup_chave",
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    bot_id: Mapped[int] = mapped_column(Integer, ForeignKey("bot.id"))
+    # 0 = sem regra (agendamentos, erros do bot); NULL quebraria o UNIQUE
+    regra_id: Mapped[int] = mapped_column(Integer, default=0)
+    destino: Mapped[str] = mapped_column(String(255))
+    granularidade: Mapped[str] = mapped_column(String(4))  # "hora" | "dia"
+    bucket: Mapped[datetime] = mapped_column(DateTime)
+    sucesso: Mapped[int] = mapped_column(Integer, default=0)
+    erro: Mapped[int] = mapped_column(Integer, default=0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, ForeignKey, String, Text
+from sqlalchemy import Boolean, ForeignKey, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -20,6 +20,13 @@ class Regra(Base):
 
     ativo: Mapped[bool] = mapped_column(Boolean, default=True)
     converter_shopee: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Janela de deduplicação em segundos (None = padrão global, 0 = desligada)
+    janela_dedup: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Entrega: "envio" (send_file/send_message), "encaminhar" (forward nativo)
+    # ou "copiar" (forward sem autor); os dois últimos só sem texto reescrito
+    modo_envio: Mapped[str] = mapped_column(
+        String(20), default="envio", server_default="envio"
+    )
 
     # Foreign key
     bot_id: Mapped[int] = mapped_column(ForeignKey("bot.id"))
@@ -14,3 +14,19 @@ class LogResponse(BaseModel):
     status: str
     mensagem: str
     data_hora: datetime
+
+
+class SeriePonto(BaseModel):
+    bucket: datetime
+    sucesso: int
+    erro: int
+
+
+class SerieResponse(BaseModel):
+    bot_id: int
+    granularidade: str
+    inicio: datetime
+    fim: datetime
+    total_sucesso: int
+    total_erro: int
+    pontos: list[SeriePonto]
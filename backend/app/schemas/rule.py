@@ -1,5 +1,11 @@
+from typing import Literal
+
 from pydantic import BaseModel, ConfigDict, Field
 
+# envio = send_file/send_message; encaminhar/copiar = forward nativo (sem
+# reupload), usado quando o texto não foi reescrito
+ModoEnvio = Literal["envio", "encaminhar", "copiar"]
+
 
 class RuleCreate(BaseModel):
     nome: str = Field(min_length=1, max_length=100)
@@ -11,6 +17,8 @@ class RuleCreate(BaseModel):
     bloqueios: str | None = None
     somente_se_tiver: str | None = None
     converter_shopee: bool = False
+    janela_dedup: int | None = Field(default=None, ge=0, le=86400)
+    modo_envio: ModoEnvio = "envio"
 
 
 class RuleUpdate(BaseModel):
@@ -23,6 +31,8 @@ class RuleUpdate(BaseModel):
     bloqueios: str | None = None
     somente_se_tiver: str | None = None
     converter_shopee: bool | None = None
+    janela_dedup: int | None = Field(default=None, ge=0, le=86400)
+    modo_envio: ModoEnvio | None = None
 
 
 class RuleResponse(BaseModel):
@@ -38,4 +48,56 @@ class RuleResponse(BaseModel):
     bloqueios: str | None = None
     somente_se_tiver: str | None = None
     converter_shopee: bool = False
+    janela_dedup: int | None = None
+    modo_envio: str = "envio"
     ativo: bool
+
+
+# ── Replay (dry-run) ─────────────────────────────────────
+
+
+class ReplayMensagem(BaseModel):
+    texto: str
+    # Chat de origem; sem ele a mensagem passa por todas as regras do bot
+    origem: str | None = None
+
+
+class ReplayRequest(BaseModel):
+    fonte: Literal["mensagens", "logs"] = "mensagens"
+    mensagens: list[ReplayMensagem] = Field(default_factory=list)
+    # fonte="logs": quantos envios recentes (status "sucesso") reavaliar
+    # (até REPLAY_MAX_MENSAGENS)
+    limite_logs: int = Field(default=500, ge=1)
+    regra_ids: list[int] | None = None
+    incluir_inativas: bool = False
+
+
+class ReplayResultadoRegra(BaseModel):
+    regra_id: int
+    regra_nome: str
+    resultado: Literal["encaminhada", "reescrita", "descartada"]
+    # "bloqueio", "sem_palavra_obrigatoria", "filtro", "regex_timeout" ou
+    # "tempo_esgotado" quando descartada
+    motivo: str | None = None
+    texto_final: str | None = None
+
+
+class ReplayResultadoMensagem(BaseModel):
+    indice: int
+    origem: str | None = None
+    texto: str
+    regras: list[ReplayResultadoRegra]
+
+
+class ReplayResumo(BaseModel):
+    mensagens: int
+    regras: int
+    encaminhadas: int
+    reescritas: int
+    descartadas: dict[str, int]
+    duracao_ms: float
+
+
+class ReplayResponse(BaseModel):
+    resumo: ReplayResumo
+    resultados: list[ReplayResultadoMensagem]
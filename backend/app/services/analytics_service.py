@@ -0,0 +1,210 @@
+"""Rollups de analytics: contagens de sucesso/erro por bot, regra, destino e
+hora/dia (tabela logrollup).
+
+Os rollups são atualizados na mesma transação em que os logs são gravados
+(LogService.create/create_many → AnalyticsService.acumular), então as séries
+do dashboard leem poucas linhas por bucket em vez de agregar a logexecucao
+inteira. `recompactar` reconstrói os rollups a partir dos logs (carga
+inicial de logs antigos ou correção após apagar logs).
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.log import LogExecucao
+from app.models.log_rollup import LogRollup
+
+# Granularidade → (passo entre buckets, formato strftime do bucket no SQLite)
+GRANULARIDADES = {
+    "hora": (timedelta(hours=1), "%Y-%m-%d %H:00:00"),
+    "dia": (timedelta(days=1), "%Y-%m-%d 00:00:00"),
+}
+
+# Máximo de buckets por série (ex.: ~41 dias por hora, ~2,7 anos por dia)
+MAX_PONTOS = 1000
+
+
+def truncar(data_hora: datetime, granularidade: str) -> datetime:
+    """Início do bucket que contém `data_hora`."""
+    bucket = data_hora.replace(minute=0, second=0, microsecond=0)
+    if granularidade == "dia":
+        bucket = bucket.replace(hour=0)
+    return bucket
+
+
+class AnalyticsService:
+    """Service para os rollups e séries temporais de analytics."""
+
+    @staticmethod
+    def acumular(db: Session, registros: list[dict]) -> None:
+        """Soma os logs aos rollups de hora e dia (sem commit).
+
+        Agrega em memória e faz um upsert por chave, não por log: um lote de
+        centenas de envios para poucos destinos vira poucas linhas.
+        """
+        contagens: dict[tuple, list[int]] = defaultdict(lambda: [0, 0])
+        for registro in registros:
+            data_hora = registro.get("data_hora") or datetime.now()
+            indice = 0 if registro["status"] == "sucesso" else 1
+            for granularidade in GRANULARIDADES:
+                chave = (
+                    registro["bot_id"],
+                    registro.get("regra_id") or 0,
+                    registro["destino"],
+                    granularidade,
+                    truncar(data_hora, granularidade),
+                )
+                contagens[chave][indice] += 1
+        if not contagens:
+            return
+
+        stmt = sqlite_insert(LogRollup)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["bot_id", "granularidade", "bucket", "regra_id", "destino"],
+            set_={
+                "sucesso": LogRollup.sucesso + stmt.excluded.sucesso,
+                "erro": LogRollup.erro + stmt.excluded.erro,
+            },
+        )
+        db.execute(
+            stmt,
+            [
+                {
+                    "bot_id": bot_id,
+                    "regra_id": regra_id,
+                    "destino": destino,
+                    "granularidade": granularidade,
+                    "bucket": bucket,
+                    "sucesso": sucesso,
+                    "erro": erro,
+                }
+                for (bot_id, regra_id, destino, granularidade, bucket), (
+                    sucesso,
+                    erro,
+                ) in contagens.items()
+            ],
+        )
+
+    @staticmethod
+    def recompactar(
+        db: Session, bot_id: int | None = None, desde: datetime | None = None
+    ) -> int:
+        """Reconstrói os rollups a partir da logexecucao.
+
+        Apaga e reagrega os buckets do bot (ou de todos) a partir do dia de
+        `desde` (ou tudo). Retorna o número de linhas de rollup gravadas.
+        Logs já apagados pela retenção somem dos buckets reconstruídos: use
+        `desde` dentro do período retido.
+        """
+        inicio = truncar(desde, "dia") if desde else None
+
+        apagar = delete(LogRollup)
+        if bot_id is not None:
+            apagar = apagar.where(LogRollup.bot_id == bot_id)
+        if inicio is not None:
+            apagar = apagar.where(LogRollup.bucket >= inicio)
+        db.execute(apagar)
+
+        sucesso = func.sum(case((LogExecucao.status == "sucesso", 1), else_=0))
+        erro = func.sum(case((LogExecucao.status == "sucesso", 0), else_=1))
+        regra_id = func.coalesce(LogExecucao.regra_id, 0)
+        total = 0
+        for granularidade, (_passo, formato) in GRANULARIDADES.items():
+            bucket = func.strftime(formato, LogExecucao.data_hora)
+            stmt = select(
+                LogExecucao.bot_id, regra_id, LogExecucao.destino, bucket, sucesso, erro
+            ).group_by(LogExecucao.bot_id, regra_id, LogExecucao.destino, bucket)
+            if bot_id is not None:
+                stmt = stmt.where(LogExecucao.bot_id == bot_id)
+            if inicio is not None:
+                stmt = stmt.where(LogExecucao.data_hora >= inicio)
+            linhas = [
+                {
+                    "bot_id": linha[0],
+                    "regra_id": linha[1],
+                    "destino": linha[2],
+                    "granularidade": granularidade,
+                    "bucket": datetime.fromisoformat(linha[3]),
+                    "sucesso": linha[4],
+                    "erro": linha[5],
+                }
+                for linha in db.execute(stmt)
+            ]
+            if linhas:
+                db.execute(insert(LogRollup), linhas)
+            total += len(linhas)
+        db.commit()
+        return total
+
+    @staticmethod
+    def serie(
+        db: Session,
+        bot_id: int,
+        granularidade: str = "hora",
+        inicio: datetime | None = None,
+        fim: datetime | None = None,
+        regra_id: int | None = None,
+        destino: str | None = None,
+    ) -> dict:
+        """Série de sucesso/erro por bucket em [inicio, fim), com zeros nos
+        buckets sem envio.
+
+        Padrão: últimas 24h (hora) ou últimos 30 dias (dia).
+        """
+        if granularidade not in GRANULARIDADES:
+            raise ValueError(
+                f"Granularidade inválida: {granularidade!r} (use 'hora' ou 'dia')"
+            )
+        passo, _formato = GRANULARIDADES[granularidade]
+        fim = fim or datetime.now()
+        inicio = inicio or fim - (
+            timedelta(hours=24) if granularidade == "hora" else timedelta(days=30)
+        )
+        if inicio >= fim:
+            raise ValueError("O início do intervalo deve ser anterior ao fim")
+        primeiro = truncar(inicio, granularidade)
+        if (fim - primeiro) / passo > MAX_PONTOS:
+            raise ValueError(
+                f"Intervalo grande demais: máximo de {MAX_PONTOS} pontos por série"
+            )
+
+        # Range scan no índice único (bot_id, granularidade, bucket, ...)
+        stmt = (
+            select(
+                LogRollup.bucket,
+                func.sum(LogRollup.sucesso),
+                func.sum(LogRollup.erro),
+            )
+            .where(
+                LogRollup.bot_id == bot_id,
+                LogRollup.granularidade == granularidade,
+                LogRollup.bucket >= primeiro,
+                LogRollup.bucket < fim,
+            )
+            .group_by(LogRollup.bucket)
+        )
+        if regra_id is not None:
+            stmt = stmt.where(LogRollup.regra_id == regra_id)
+        if destino is not None:
+            stmt = stmt.where(LogRollup.destino == destino)
+        contagens = {bucket: (s, e) for bucket, s, e in db.execute(stmt)}
+
+        pontos = []
+        bucket = primeiro
+        while bucket < fim:
+            sucesso, erro = contagens.get(bucket, (0, 0))
+            pontos.append({"bucket": bucket, "sucesso": sucesso, "erro": erro})
+            bucket += passo
+        return {
+            "bot_id": bot_id,
+            "granularidade": granularidade,
+            "inicio": primeiro,
+            "fim": fim,
+            "total_sucesso": sum(p["sucesso"] for p in pontos),
+            "total_erro": sum(p["erro"] for p in pontos),
+            "pontos": pontos,
+        }
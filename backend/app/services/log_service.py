@@ -1,7 +1,34 @@
-from sqlalchemy import select
+import base64
+import binascii
+import csv
+import io
+import json
+import zlib
+from collections.abc import Iterator
+from datetime import datetime
+
+from sqlalchemy import and_, insert, or_, select
+from sqlalchemy.engine import Connection, Engine
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.models.log import LogExecucao
+from app.services.analytics_service import AnalyticsService
+
+# Colunas da exportação (na ordem do CSV)
+COLUNAS_EXPORT = (
+    "id",
+    "bot_id",
+    "bot_nome",
+    "regra_id",
+    "origem",
+    "destino",
+    "status",
+    "mensagem",
+    "data_hora",
+)
+
+FORMATOS_EXPORT = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
 
 
 class LogService:
@@ -14,12 +41,60 @@ class LogService:
         stmt = (
             select(LogExecucao)
             .where(LogExecucao.bot_id == bot_id)
-            .order_by(LogExecucao.data_hora.desc())
+            .order_by(LogExecucao.data_hora.desc(), LogExecucao.id.desc())
             .limit(limit)
             .offset(offset)
         )
         return list(db.execute(stmt).scalars().all())
 
+    @staticmethod
+    def codificar_cursor(log: LogExecucao) -> str:
+        """Cursor opaco apontando para depois de `log` na ordem (data_hora, id) DESC."""
+        chave = f"{log.data_hora.isoformat()}|{log.id}"
+        return base64.urlsafe_b64encode(chave.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decodificar_cursor(cursor: str) -> tuple[datetime, int]:
+        try:
+            chave = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            data_hora, _, log_id = chave.decode().partition("|")
+            return datetime.fromisoformat(data_hora), int(log_id)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise ValueError("Cursor inválido") from None
+
+    @staticmethod
+    def get_page_by_bot(
+        db: Session, bot_id: int, limit: int = 50, cursor: str | None = None
+    ) -> tuple[list[LogExecucao], str | None]:
+        """Página de logs do bot por keyset em (data_hora, id), do mais novo
+        para o mais antigo.
+
+        Custo constante em qualquer profundidade (range scan no índice
+        ix_logexecucao_bot_data_hora_id, sem OFFSET) e estável com logs novos
+        chegando. Retorna os logs e o cursor da próxima página (None no fim).
+        """
+        stmt = (
+            select(LogExecucao)
+            .where(LogExecucao.bot_id == bot_id)
+            .order_by(LogExecucao.data_hora.desc(), LogExecucao.id.desc())
+            .limit(limit + 1)
+        )
+        if cursor:
+            data_hora, log_id = LogService.decodificar_cursor(cursor)
+            # `data_hora <= x` delimita o range no índice; o OR desempata
+            stmt = stmt.where(
+                LogExecucao.data_hora <= data_hora,
+                or_(
+                    LogExecucao.data_hora < data_hora,
+                    and_(LogExecucao.data_hora == data_hora, LogExecucao.id < log_id),
+                ),
+            )
+        logs = list(db.execute(stmt).scalars().all())
+        if len(logs) <= limit:
+            return logs, None
+        del logs[limit:]
+        return logs, LogService.codificar_cursor(logs[-1])
+
     @staticmethod
     def get_recent(db: Session, limit: int = 20) -> list[LogExecucao]:
         stmt = (
@@ -38,6 +113,7 @@ class LogService:
         destino: str,
         status: str,
         mensagem: str,
+        regra_id: int | None = None,
     ) -> LogExecucao:
         log = LogExecucao(
             bot_id=bot_id,
@@ -46,8 +122,124 @@ class LogService:
             destino=destino,
             status=status,
             mensagem=mensagem,
+            regra_id=regra_id,
         )
         db.add(log)
+        db.flush()
+        AnalyticsService.acumular(
+            db,
+            [
+                {
+                    "bot_id": bot_id,
+                    "regra_id": regra_id,
+                    "destino": destino,
+                    "status": status,
+                    "data_hora": log.data_hora,
+                }
+            ],
+        )
         db.commit()
         db.refresh(log)
         return log
+
+    @staticmethod
+    def create_many(db: Session, registros: list[dict]) -> int:
+        """Insere vários logs em um único INSERT executemany + um commit.
+
+        Cada registro tem os campos de `create` (e opcionalmente `data_hora`).
+        Os rollups de analytics são atualizados na mesma transação.
+        """
+        if not registros:
+            return 0
+        db.execute(insert(LogExecucao), registros)
+        AnalyticsService.acumular(db, registros)
+        db.commit()
+        return len(registros)
+
+    @staticmethod
+    def exportar(
+        bind: Engine | Connection,
+        bot_id: int,
+        formato: str = "ndjson",
+        inicio: datetime | None = None,
+        fim: datetime | None = None,
+        compactar: bool = False,
+    ) -> Iterator[bytes]:
+        """Logs do bot em [inicio, fim), do mais antigo ao mais novo, como
+        chunks de NDJSON ou CSV (opcionalmente gzip).
+
+        Valida os parâmetros na hora (ValueError) e devolve um gerador que lê
+        LOG_EXPORT_LOTE linhas por chunk, por keyset em (data_hora, id) no
+        índice ix_logexecucao_bot_data_hora_id: memória constante, sem ORM
+        nem Pydantic por linha. Cada chunk é lido numa sessão própria em
+        `bind`, fechada antes do yield — o streaming continua depois que a
+        sessão da requisição fecha e, com o journal padrão do SQLite (sem
+        WAL), um download lento não segura o lock de leitura que faria os
+        INSERTs de logs falharem com "database is locked".
+        """
+        if formato not in FORMATOS_EXPORT:
+            raise ValueError(f"Formato inválido: {formato!r} (use 'ndjson' ou 'csv')")
+        if inicio and fim and inicio >= fim:
+            raise ValueError("O início do intervalo deve ser anterior ao fim")
+
+        colunas = [getattr(LogExecucao, coluna) for coluna in COLUNAS_EXPORT]
+        stmt = (
+            select(*colunas)
+            .where(LogExecucao.bot_id == bot_id)
+            .order_by(LogExecucao.data_hora, LogExecucao.id)
+        )
+        if inicio is not None:
+            stmt = stmt.where(LogExecucao.data_hora >= inicio)
+        if fim is not None:
+            stmt = stmt.where(LogExecucao.data_hora < fim)
+        lote = settings.LOG_EXPORT_LOTE
+        return LogService._gerar_export(bind, stmt, formato, compactar, lote)
+
+    @staticmethod
+    def _gerar_export(bind, stmt, formato: str, compactar: bool, lote: int):
+        gzip = zlib.compressobj(wbits=31) if compactar else None
+
+        def _saida(dados: bytes) -> bytes:
+            return gzip.compress(dados) if gzip else dados
+
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer, lineterminator="\n")
+        if formato == "csv":
+            escritor.writerow(COLUNAS_EXPORT)
+
+        pagina = stmt.limit(lote)
+        while True:
+            # Transação curta por chunk: a sessão fecha (e solta o lock de
+            # leitura) antes de o chunk sair para o cliente
+            with Session(bind=bind) as db:
+                linhas = db.execute(pagina).all()
+            for linha in linhas:
+                valores = (*linha[:-1], linha.data_hora.isoformat())
+                if formato == "csv":
+                    escritor.writerow(valores)
+                else:
+                    registro = dict(zip(COLUNAS_EXPORT, valores, strict=True))
+                    buffer.write(json.dumps(registro, ensure_ascii=False))
+                    buffer.write("\n")
+            chunk = _saida(buffer.getvalue().encode())
+            buffer.seek(0)
+            buffer.truncate()
+            if chunk:
+                yield chunk
+            if len(linhas) < lote:
+                break
+            # Próximo chunk continua depois do último (data_hora, id) lido
+            data_hora, log_id = linhas[-1].data_hora, linhas[-1].id
+            pagina = stmt.limit(lote).where(
+                LogExecucao.data_hora >= data_hora,
+                or_(
+                    LogExecucao.data_hora > data_hora,
+                    and_(LogExecucao.data_hora == data_hora, LogExecucao.id > log_id),
+                ),
+            )
+        # Cabeçalho do CSV de um export vazio + fim do gzip
+        final = _saida(buffer.getvalue().encode())
+        if gzip:
+            final += gzip.flush()
+        if final:
+            yield final
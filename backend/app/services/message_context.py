@@ -0,0 +1,92 @@
+"""MessageContext: visões derivadas de um update, calculadas uma vez por mensagem.
+
+Todas as regras que avaliam o mesmo update (e a conversão Shopee) leem daqui,
+em vez de cada uma remontar o texto, refazer o casefold ou re-escanear URLs.
+Cada visão é calculada só quando alguém pede por ela.
+"""
+
+import re
+from functools import cached_property
+
+from app.services.shopee_service import SHOPEE_URL_REGEX
+
+URL_REGEX = re.compile(r"https?://[^\s<>\"')\]]+", re.IGNORECASE)
+HASHTAG_REGEX = re.compile(r"#\w+")
+
+
+class MessageContext:
+    """Texto, casefold, URLs, links Shopee, hashtags e mídia de um update."""
+
+    def __init__(self, message=None, texto: str | None = None):
+        self.message = message
+        if texto is not None:
+            self.__dict__["texto"] = texto
+        # Conversões Shopee já feitas neste update: texto → texto convertido
+        self.conversoes_shopee: dict[str, str] = {}
+
+    @classmethod
+    def de_texto(cls, texto: str) -> "MessageContext":
+        """Contexto sem mensagem Telethon (replay, testes)."""
+        return cls(texto=texto)
+
+    @cached_property
+    def texto(self) -> str:
+        """Mensagem + caption (mídia pode ter caption em vez de text)."""
+        if self.message is None:
+            return ""
+        text_part = self.message.text or ""
+        caption_part = getattr(self.message, "caption", None) or ""
+        if caption_part:
+            return f"{text_part} {caption_part}".strip()
+        return text_part
+
+    @cached_property
+    def texto_normalizado(self) -> str:
+        """casefold: case-insensitive robusto (Unicode)."""
+        return self.texto.casefold()
+
+    @cached_property
+    def urls(self) -> list[str]:
+        return URL_REGEX.findall(self.texto)
+
+    @cached_property
+    def shopee_urls(self) -> list[str]:
+        if "shopee" not in self.texto_normalizado:
+            return []
+        return SHOPEE_URL_REGEX.findall(self.texto)
+
+    @cached_property
+    def hashtags(self) -> list[str]:
+        if "#" not in self.texto:
+            return []
+        return HASHTAG_REGEX.findall(self.texto)
+
+    @cached_property
+    def media_id(self) -> int | None:
+        """Id da foto/documento (igual em reposts da mesma mídia) ou None."""
+        if self.message is None or not getattr(self.message, "media", None):
+            return None
+        for atributo in ("photo", "document"):
+            objeto = getattr(self.message, atributo, None)
+            if objeto is not None and getattr(objeto, "id", None) is not None:
+                return objeto.id
+        return None
+
+    @cached_property
+    def tipo_midia(self) -> str | None:
+        """'foto', 'video', 'audio', 'documento', 'link', outro tipo ou None."""
+        if self.message is None or not getattr(self.message, "media", None):
+            return None
+        for atributo, tipo in (
+            ("photo", "foto"),
+            ("video", "video"),
+            ("gif", "gif"),
+            ("sticker", "sticker"),
+            ("voice", "voz"),
+            ("audio", "audio"),
+            ("web_preview", "link"),
+            ("document", "documento"),
+        ):
+            if getattr(self.message, atributo, None):
+                return tipo
+        return type(self.message.media).__name__
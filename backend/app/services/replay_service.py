@@ -0,0 +1,274 @@
+"""Replay (dry-run) das regras de um bot sobre um lote de mensagens.
+
+Usa o mesmo motor compilado do worker (RulePlan/RuleSet + MessageContext):
+as regras são compiladas uma vez por requisição e cada mensagem passa uma
+única vez pelo autômato de palavras-chave. Nada é enviado e a conversão
+Shopee não é chamada.
+
+Regras com regex do usuário são avaliadas por `avaliar_regex` (na API, o
+RegexSandbox com orçamento de tempo), como no worker.
+"""
+
+import json
+import time
+from collections import Counter
+from collections.abc import Callable
+from pathlib import PurePath
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.log import LogExecucao
+from app.models.rule import Regra
+from app.schemas.rule import (
+    ReplayMensagem,
+    ReplayResponse,
+    ReplayResultadoMensagem,
+    ReplayResultadoRegra,
+    ReplayResumo,
+)
+from app.services.message_context import MessageContext
+from app.services.rule_engine import RulePlan, RuleSet
+
+
+def _texto_export_telegram(texto) -> str:
+    """Campo 'text' do export do Telegram Desktop: str ou lista de entidades."""
+    if isinstance(texto, str):
+        return texto
+    if isinstance(texto, list):
+        return "".join(
+            p if isinstance(p, str) else str(p.get("text", "")) for p in texto
+        )
+    return ""
+
+
+def _item_para_mensagem(item) -> ReplayMensagem | None:
+    if isinstance(item, str):
+        return ReplayMensagem(texto=item) if item.strip() else None
+    if not isinstance(item, dict):
+        return None
+    texto = item.get("texto")
+    if texto is None:
+        texto = _texto_export_telegram(item.get("text"))
+    if not texto:
+        return None
+    origem = item.get("origem")
+    return ReplayMensagem(texto=texto, origem=str(origem) if origem else None)
+
+
+def avaliar_plano(
+    plano: RulePlan, texto: str, normalizado: str, encontradas: set[str]
+) -> tuple[str | None, str | None]:
+    """(motivo do descarte, texto final) de uma regra para uma mensagem.
+
+    Função de módulo para poder ser executada no sandbox de regex.
+    """
+    motivo = plano.motivo_descarte(texto, normalizado, encontradas)
+    if motivo is not None:
+        return motivo, None
+    return None, plano.substituir(texto)
+
+
+class ReplayService:
+    """Service para avaliar regras sem enviar nada (ajuste de filtros)."""
+
+    @staticmethod
+    def compilar(regras: list[Regra]) -> RuleSet:
+        """RuleSet indexado pelas origens como texto (sem resolver no Telegram)."""
+        planos: list[RulePlan] = []
+        por_origem: dict[str, list[RulePlan]] = {}
+        for regra in regras:
+            origens = [o.strip() for o in (regra.origem or "").split(",") if o.strip()]
+            plano = RulePlan.from_regra(regra, origens, regra.destino)
+            planos.append(plano)
+            for origem in origens:
+                por_origem.setdefault(origem, []).append(plano)
+        return RuleSet(planos, por_origem)
+
+    @staticmethod
+    def carregar_regras(
+        db: Session,
+        bot_id: int,
+        regra_ids: list[int] | None = None,
+        incluir_inativas: bool = False,
+    ) -> list[Regra]:
+        stmt = select(Regra).where(Regra.bot_id == bot_id).order_by(Regra.id)
+        if not incluir_inativas:
+            stmt = stmt.where(Regra.ativo.is_(True))
+        if regra_ids:
+            stmt = stmt.where(Regra.id.in_(regra_ids))
+        return list(db.execute(stmt).scalars().all())
+
+    @staticmethod
+    def verificar_fonte_logs(regras: RuleSet) -> None:
+        """Replay pelos logs só casa origens numéricas.
+
+        O log guarda o chat_id numérico da origem, não o '@canal' escrito na
+        regra, então regras com origem por username nunca receberiam as
+        mensagens do histórico.
+
+        Raises:
+            ValueError: se alguma regra tiver origem que não é um chat_id.
+        """
+        nomes = [
+            plano.nome
+            for plano in regras.planos
+            if any(not origem.lstrip("-").isdigit() for origem in plano.origens)
+        ]
+        if nomes:
+            raise ValueError(
+                "Replay pelos logs não suporta regras com origem por username "
+                f"(use o chat_id numérico ou envie as mensagens): {', '.join(nomes)}"
+            )
+
+    @staticmethod
+    def mensagens_dos_logs(
+        db: Session, bot_id: int, limite: int
+    ) -> list[ReplayMensagem]:
+        """Mensagens enviadas com sucesso.
+
+        Limitação: o log guarda o texto já reescrito pela regra e truncado em
+        200 caracteres, não a mensagem original.
+        """
+        limite = min(limite, settings.REPLAY_MAX_MENSAGENS)
+        stmt = (
+            select(LogExecucao.mensagem, LogExecucao.origem)
+            .where(LogExecucao.bot_id == bot_id, LogExecucao.status == "sucesso")
+            .order_by(LogExecucao.data_hora.desc())
+            .limit(limite)
+        )
+        return [
+            ReplayMensagem(texto=mensagem, origem=origem)
+            for mensagem, origem in db.execute(stmt).all()
+            if mensagem
+        ]
+
+    @staticmethod
+    def ler_arquivo(nome: str, conteudo: bytes) -> list[ReplayMensagem]:
+        """Lê mensagens de um arquivo enviado.
+
+        Formatos: .json (lista de textos/objetos ou export do Telegram Desktop
+        com a chave "messages"), .jsonl/.ndjson (um objeto ou texto por linha)
+        e texto puro (uma mensagem por linha).
+
+        Raises:
+            ValueError: se o arquivo não puder ser lido.
+        """
+        try:
+            texto = conteudo.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise ValueError("Arquivo deve estar em UTF-8") from None
+
+        extensao = PurePath(nome or "").suffix.lower()
+        try:
+            if extensao == ".json":
+                dados = json.loads(texto)
+                if isinstance(dados, dict):
+                    dados = dados.get("messages", [])
+                if not isinstance(dados, list):
+                    raise ValueError("JSON deve ser uma lista de mensagens")
+                itens = dados
+            elif extensao in (".jsonl", ".ndjson"):
+                itens = [
+                    json.loads(linha) for linha in texto.splitlines() if linha.strip()
+                ]
+            else:
+                itens = texto.splitlines()
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON inválido: {e}") from None
+
+        return [m for m in map(_item_para_mensagem, itens) if m is not None]
+
+    @staticmethod
+    def executar(
+        regras: RuleSet,
+        mensagens: list[ReplayMensagem],
+        avaliar_regex: Callable | None = None,
+    ) -> ReplayResponse:
+        """Avalia todas as mensagens contra o RuleSet.
+
+        `avaliar_regex(plano, texto, normalizado, encontradas)` substitui
+        `avaliar_plano` nas regras com regex do usuário (None = inline).
+        Como no worker, uma regra que estoura o tempo fica suspensa: as
+        mensagens seguintes saem como "regex_timeout" sem rodar a regex de
+        novo. Passado REPLAY_TEMPO_MAX_SEGUNDOS, as regras com regex deixam
+        de ser avaliadas ("tempo_esgotado").
+
+        Raises:
+            ValueError: se o lote passar de REPLAY_MAX_MENSAGENS.
+        """
+        if len(mensagens) > settings.REPLAY_MAX_MENSAGENS:
+            raise ValueError(
+                f"Máximo de {settings.REPLAY_MAX_MENSAGENS} mensagens por replay "
+                f"({len(mensagens)} enviadas)"
+            )
+
+        inicio = time.perf_counter()
+        prazo = inicio + settings.REPLAY_TEMPO_MAX_SEGUNDOS
+        suspensas: set[int] = set()
+        resultados: list[ReplayResultadoMensagem] = []
+        contagem: Counter[str] = Counter()
+        descartes: Counter[str] = Counter()
+        for indice, mensagem in enumerate(mensagens):
+            if mensagem.origem is None:
+                planos = regras.planos
+            else:
+                planos = regras.por_origem.get(mensagem.origem, [])
+
+            contexto = MessageContext.de_texto(mensagem.texto)
+            texto = contexto.texto
+            normalizado = contexto.texto_normalizado
+            encontradas = regras.buscar_palavras(normalizado) if planos else set()
+
+            por_regra: list[ReplayResultadoRegra] = []
+            for plano in planos:
+                if not plano.usa_regex:
+                    motivo, final = avaliar_plano(
+                        plano, texto, normalizado, encontradas
+                    )
+                elif id(plano) in suspensas:
+                    motivo, final = "regex_timeout", None
+                elif time.perf_counter() > prazo:
+                    motivo, final = "tempo_esgotado", None
+                else:
+                    motivo, final = (avaliar_regex or avaliar_plano)(
+                        plano, texto, normalizado, encontradas
+                    )
+                    if motivo == "regex_timeout":
+                        suspensas.add(id(plano))
+                if motivo is not None:
+                    descartes[motivo] += 1
+                    resultado = "descartada"
+                else:
+                    resultado = "reescrita" if final != texto else "encaminhada"
+                contagem[resultado] += 1
+                por_regra.append(
+                    ReplayResultadoRegra(
+                        regra_id=plano.id,
+                        regra_nome=plano.nome,
+                        resultado=resultado,
+                        motivo=motivo,
+                        texto_final=final,
+                    )
+                )
+            resultados.append(
+                ReplayResultadoMensagem(
+                    indice=indice,
+                    origem=mensagem.origem,
+                    texto=texto,
+                    regras=por_regra,
+                )
+            )
+
+        return ReplayResponse(
+            resumo=ReplayResumo(
+                mensagens=len(mensagens),
+                regras=len(regras.planos),
+                encaminhadas=contagem["encaminhada"],
+                reescritas=contagem["reescrita"],
+                descartadas=dict(descartes),
+                duracao_ms=round((time.perf_counter() - inicio) * 1000, 2),
+            ),
+            resultados=resultados,
+        )
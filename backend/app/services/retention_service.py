@@ -0,0 +1,132 @@
+"""Retenção dos logs de execução (logexecucao) por plano do dono do bot.
+
+Logs mais antigos que os dias do plano são apagados em lotes pequenos pelo
+índice (bot_id, data_hora, id), cada lote na própria transação, para não
+segurar o lock de escrita do SQLite enquanto API e workers gravam. As
+páginas liberadas voltam ao disco com incremental vacuum. Os rollups de
+analytics (logrollup) não expiram: os gráficos continuam com o histórico.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.bot import Bot
+from app.models.log import LogExecucao
+from app.models.user import User
+
+# PRAGMA auto_vacuum: 0 = NONE, 1 = FULL, 2 = INCREMENTAL
+_AUTO_VACUUM_INCREMENTAL = 2
+
+
+class RetentionService:
+    """Service para a limpeza de logs expirados."""
+
+    @staticmethod
+    def dias_por_plano(valor: str | None = None) -> dict[str, int]:
+        """Interpreta LOG_RETENCAO_DIAS ("free:30,pro:90")."""
+        valor = settings.LOG_RETENCAO_DIAS if valor is None else valor
+        dias = {}
+        for parte in filter(None, (p.strip() for p in valor.split(","))):
+            plano, _, numero = parte.partition(":")
+            plano = plano.strip()
+            try:
+                dias[plano] = int(numero)
+            except ValueError:
+                raise ValueError(
+                    f"Retenção inválida: {parte!r} (use plano:dias)"
+                ) from None
+            if dias[plano] < 0:
+                raise ValueError(f"Retenção negativa para o plano {plano!r}")
+        return dias
+
+    @staticmethod
+    def limites(
+        db: Session, agora: datetime | None = None
+    ) -> list[tuple[int, datetime]]:
+        """(bot_id, data limite) dos bots com retenção; logs anteriores expiram."""
+        agora = agora or datetime.now()
+        dias = RetentionService.dias_por_plano()
+        stmt = select(Bot.id, User.plan).join(User, Bot.owner_id == User.id)
+        limites = []
+        for bot_id, plano in db.execute(stmt):
+            n = dias.get(plano, settings.LOG_RETENCAO_PADRAO_DIAS)
+            if n > 0:
+                limites.append((bot_id, agora - timedelta(days=n)))
+        return limites
+
+    @staticmethod
+    def apagar_lote(db: Session, bot_id: int, limite: datetime, lote: int) -> int:
+        """Apaga até `lote` logs do bot anteriores a `limite` (uma transação)."""
+        ids = (
+            select(LogExecucao.id)
+            .where(LogExecucao.bot_id == bot_id, LogExecucao.data_hora < limite)
+            .order_by(LogExecucao.data_hora)
+            .limit(lote)
+        )
+        resultado = db.execute(delete(LogExecucao).where(LogExecucao.id.in_(ids)))
+        db.commit()
+        return resultado.rowcount
+
+    @staticmethod
+    def recuperar_espaco(db: Session, paginas: int) -> int:
+        """Devolve até `paginas` páginas livres ao disco; retorna os bytes.
+
+        Só tem efeito com auto_vacuum=INCREMENTAL (bancos novos já nascem
+        assim; os antigos precisam de um VACUUM, ver `converter_vacuum`).
+        """
+        if db.execute(text("PRAGMA auto_vacuum")).scalar() != _AUTO_VACUUM_INCREMENTAL:
+            return 0
+        tamanho = db.execute(text("PRAGMA page_size")).scalar()
+        antes = db.execute(text("PRAGMA page_count")).scalar()
+        db.commit()
+        # executescript roda o PRAGMA até o fim; via execute() o sqlite3 do
+        # Python dá um único passo e libera só uma página
+        conexao = db.connection().connection.driver_connection
+        conexao.executescript(f"PRAGMA incremental_vacuum({int(paginas)});")
+        depois = db.execute(text("PRAGMA page_count")).scalar()
+        db.commit()
+        return (antes - depois) * tamanho
+
+    @staticmethod
+    def converter_vacuum(db: Session) -> None:
+        """Liga auto_vacuum=INCREMENTAL num banco existente (VACUUM completo:
+        reescreve o arquivo e trava o banco enquanto roda)."""
+        db.commit()
+        conexao = db.connection().connection.driver_connection
+        conexao.executescript("PRAGMA auto_vacuum = INCREMENTAL; VACUUM;")
+
+    @staticmethod
+    def executar(
+        db: Session,
+        lote: int | None = None,
+        pausa: float | None = None,
+        vacuum_paginas: int | None = None,
+        agora: datetime | None = None,
+    ) -> dict:
+        """Aplica a retenção a todos os bots e recupera espaço.
+
+        Entre os lotes dorme `pausa` segundos para dar vez a outras escritas.
+        Retorna {"linhas": logs apagados, "bytes": bytes devolvidos ao disco}.
+        """
+        lote = lote or settings.LOG_RETENCAO_LOTE
+        pausa = settings.LOG_RETENCAO_PAUSA_MS / 1000 if pausa is None else pausa
+        if vacuum_paginas is None:
+            vacuum_paginas = settings.LOG_RETENCAO_VACUUM_PAGINAS
+
+        linhas = 0
+        for bot_id, limite in RetentionService.limites(db, agora):
+            while True:
+                apagadas = RetentionService.apagar_lote(db, bot_id, limite, lote)
+                linhas += apagadas
+                if apagadas < lote:
+                    break
+                if pausa:
+                    time.sleep(pausa)
+        return {
+            "linhas": linhas,
+            "bytes": RetentionService.recuperar_espaco(db, vacuum_paginas),
+        }
@@ -0,0 +1,476 @@
+"""Motor de regras: compila uma Regra uma única vez para o caminho quente do worker.
+
+O handler do BotWorker roda para cada mensagem recebida; tudo que depende só
+da regra (split por vírgula, casefold, compilação de regex, pares de
+substituição) é feito aqui, no (re)carregamento, e não por mensagem.
+"""
+
+import re
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.models.rule import Regra
+    from app.services.message_context import MessageContext
+
+
+def _separar_lista(valor: str | None) -> list[str]:
+    """Divide 'a, b, c' em ['a', 'b', 'c'] ignorando itens vazios."""
+    if not valor:
+        return []
+    return [p.strip() for p in valor.split(",") if p.strip()]
+
+
+# Metacaracteres de regex: sem eles, "somente_se_tiver" é só uma substring
+_METACARACTERES = frozenset(".^$*+?{}[]\\|()")
+
+
+def _eh_literal(padrao: str) -> bool:
+    return not any(c in _METACARACTERES for c in padrao)
+
+
+def _compilar_regex(padrao: str, flags: int = re.IGNORECASE) -> re.Pattern | None:
+    """Compila um padrão; retorna None se não for uma regex válida."""
+    try:
+        return re.compile(padrao, flags)
+    except re.error:
+        return None
+
+
+class Substituicao:
+    """Passo de substituição pré-compilado (picklável, roda no sandbox de regex).
+
+    - `padrao` + `substituto`: re.sub com a regex do filtro (como no MVP);
+    - `padrao` + `tabela`: pares "a->b|c->d" em uma passada (leftmost-longest:
+      o `re` escolhe a primeira alternativa que casa na posição mais à
+      esquerda e as chaves vão da maior para a menor);
+    - só `tabela` com um par: str.replace simples.
+    """
+
+    __slots__ = ("padrao", "substituto", "tabela")
+
+    def __init__(
+        self,
+        padrao: re.Pattern | None = None,
+        substituto: str | None = None,
+        tabela: dict[str, str] | None = None,
+    ):
+        self.padrao = padrao
+        self.substituto = substituto
+        self.tabela = tabela
+
+    @classmethod
+    def de_pares(cls, pares: dict[str, str]) -> "Substituicao":
+        if len(pares) == 1:
+            return cls(tabela=pares)
+        chaves = sorted(pares, key=len, reverse=True)
+        return cls(padrao=re.compile("|".join(map(re.escape, chaves))), tabela=pares)
+
+    def __call__(self, texto: str) -> str:
+        if self.tabela is None:
+            return self.padrao.sub(self.substituto, texto)
+        if self.padrao is None:
+            ((antigo, novo),) = self.tabela.items()
+            return texto.replace(antigo, novo)
+        tabela = self.tabela
+        return self.padrao.sub(lambda m: tabela[m.group()], texto)
+
+
+def _preparar_substituicao(
+    filtro: str | None, substituto: str | None
+) -> Substituicao | None:
+    """Monta o passo de substituição da regra (ou None se não houver)."""
+    if not substituto:
+        return None
+
+    # filtro + substituto: re.sub com o filtro como regex (como no MVP)
+    if filtro:
+        padrao = _compilar_regex(filtro) or re.compile(re.escape(filtro), re.IGNORECASE)
+        return Substituicao(padrao=padrao, substituto=substituto)
+
+    # Formato "a->b|c->d": pares compilados em uma única passada
+    pares: dict[str, str] = {}
+    for par in substituto.split("|"):
+        partes = par.split("->")
+        if len(partes) == 2 and partes[0].strip():
+            # Chave repetida: vale o primeiro par (como na cadeia de replace)
+            pares.setdefault(partes[0].strip(), partes[1].strip())
+    if not pares:
+        return None
+    return Substituicao.de_pares(pares)
+
+
+# ----------------------------------------------------------------------
+# Validação de regex (ReDoS) — usada pelo RuleService antes de salvar
+# ----------------------------------------------------------------------
+
+try:  # Python 3.11+
+    from re import _constants as _sre_c
+    from re import _parser as _sre_parser
+except ImportError:  # pragma: no cover - Python 3.10
+    import sre_constants as _sre_c
+    import sre_parse as _sre_parser
+
+_REPETICOES = (_sre_c.MAX_REPEAT, _sre_c.MIN_REPEAT)
+
+
+def _tem_repeticao_ilimitada(itens) -> bool:
+    """True se a subexpressão contém algum quantificador sem limite (*, +, {n,})."""
+    for op, arg in itens:
+        if op in _REPETICOES:
+            _minimo, maximo, sub = arg
+            if maximo == _sre_c.MAXREPEAT or _tem_repeticao_ilimitada(sub):
+                return True
+        elif op == _sre_c.SUBPATTERN:
+            if _tem_repeticao_ilimitada(arg[-1]):
+                return True
+        elif op == _sre_c.BRANCH:
+            if any(_tem_repeticao_ilimitada(b) for b in arg[1]):
+                return True
+        elif op in (_sre_c.ASSERT, _sre_c.ASSERT_NOT):
+            if _tem_repeticao_ilimitada(arg[1]):
+                return True
+    return False
+
+
+def _tem_quantificador_aninhado(itens) -> bool:
+    """Detecta (x+)+, (x*)*, (a|b+)* ... — a forma clássica de ReDoS."""
+    for op, arg in itens:
+        if op in _REPETICOES:
+            _minimo, maximo, sub = arg
+            if maximo > 1 and _tem_repeticao_ilimitada(sub):
+                return True
+            if _tem_quantificador_aninhado(sub):
+                return True
+        elif op == _sre_c.SUBPATTERN:
+            if _tem_quantificador_aninhado(arg[-1]):
+                return True
+        elif op == _sre_c.BRANCH:
+            if any(_tem_quantificador_aninhado(b) for b in arg[1]):
+                return True
+        elif op in (_sre_c.ASSERT, _sre_c.ASSERT_NOT):
+            if _tem_quantificador_aninhado(arg[1]):
+                return True
+    return False
+
+
+def validar_regex(padrao: str, tamanho_maximo: int) -> None:
+    """Rejeita regex longas demais ou com quantificadores aninhados.
+
+    Padrões que não compilam são aceitos: o motor os trata como texto literal.
+
+    Raises:
+        ValueError: se o padrão for considerado perigoso.
+    """
+    if len(padrao) > tamanho_maximo:
+        raise ValueError(
+            f"Regex muito longa ({len(padrao)} caracteres, máximo {tamanho_maximo})"
+        )
+    try:
+        arvore = _sre_parser.parse(padrao, re.IGNORECASE)
+    except re.error:
+        return
+    if _tem_quantificador_aninhado(arvore):
+        raise ValueError(
+            f"Regex '{padrao}' tem quantificadores aninhados (ex: (a+)+) "
+            "e pode travar o processamento"
+        )
+
+
+def validar_padroes_regra(
+    filtro: str | None,
+    substituto: str | None,
+    somente_se_tiver: str | None,
+    tamanho_maximo: int,
+) -> None:
+    """Valida todos os campos de uma regra que são executados como regex.
+
+    Raises:
+        ValueError: se algum padrão for considerado perigoso.
+    """
+    if filtro and substituto:
+        validar_regex(filtro, tamanho_maximo)
+    for p in _separar_lista(somente_se_tiver):
+        if not _eh_literal(p):
+            validar_regex(p, tamanho_maximo)
+
+
+class KeywordAutomaton:
+    """Autômato Aho-Corasick: todas as palavras-chave em uma passada pelo texto.
+
+    Construído uma vez por bot com os bloqueios e as obrigatórias literais de
+    todas as regras; `buscar` devolve o conjunto de palavras encontradas e cada
+    regra decide a partir desse conjunto.
+    """
+
+    __slots__ = ("palavras", "_transicoes", "_falhas", "_saidas", "_alfabeto")
+
+    def __init__(self, palavras: Iterable[str]):
+        self.palavras: frozenset[str] = frozenset(p for p in palavras if p)
+        self._transicoes: list[dict[str, int]] = [{}]
+        self._saidas: list[tuple[str, ...]] = [()]
+        self._falhas: list[int] = [0]
+        self._alfabeto: frozenset[str] = frozenset("".join(self.palavras))
+
+        # 1) Trie com as palavras
+        for palavra in self.palavras:
+            estado = 0
+            for c in palavra:
+                proximo = self._transicoes[estado].get(c)
+                if proximo is None:
+                    proximo = len(self._transicoes)
+                    self._transicoes.append({})
+                    self._saidas.append(())
+                    self._falhas.append(0)
+                    self._transicoes[estado][c] = proximo
+                estado = proximo
+            self._saidas[estado] = (*self._saidas[estado], palavra)
+
+        # 2) Links de falha em BFS (saídas herdadas do sufixo mais longo)
+        fila = list(self._transicoes[0].values())
+        for estado in fila:
+            for c, proximo in self._transicoes[estado].items():
+                fila.append(proximo)
+                falha = self._falhas[estado]
+                while falha and c not in self._transicoes[falha]:
+                    falha = self._falhas[falha]
+                destino = self._transicoes[falha].get(c, 0)
+                self._falhas[proximo] = destino if destino != proximo else 0
+                if self._saidas[self._falhas[proximo]]:
+                    self._saidas[proximo] = (
+                        *self._saidas[proximo], *self._saidas[self._falhas[proximo]]
+                    )
+
+    def __bool__(self) -> bool:
+        return bool(self.palavras)
+
+    def buscar(self, texto: str) -> set[str]:
+        """Retorna as palavras-chave presentes em `texto` (já casefolded)."""
+        encontradas: set[str] = set()
+        if not self.palavras:
+            return encontradas
+
+        transicoes = self._transicoes
+        falhas = self._falhas
+        saidas = self._saidas
+        alfabeto = self._alfabeto
+        estado = 0
+        for c in texto:
+            if c not in alfabeto:
+                estado = 0
+                continue
+            while estado and c not in transicoes[estado]:
+                estado = falhas[estado]
+            estado = transicoes[estado].get(c, 0)
+            if saidas[estado]:
+                encontradas.update(saidas[estado])
+        return encontradas
+
+
+# Campos da Regra que entram no plano compilado: chave do reload incremental
+CAMPOS_PLANO = (
+    "nome",
+    "origem",
+    "destino",
+    "filtro",
+    "substituto",
+    "bloqueios",
+    "somente_se_tiver",
+    "converter_shopee",
+    "janela_dedup",
+    "modo_envio",
+)
+
+
+def chave_regra(regra: "Regra") -> tuple:
+    """Valores dos campos compilados; muda sempre que o plano precisa mudar."""
+    return tuple(getattr(regra, campo) for campo in CAMPOS_PLANO)
+
+
+class RulePlan:
+    """Regra pré-compilada: listas já separadas/casefolded e regex compiladas."""
+
+    __slots__ = (
+        "id",
+        "nome",
+        "origens",
+        "destino",
+        "destinos",
+        "converter_shopee",
+        "janela_dedup",
+        "modo_envio",
+        "bloqueios",
+        "obrigatorias",
+        "obrigatorias_regex",
+        "filtro",
+        "usa_regex",
+        "_substituir",
+    )
+
+    def __init__(
+        self,
+        id: int,
+        nome: str,
+        origens: list,
+        destino,
+        filtro: str | None = None,
+        substituto: str | None = None,
+        bloqueios: str | None = None,
+        somente_se_tiver: str | None = None,
+        converter_shopee: bool = False,
+        janela_dedup: int | None = None,
+        modo_envio: str = "envio",
+    ):
+        self.id = id
+        self.nome = nome
+        self.origens = origens
+        # Lista = fan-out: avaliada uma vez, enviada a cada destino
+        self.destinos: list = list(destino) if isinstance(destino, list) else [destino]
+        self.destino = self.destinos[0] if self.destinos else None
+        self.converter_shopee = converter_shopee
+        self.janela_dedup = janela_dedup
+        self.modo_envio = modo_envio
+
+        # Bloqueios: substring case-insensitive (casefold feito uma vez)
+        self.bloqueios: frozenset[str] = frozenset(
+            p.casefold() for p in _separar_lista(bloqueios)
+        )
+
+        # Obrigatórias: literais viram palavras-chave do autômato; as demais
+        # são testadas como regex OU substring case-insensitive
+        obrigatorias: set[str] = set()
+        obrigatorias_regex: list[re.Pattern] = []
+        for p in _separar_lista(somente_se_tiver):
+            obrigatorias.add(p.casefold())
+            if not _eh_literal(p):
+                regex = _compilar_regex(p)
+                if regex is not None:
+                    obrigatorias_regex.append(regex)
+        self.obrigatorias: frozenset[str] = frozenset(obrigatorias)
+        self.obrigatorias_regex: tuple[re.Pattern, ...] = tuple(obrigatorias_regex)
+
+        self.filtro: str | None = filtro.casefold() if filtro else None
+        self._substituir = _preparar_substituicao(filtro, substituto)
+        # Regex escritas pelo usuário: o worker as executa com orçamento de
+        # tempo; filtro literal (sem metacaracteres) é linear e roda inline
+        self.usa_regex: bool = bool(self.obrigatorias_regex) or bool(
+            filtro and substituto and not _eh_literal(filtro)
+        )
+
+    @classmethod
+    def from_regra(cls, regra: "Regra", origens: list, destino) -> "RulePlan":
+        """Compila a partir do model Regra (origens/destinos já convertidos)."""
+        return cls(
+            id=regra.id,
+            nome=regra.nome,
+            origens=origens,
+            destino=destino,
+            filtro=regra.filtro,
+            substituto=regra.substituto,
+            bloqueios=regra.bloqueios,
+            somente_se_tiver=regra.somente_se_tiver,
+            converter_shopee=regra.converter_shopee,
+            janela_dedup=regra.janela_dedup,
+            modo_envio=regra.modo_envio or "envio",
+        )
+
+    @property
+    def palavras_chave(self) -> frozenset[str]:
+        """Palavras que esta regra contribui para o autômato do bot."""
+        return self.bloqueios | self.obrigatorias
+
+    def bloqueado(
+        self, texto_normalizado: str, encontradas: set[str] | None = None
+    ) -> bool:
+        """Checagem barata (sem regex) dos bloqueios."""
+        if not self.bloqueios:
+            return False
+        if encontradas is not None:
+            return not self.bloqueios.isdisjoint(encontradas)
+        return any(p in texto_normalizado for p in self.bloqueios)
+
+    def motivo_descarte(
+        self,
+        texto: str,
+        texto_normalizado: str,
+        encontradas: set[str] | None = None,
+    ) -> str | None:
+        """Retorna o motivo pelo qual a mensagem não passa na regra (ou None).
+
+        `encontradas` é o resultado de `KeywordAutomaton.buscar`; sem ele as
+        palavras-chave são testadas uma a uma no texto.
+        """
+        # Filtro: bloqueia se contiver palavras bloqueadas
+        if self.bloqueado(texto_normalizado, encontradas):
+            return "bloqueio"
+
+        # Filtro: só encaminha se contiver palavras obrigatórias
+        if self.obrigatorias:
+            if encontradas is not None:
+                achou = not self.obrigatorias.isdisjoint(encontradas)
+            else:
+                achou = any(p in texto_normalizado for p in self.obrigatorias)
+            if not achou and not any(r.search(texto) for r in self.obrigatorias_regex):
+                return "sem_palavra_obrigatoria"
+
+        # Filtro: substring (case-insensitive)
+        if self.filtro and self.filtro not in texto_normalizado:
+            return "filtro"
+
+        return None
+
+    def substituir(self, texto: str) -> str:
+        """Aplica o passo de substituição pré-compilado."""
+        if self._substituir is None:
+            return texto
+        return self._substituir(texto)
+
+    def aplicar(
+        self,
+        texto: str,
+        texto_normalizado: str | None = None,
+        encontradas: set[str] | None = None,
+    ) -> str | None:
+        """Avalia filtros e substituição; None se a mensagem for descartada."""
+        if texto_normalizado is None:
+            texto_normalizado = texto.casefold()
+        if self.motivo_descarte(texto, texto_normalizado, encontradas) is not None:
+            return None
+        return self.substituir(texto)
+
+    def avaliar(
+        self, contexto: "MessageContext", encontradas: set[str] | None = None
+    ) -> str | None:
+        """`aplicar` lendo texto/casefold já calculados no MessageContext."""
+        return self.aplicar(contexto.texto, contexto.texto_normalizado, encontradas)
+
+
+class RuleSet:
+    """Regras compiladas de um bot: índice por origem + autômato compartilhado.
+
+    É trocado inteiro a cada reload, então o handler sempre enxerga um índice
+    e um autômato consistentes entre si. Com `anterior`, o autômato é
+    reaproveitado quando o conjunto de palavras-chave não mudou.
+    """
+
+    __slots__ = ("planos", "por_origem", "automato")
+
+    def __init__(
+        self,
+        planos: list[RulePlan],
+        por_origem: dict[int, list[RulePlan]] | None = None,
+        anterior: "RuleSet | None" = None,
+    ):
+        self.planos = planos
+        self.por_origem: dict[int, list[RulePlan]] = por_origem or {}
+        palavras: set[str] = set()
+        for plano in planos:
+            palavras |= plano.palavras_chave
+        if anterior is not None and anterior.automato.palavras == palavras:
+            self.automato = anterior.automato
+        else:
+            self.automato = KeywordAutomaton(palavras)
+
+    def buscar_palavras(self, texto_normalizado: str) -> set[str]:
+        """Uma passada do autômato sobre o texto casefolded."""
+        return self.automato.buscar(texto_normalizado)
@@ -1,9 +1,11 @@
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.models.bot import Bot
 from app.models.rule import Regra
 from app.schemas.rule import RuleCreate, RuleUpdate
+from app.services.rule_engine import validar_padroes_regra
 
 
 class RuleService:
@@ -30,8 +32,27 @@ class RuleService:
         stmt = select(Regra).where(Regra.bot_id == bot_id).order_by(Regra.id)
         return list(db.execute(stmt).scalars().all())
 
+    @staticmethod
+    def validar_padroes(
+        filtro: str | None, substituto: str | None, somente_se_tiver: str | None
+    ) -> None:
+        """Valida as regex da regra (tamanho e quantificadores aninhados).
+
+        Raises:
+            ValueError: se algum padrão puder travar o worker (ReDoS).
+        """
+        validar_padroes_regra(
+            filtro, substituto, somente_se_tiver, settings.REGEX_MAX_LENGTH
+        )
+
     @staticmethod
     def create(db: Session, data: RuleCreate) -> Regra:
+        """Cria uma regra.
+
+        Raises:
+            ValueError: se filtro/somente_se_tiver tiverem regex perigosa.
+        """
+        RuleService.validar_padroes(data.filtro, data.substituto, data.somente_se_tiver)
         regra = Regra(**data.model_dump())
         db.add(regra)
         db.commit()
@@ -40,7 +61,17 @@ class RuleService:
 
     @staticmethod
     def update(db: Session, regra: Regra, data: RuleUpdate) -> Regra:
+        """Atualiza uma regra (partial update).
+
+        Raises:
+            ValueError: se filtro/somente_se_tiver tiverem regex perigosa.
+        """
         update_data = data.model_dump(exclude_unset=True)
+        RuleService.validar_padroes(
+            update_data.get("filtro", regra.filtro),
+            update_data.get("substituto", regra.substituto),
+            update_data.get("somente_se_tiver", regra.somente_se_tiver),
+        )
         for field, value in update_data.items():
             setattr(regra, field, value)
         db.commit()
@@ -76,12 +76,19 @@ class ShopeeAPI:
         return None
 
 
-async def converter_links_shopee(texto: str, shopee_api: ShopeeAPI) -> str:
-    """Encontra todos os links Shopee no texto e converte para links afiliados."""
+async def converter_links_shopee(
+    texto: str, shopee_api: ShopeeAPI, links: list[str] | None = None
+) -> str:
+    """Encontra todos os links Shopee no texto e converte para links afiliados.
+
+    `links` permite reaproveitar a extração já feita (MessageContext.shopee_urls)
+    quando o texto não mudou desde então.
+    """
     if not texto:
         return texto
 
-    links = SHOPEE_URL_REGEX.findall(texto)
+    if links is None:
+        links = SHOPEE_URL_REGEX.findall(texto)
     if not links:
         return texto
 
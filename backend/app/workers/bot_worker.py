@@ -3,35 +3,74 @@
 Portado do MVP com melhorias:
 - Hot-reload de regras e credenciais Shopee (poll a cada 3s)
 - Conversão de chat IDs numéricos para int
-- Suporte para origens/destinos múltiplos (separados por vírgula)
-- Anti-flood (delay aleatório + FloodWaitError handling)
+- Suporte para origens/destinos múltiplos (separados por vírgula): a regra
+  é avaliada uma vez e o resultado sai para cada destino
+- Anti-flood (token bucket por destino/conta + FloodWaitError handling)
+- Fila com prioridades: agendamentos > encaminhamentos > reenvios
+- Álbuns (grouped_id) avaliados e enviados como um único envio
 - Logs diagnósticos detalhados para Shopee
 """
 
 import asyncio
 import logging
-import random
-import re
+import time
 
 from telethon import TelegramClient, events
-from telethon.errors import FloodWaitError
+from telethon.errors import (
+    ChatForwardsRestrictedError,
+    FloodWaitError,
+    MessageIdInvalidError,
+    RpcCallFailError,
+    ServerError,
+    SlowModeWaitError,
+    TimedOutError,
+)
 from telethon.sessions import StringSession
 
+from app.core.config import settings
 from app.db.session import SessionLocal
 from app.models.bot import Bot
 from app.models.configuracao import Configuracao
 from app.services.configuracao_service import ConfiguracaoService
-from app.services.log_service import LogService
+from app.services.message_context import MessageContext
+from app.services.rule_engine import RulePlan, RuleSet, chave_regra
 from app.services.rule_service import RuleService
 from app.services.shopee_service import ShopeeAPI, converter_links_shopee
+from app.workers.dedup import DedupCache, chave_conteudo
+from app.workers.log_sink import LogSink
+from app.workers.metrics import Metricas
+from app.workers.outbox import Outbox
+from app.workers.rate_limiter import RateLimiter
+from app.workers.regex_sandbox import RegexSandbox, RegexTimeoutError
+from app.workers.send_queue import FilaEnvio, ItemEnvio, referencia_media
 
 logger = logging.getLogger("conekta-bots.worker")
 
+# Falhas de rede/servidor: o item volta à fila como reenvio
+_ERROS_TRANSITORIOS = (
+    ServerError,
+    TimedOutError,
+    RpcCallFailError,
+    ConnectionError,
+    asyncio.TimeoutError,
+)
+
+# Origem que não resolveu: nova tentativa no poll de regras, com backoff
+# exponencial (FloodWait: espera o prazo pedido pelo Telegram)
+_RESOLVER_ESPERA_INICIAL = 3.0
+_RESOLVER_ESPERA_MAX = 300.0
+
 
 class BotWorker:
     """Worker que gerencia um bot Telegram: regras de encaminhamento + fila de envio."""
 
-    def __init__(self, bot_data: Bot):
+    def __init__(
+        self,
+        bot_data: Bot,
+        regex_sandbox: RegexSandbox | None = None,
+        outbox: Outbox | None = None,
+        log_sink: LogSink | None = None,
+    ):
         self.bot_id = bot_data.id
         self.bot_nome = bot_data.nome
         self.owner_id = bot_data.owner_id
@@ -39,13 +78,49 @@ class BotWorker:
         self.api_hash = bot_data.api_hash
         self.session_string = bot_data.session_string
         self.client = TelegramClient(
-            StringSession(self.session_string), self.api_id, self.api_hash
+            StringSession(self.session_string),
+            self.api_id,
+            self.api_hash,
+            # FloodWait sempre chega ao worker, que estaciona só o destino
+            # (o padrão do Telethon dormiria dentro do envio, segurando o worker)
+            flood_sleep_threshold=0,
+        )
+        # Fila particionada por destino, atendida por SEND_WORKERS workers
+        self.fila_envio = FilaEnvio(
+            capacidade=settings.SEND_FILA_CAPACIDADE,
+            politica=settings.SEND_FILA_POLITICA,
+            bloqueio_max=settings.SEND_FILA_BLOQUEIO_MAX_SEGUNDOS,
+            ao_descartar=self._descartado,
+            pesos=tuple(
+                int(p) for p in settings.SEND_PESOS_PRIORIDADE.split(",") if p.strip()
+            ),
+            envelhecimento=settings.SEND_ENVELHECIMENTO_SEGUNDOS,
         )
-        self.fila_envio: asyncio.Queue = asyncio.Queue()
         self._running = False
         self._shopee_api: ShopeeAPI | None = None
-        self._handlers_ativos: list = []
-        self._hash_regras: str = ""
+        # id da regra → (campos compilados, plano) do último reload
+        self._planos: dict[int, tuple[tuple, RulePlan]] = {}
+        # Regras compiladas + índice por origem (trocado atomicamente no reload)
+        self._regras = RuleSet([])
+        self._origens_resolvidas: dict[str, int] = {}
+        # Origem não resolvida → (falhas seguidas, instante da próxima tentativa)
+        self._origens_pendentes: dict[str, tuple[int, float]] = {}
+        # Regras com regex rodam no sandbox (None = inline, sem orçamento)
+        self._regex_sandbox = regex_sandbox
+        self._regras_suspensas: set[int] = set()
+        # Conteúdo já enfileirado por destino (reposts, regras repetidas)
+        self._dedup = DedupCache()
+        self.metricas = Metricas()
+        # Anti-flood: fichas por chat de destino + da conta
+        self._limitador = RateLimiter()
+        # Registro durável da fila (None = só em memória)
+        self._outbox = outbox
+        # Logs de execução gravados em lote (o manager compartilha um só);
+        # sem sink externo, o worker roda o próprio loop de flush
+        self._log_sink_proprio = log_sink is None
+        self.log_sink = log_sink or LogSink()
+        # Destino → instante do último FloodWait (detecta limite da conta)
+        self._floods_recentes: dict[object, float] = {}
 
     # ------------------------------------------------------------------
     # Helpers para converter chat IDs (igual ao MVP)
@@ -53,7 +128,10 @@ class BotWorker:
 
     @staticmethod
     def _processar_chat_id(chat_id: str):
-        """Converte ID numérico para int; mantém string caso contrário ('me', '@canal')."""
+        """Converte ID numérico para int; mantém string caso contrário.
+
+        Ex.: 'me', '@canal'.
+        """
         try:
             return int(chat_id)
         except (ValueError, TypeError):
@@ -85,9 +163,20 @@ class BotWorker:
         # Carrega Shopee API logo no início (com log)
         self._carregar_shopee_api()
 
+        # Envios pendentes de uma execução anterior voltam para a fila
+        await self._restaurar_outbox()
+
+        # Um único handler por bot; as regras ficam no índice por origem.
+        # Partes de álbum são agrupadas pelo Telethon (janela curta por
+        # grouped_id) e chegam juntas no handler de Album
+        self.client.add_event_handler(self._despachar, events.NewMessage())
+        self.client.add_event_handler(self._despachar_album, events.Album())
+
         await asyncio.gather(
             self._monitorar_regras_loop(),
-            self._loop_fila(),
+            self._relatorio_metricas_loop(),
+            *(self._worker_envio() for _ in range(settings.SEND_WORKERS)),
+            *([self.log_sink.executar()] if self._log_sink_proprio else []),
             self.client.run_until_disconnected(),
         )
 
@@ -95,6 +184,8 @@ class BotWorker:
         """Para o worker e desconecta o client."""
         self._running = False
         await self.client.disconnect()
+        if self._log_sink_proprio:
+            await self.log_sink.fechar()
         logger.info("Worker parado: %s", self.bot_nome)
 
     # ------------------------------------------------------------------
@@ -102,7 +193,10 @@ class BotWorker:
     # ------------------------------------------------------------------
 
     def _carregar_shopee_api(self) -> ShopeeAPI | None:
-        """Carrega ShopeeAPI a partir do BD. Tenta owner_id primeiro, fallback global."""
+        """Carrega ShopeeAPI a partir do BD.
+
+        Tenta owner_id primeiro, fallback global.
+        """
         db = SessionLocal()
         try:
             # 1) Busca por owner_id (multi-tenancy)
@@ -163,189 +257,575 @@ class BotWorker:
             await asyncio.sleep(3)
 
     async def _aplicar_regras(self) -> None:
-        """Compara hash das regras e re-registra handlers se mudaram."""
+        """Recompila só as regras que mudaram e troca o índice de despacho.
+
+        Regras são identificadas por (id, campos compilados): as inalteradas
+        mantêm o RulePlan já compilado e, se as palavras-chave não mudaram, o
+        autômato do bot também é reaproveitado.
+        """
         db = SessionLocal()
         try:
             regras = RuleService.get_all_by_bot(db, self.bot_id)
             regras_ativas = [r for r in regras if r.ativo]
 
-            # Snapshot para detectar mudanças
-            snapshot = str([
-                (r.id, r.nome, r.origem, r.destino, r.filtro, r.substituto,
-                 r.bloqueios, r.somente_se_tiver, r.converter_shopee)
-                for r in regras_ativas
-            ])
-            if snapshot == self._hash_regras:
-                return  # Sem mudanças
-
-            logger.info("🔄 [%s] Regras atualizadas (%d ativas)", self.bot_nome, len(regras_ativas))
-
-            # Remove handlers antigos
-            for h in self._handlers_ativos:
-                self.client.remove_event_handler(h)
-            self._handlers_ativos.clear()
-
-            # Registra novos
+            planos: dict[int, tuple[tuple, RulePlan]] = {}
+            novas = alteradas = 0
             for regra in regras_ativas:
-                self._registrar_handler(regra)
-
-            self._hash_regras = snapshot
+                chave = chave_regra(regra)
+                atual = self._planos.get(regra.id)
+                if atual is not None and atual[0] == chave:
+                    planos[regra.id] = atual
+                    continue
+                if atual is None:
+                    novas += 1
+                else:
+                    alteradas += 1
+                planos[regra.id] = (
+                    chave,
+                    RulePlan.from_regra(
+                        regra,
+                        self._processar_lista_chats(regra.origem),
+                        self._processar_lista_chats(regra.destino),
+                    ),
+                )
         finally:
             db.close()
 
+        removidas = len(self._planos.keys() - planos.keys())
+        if not (novas or alteradas or removidas):
+            if not self._retentar_origens():
+                return  # Sem mudanças
+        else:
+            logger.info(
+                "🔄 [%s] Regras atualizadas (%d ativas: +%d ~%d -%d)",
+                self.bot_nome, len(planos), novas, alteradas, removidas,
+            )
+
+        lista = [plano for _chave, plano in planos.values()]
+        # Novo índice montado à parte e trocado de uma vez (sem janela sem handler)
+        self._regras = RuleSet(
+            lista, await self._construir_indice(lista), anterior=self._regras
+        )
+        self._planos = planos
+        # Regras desativadas por timeout já saíram das ativas no BD
+        self._regras_suspensas &= planos.keys()
+        # Pendências de origens que nenhuma regra usa mais
+        origens = {o for plano in lista for o in plano.origens}
+        self._origens_pendentes = {
+            o: v for o, v in self._origens_pendentes.items() if o in origens
+        }
+
+    def _retentar_origens(self) -> bool:
+        """True se alguma origem não resolvida já pode ser tentada de novo."""
+        agora = time.monotonic()
+        return any(
+            proxima <= agora for _falhas, proxima in self._origens_pendentes.values()
+        )
+
     # ------------------------------------------------------------------
-    # Handler de regra
+    # Despacho: um handler por bot, indexado pelo chat de origem
     # ------------------------------------------------------------------
 
-    def _registrar_handler(self, regra) -> None:
-        """Registra um event handler para uma regra específica."""
-        origens = self._processar_lista_chats(regra.origem)
-        regra_id = regra.id
-        regra_nome = regra.nome
-        destino = self._processar_chat_id(regra.destino)
-        filtro = regra.filtro
-        substituto = regra.substituto
-        bloqueios = regra.bloqueios
-        somente_se_tiver = regra.somente_se_tiver
-        regra_converter_shopee = regra.converter_shopee
-
-        async def handler(event):
-            # Texto: mensagem + caption (mídia pode ter caption em vez de text)
-            text_part = event.message.text or ""
-            caption_part = getattr(event.message, "caption", None) or ""
-            texto = f"{text_part} {caption_part}".strip() if caption_part else text_part
-            texto_normalizado = texto.casefold()  # casefold: case-insensitive robusto (Unicode)
-
-            # Filtro: bloqueia se contiver palavras bloqueadas (case-insensitive)
-            if bloqueios:
-                palavras_bloqueadas = [p.strip().casefold() for p in bloqueios.split(",") if p.strip()]
-                if any(palavra in texto_normalizado for palavra in palavras_bloqueadas):
-                    return
-
-            # Filtro: só encaminha se contiver palavras obrigatórias (case-insensitive)
-            if somente_se_tiver:
-                palavras_obrigatorias = [p.strip() for p in somente_se_tiver.split(",") if p.strip()]
-                achou = False
-                for p in palavras_obrigatorias:
-                    if re.search(p, texto, re.IGNORECASE) or p.casefold() in texto_normalizado:
-                        achou = True
-                        break
-                if not achou:
-                    return
-
-            # Filtro: regex ou substring (case-insensitive)
-            if filtro and filtro.casefold() not in texto_normalizado:
+    async def _resolver_origem(self, origem) -> int | None:
+        """Converte uma origem ('@canal', 'me', ID) no chat_id marcado dos eventos."""
+        if isinstance(origem, int):
+            return origem
+        if origem in self._origens_resolvidas:
+            return self._origens_resolvidas[origem]
+        falhas, proxima = self._origens_pendentes.get(origem, (0, 0.0))
+        if time.monotonic() < proxima:
+            return None  # Ainda no backoff
+        try:
+            chat_id = await self.client.get_peer_id(origem)
+        except Exception as e:
+            falhas += 1
+            if isinstance(e, FloodWaitError):
+                espera = float(e.seconds)
+            else:
+                espera = min(
+                    _RESOLVER_ESPERA_INICIAL * 2 ** (falhas - 1), _RESOLVER_ESPERA_MAX
+                )
+            self._origens_pendentes[origem] = (falhas, time.monotonic() + espera)
+            logger.warning(
+                "[%s] Não foi possível resolver a origem %r (nova tentativa em "
+                "%.0fs): %s",
+                self.bot_nome, origem, espera, e,
+            )
+            return None
+        self._origens_pendentes.pop(origem, None)
+        self._origens_resolvidas[origem] = chat_id
+        return chat_id
+
+    async def _construir_indice(
+        self, planos: list[RulePlan]
+    ) -> dict[int, list[RulePlan]]:
+        """Monta o dict chat_id de origem → regras que escutam esse chat."""
+        indice: dict[int, list[RulePlan]] = {}
+        for plano in planos:
+            for origem in plano.origens:
+                chat_id = await self._resolver_origem(origem)
+                if chat_id is None:
+                    continue
+                lista = indice.setdefault(chat_id, [])
+                if plano not in lista:
+                    lista.append(plano)
+            logger.debug(
+                "[%s] Regra '%s' (id=%d) origens=%s destinos=%s shopee=%s",
+                self.bot_nome, plano.nome, plano.id, plano.origens,
+                plano.destinos, plano.converter_shopee,
+            )
+        return indice
+
+    async def _despachar(self, event) -> None:
+        """Handler único do bot: executa só as regras da origem do update."""
+        if event.message.grouped_id:
+            # Parte de álbum: tratada em _despachar_album
+            return
+        if event.chat_id not in self._regras.por_origem:
+            return
+        # Texto, casefold, links... calculados uma vez e compartilhados pelas regras
+        contexto = MessageContext(event.message)
+        await self._avaliar(
+            event.chat_id, contexto, event.message.media, [event.message.id]
+        )
+
+    async def _despachar_album(self, event) -> None:
+        """Álbum inteiro: regras avaliadas uma vez sobre as legendas somadas."""
+        if event.chat_id not in self._regras.por_origem:
+            return
+        mensagens = event.messages
+        legendas = (MessageContext(m).texto for m in mensagens)
+        contexto = MessageContext(
+            mensagens[0], texto="\n".join(t for t in legendas if t)
+        )
+        self.metricas.incrementar("albuns")
+        await self._avaliar(
+            event.chat_id,
+            contexto,
+            [m.media for m in mensagens],
+            [m.id for m in mensagens],
+        )
+
+    async def _avaliar(
+        self, origem, contexto: MessageContext, media, mensagens_ids: list[int]
+    ) -> None:
+        """Executa as regras da origem sobre o contexto e enfileira os envios."""
+        regras = self._regras
+        planos = regras.por_origem.get(origem)
+        if not planos:
+            return
+        # A fila guarda só a referência da mídia, não o objeto do Telethon
+        media = referencia_media(media)
+
+        # Uma passada do autômato serve bloqueios/obrigatórias de todas as regras
+        encontradas = regras.buscar_palavras(contexto.texto_normalizado)
+
+        for plano in planos:
+            if plano.id in self._regras_suspensas:
+                continue
+            try:
+                await self._processar_regra(
+                    plano, origem, contexto, encontradas, media, mensagens_ids
+                )
+            except Exception as e:
+                logger.error(
+                    "[%s] Erro ao processar regra '%s': %s",
+                    self.bot_nome, plano.nome, e,
+                )
+
+    async def _processar_regra(
+        self,
+        plano: RulePlan,
+        origem,
+        contexto: MessageContext,
+        encontradas: set[str],
+        media,
+        mensagens_ids: list[int],
+    ) -> None:
+        """Aplica uma regra ao update e enfileira o resultado.
+
+        `media` é a mídia da mensagem ou, num álbum, a lista das mídias.
+        """
+        # Filtros (bloqueios, obrigatórias, filtro) + substituição
+        if plano.usa_regex and self._regex_sandbox is not None:
+            # Bloqueios são baratos: evita o round-trip ao sandbox
+            if plano.bloqueado(contexto.texto_normalizado, encontradas):
                 return
+            try:
+                mensagem_final = await self._regex_sandbox.executar(
+                    plano.aplicar,
+                    contexto.texto,
+                    contexto.texto_normalizado,
+                    encontradas,
+                )
+            except RegexTimeoutError as e:
+                await self._desativar_regra(plano, origem, str(e))
+                return
+        else:
+            mensagem_final = plano.avaliar(contexto, encontradas)
+        if mensagem_final is None:
+            return
+
+        # Mesmo conteúdo já enfileirado para o destino dentro da janela
+        # (antes da Shopee: duplicatas não gastam chamadas de conversão). A
+        # chave fica reservada desde já e é liberada se o envio for descartado
+        texto_dedup = mensagem_final
+        destinos = [
+            d
+            for d in plano.destinos
+            if not self._duplicada(plano, contexto, mensagem_final, d)
+        ]
+        if not destinos:
+            return
 
-            # Substituição (suporta regex como no MVP)
-            mensagem_final = texto
-            if filtro and substituto:
-                mensagem_final = re.sub(filtro, substituto, mensagem_final, flags=re.IGNORECASE)
-            elif substituto:
-                pares = substituto.split("|")
-                for par in pares:
-                    partes = par.split("->")
-                    if len(partes) == 2:
-                        mensagem_final = mensagem_final.replace(
-                            partes[0].strip(), partes[1].strip()
-                        )
-
-            # Conversão de links Shopee
-            if regra_converter_shopee:
-                try:
-                    shopee_api = self._get_shopee_api()
-                    if shopee_api:
-                        logger.debug(
-                            "[%s] Convertendo links Shopee (regra: %s)",
-                            self.bot_nome, regra_nome,
-                        )
-                        mensagem_final = await converter_links_shopee(
-                            mensagem_final, shopee_api
-                        )
-                    else:
-                        logger.warning(
-                            "[%s] Shopee habilitada na regra '%s' mas API não configurada!",
-                            self.bot_nome, regra_nome,
-                        )
-                except Exception as e:
-                    logger.error(
-                        "[%s] Erro na conversão Shopee (regra %s): %s",
-                        self.bot_nome, regra_nome, e,
+        # Conversão de links Shopee
+        if plano.converter_shopee:
+            try:
+                shopee_api = self._get_shopee_api()
+                if shopee_api:
+                    mensagem_final = await self._converter_shopee(
+                        plano, contexto, mensagem_final, shopee_api
+                    )
+                else:
+                    logger.warning(
+                        "[%s] Shopee habilitada na regra '%s' mas API não configurada!",
+                        self.bot_nome, plano.nome,
                     )
+            except Exception as e:
+                logger.error(
+                    "[%s] Erro na conversão Shopee (regra %s): %s",
+                    self.bot_nome, plano.nome, e,
+                )
 
-            # Coloca na fila: texto + mídia separados
-            media = event.message.media
-            await self.fila_envio.put((destino, mensagem_final, media, regra_nome, event.chat_id))
+        # Fan-out: um item por destino, todos com o mesmo texto convertido e a
+        # mesma referência de mídia (álbum = lista de mídias, enviada em um
+        # único send_file com a legenda no primeiro item). Cada item passa
+        # pelo limite do próprio destino na fila
+        # Forward/cópia nativa só se a legenda sai como chegou (o forward não
+        # troca o texto); reescrita cai no envio por referência da mídia
+        nativo = plano.modo_envio != "envio" and mensagem_final == contexto.texto
+        for destino in destinos:
+            item = ItemEnvio(destino, mensagem_final, media, plano.nome, origem)
+            item.regra_id = plano.id
+            item.chave_dedup = self._chave_dedup(plano, contexto, texto_dedup, destino)
+            if nativo:
+                item.encaminhar_de = origem
+                item.mensagens_ids = mensagens_ids
+                item.sem_autor = plano.modo_envio == "copiar"
+            await self.enfileirar(item)
+
+    async def enfileirar(self, item: ItemEnvio) -> bool:
+        """Registra no outbox e coloca na fila (False se a política descartou)."""
+        if self._outbox is not None:
+            self._outbox.adicionar(self.bot_id, item)
+        return await self.fila_envio.put(item)
 
-        self.client.add_event_handler(
-            handler, events.NewMessage(chats=origens)
+    @staticmethod
+    def _janela_dedup(plano: RulePlan) -> int:
+        if plano.janela_dedup is None:
+            return settings.DEDUP_JANELA_SEGUNDOS
+        return plano.janela_dedup
+
+    def _chave_dedup(
+        self, plano: RulePlan, contexto: MessageContext, mensagem: str, destino
+    ) -> bytes | None:
+        """Chave do conteúdo no cache de deduplicação (None se desligada)."""
+        if self._janela_dedup(plano) <= 0:
+            return None
+        return chave_conteudo(mensagem, contexto.media_id, destino)
+
+    def _duplicada(
+        self, plano: RulePlan, contexto: MessageContext, mensagem: str, destino
+    ) -> bool:
+        """Consulta/registra o conteúdo no cache de deduplicação do bot."""
+        chave = self._chave_dedup(plano, contexto, mensagem, destino)
+        if chave is None:
+            return False
+        if not self._dedup.registrar(chave, self._janela_dedup(plano)):
+            return False
+        self.metricas.incrementar("duplicadas_suprimidas")
+        logger.debug(
+            "[%s] Duplicata suprimida (regra: %s, destino: %s)",
+            self.bot_nome, plano.nome, destino,
         )
-        self._handlers_ativos.append(handler)
+        return True
+
+    async def _converter_shopee(
+        self,
+        plano: RulePlan,
+        contexto: MessageContext,
+        mensagem: str,
+        shopee_api: ShopeeAPI,
+    ) -> str:
+        """Converte links Shopee reaproveitando o que o contexto já calculou."""
+        # Outra regra já converteu este mesmo texto neste update
+        convertido = contexto.conversoes_shopee.get(mensagem)
+        if convertido is not None:
+            return convertido
+        # Texto sem substituições: os links extraídos do update continuam válidos
+        links = contexto.shopee_urls if mensagem == contexto.texto else None
+        if links == []:
+            return mensagem
+
         logger.debug(
-            "[%s] Handler registrado: regra '%s' (id=%d) origens=%s destino=%s shopee=%s",
-            self.bot_nome, regra_nome, regra_id, origens, destino, regra_converter_shopee,
+            "[%s] Convertendo links Shopee (regra: %s)", self.bot_nome, plano.nome
+        )
+        convertido = await converter_links_shopee(mensagem, shopee_api, links)
+        contexto.conversoes_shopee[mensagem] = convertido
+        return convertido
+
+    async def _desativar_regra(self, plano: RulePlan, origem, motivo: str) -> None:
+        """Desativa uma regra cuja regex estourou o orçamento e registra o erro."""
+        self._regras_suspensas.add(plano.id)
+        logger.error(
+            "[%s] Regra '%s' (id=%d) desativada: %s",
+            self.bot_nome, plano.nome, plano.id, motivo,
         )
+        db = SessionLocal()
+        try:
+            regra = RuleService.get_by_id(db, plano.id, self.bot_id)
+            if regra and regra.ativo:
+                RuleService.toggle_active(db, regra)
+        finally:
+            db.close()
+        # Uma linha por destino: o destino do log é sempre um chat real
+        for destino in plano.destinos:
+            self.log_sink.registrar(
+                bot_id=self.bot_id,
+                bot_nome=self.bot_nome,
+                origem=str(origem),
+                destino=str(destino),
+                status="erro",
+                mensagem=f"[Regra: {plano.nome}] desativada: {motivo}"[:200],
+                regra_id=plano.id,
+            )
 
     # ------------------------------------------------------------------
     # Fila de envio
     # ------------------------------------------------------------------
 
-    async def _loop_fila(self) -> None:
-        """Processa fila de envio de mensagens."""
+    async def _restaurar_outbox(self) -> None:
+        if self._outbox is None:
+            return
+        itens = await self._outbox.reivindicar(self.bot_id)
+        for item in itens:
+            # Já estavam enfileirados antes do restart: não passam pela política
+            self.fila_envio.put_nowait(item, forcar=True)
+        if itens:
+            logger.info(
+                "📦 [%s] %d envio(s) pendente(s) restaurado(s) do outbox",
+                self.bot_nome, len(itens),
+            )
+
+    def _descartado(self, item: ItemEnvio, motivo: str) -> None:
+        """Fila cheia: item descartado pela política (load shedding)."""
+        self.metricas.incrementar("descartadas")
+        self.metricas.incrementar(f"descartadas_{motivo}")
+        if self._outbox is not None:
+            self._outbox.confirmar(item)
+        # Não saiu: o mesmo conteúdo pode ser enfileirado de novo
+        if item.chave_dedup is not None:
+            self._dedup.remover(item.chave_dedup)
+        self._concluir(item, False)
+        logger.warning(
+            "[%s] Fila cheia (%s): envio descartado (regra: %s, destino: %s)",
+            self.bot_nome, motivo, item.regra_nome, item.destino,
+        )
+
+    async def _worker_envio(self) -> None:
+        """Um dos workers de envio: atende um destino por vez, na ordem da fila."""
         while self._running:
             try:
-                destino, texto, media, regra_nome, origem = await asyncio.wait_for(
-                    self.fila_envio.get(), timeout=1.0
-                )
+                destino = await asyncio.wait_for(self.fila_envio.proximo(), timeout=1.0)
             except asyncio.TimeoutError:
                 continue
 
-            db = SessionLocal()
+            item = self.fila_envio.primeiro(destino)
             try:
-                # Envia com mídia (foto/vídeo/doc) ou só texto
-                if media:
-                    await self.client.send_file(
-                        destino, media, caption=texto or None
-                    )
-                else:
-                    await self.client.send_message(destino, texto)
-
-                LogService.create(
-                    db,
-                    bot_id=self.bot_id,
-                    bot_nome=self.bot_nome,
-                    origem=str(origem),
-                    destino=str(destino),
-                    status="sucesso",
-                    mensagem=(texto or "")[:200],
-                )
-                logger.info(
-                    "🚀 [%s] %s → %s (regra: %s)",
-                    self.bot_nome, origem, destino, regra_nome,
-                )
-                # Anti-flood: delay aleatório entre envios
-                await asyncio.sleep(random.uniform(2, 5))
-            except FloodWaitError as e:
-                logger.warning(
-                    "[%s] FloodWait do Telegram: aguardando %ds",
-                    self.bot_nome, e.seconds,
-                )
-                await asyncio.sleep(e.seconds)
-                # Recoloca na fila para tentar novamente
-                await self.fila_envio.put((destino, texto, media, regra_nome, origem))
-            except Exception as e:
-                LogService.create(
-                    db,
-                    bot_id=self.bot_id,
-                    bot_nome=self.bot_nome,
-                    origem=str(origem),
-                    destino=str(destino),
-                    status="erro",
-                    mensagem=str(e)[:200],
+                espera = await self._enviar(item)
+            except BaseException:
+                # Cancelado no shutdown (ou erro inesperado) antes de concluir:
+                # o item fica na cabeça e no outbox, e volta após o restart
+                self.fila_envio.concluir(destino, remover=False)
+                self._atualizar_metricas_fila()
+                raise
+            if espera is None:
+                self.fila_envio.concluir(destino)
+                if self._outbox is not None:
+                    self._outbox.confirmar(item)
+            else:
+                # FloodWait: só este destino para; o item mantém a posição
+                self.fila_envio.estacionar(destino, espera)
+            self._atualizar_metricas_fila()
+
+    async def _enviar(self, item: ItemEnvio) -> float | None:
+        """Envia um item; em FloodWait ou falha transitória retorna os segundos
+        até tentar de novo o destino."""
+        # Anti-flood: espera ficha do destino e da conta antes de enviar
+        await self._limitador.adquirir(item.destino)
+
+        inicio = time.monotonic()
+        try:
+            await self._entregar(item)
+
+            agora = time.monotonic()
+            self.metricas.incrementar("enviadas")
+            self.metricas.observar("envio_ms", (agora - inicio) * 1000)
+            self.metricas.observar(
+                f"latencia_ms[{item.destino}]", (agora - item.criado) * 1000
+            )
+            self._registrar_log(item, "sucesso", (item.texto or "")[:200])
+            logger.info(
+                "🚀 [%s] %s → %s (regra: %s)",
+                self.bot_nome, item.origem, item.destino, item.regra_nome,
+            )
+            self._concluir(item, True)
+        except (FloodWaitError, SlowModeWaitError) as e:
+            return self._registrar_flood(item.destino, e)
+        except _ERROS_TRANSITORIOS as e:
+            if item.tentativas < settings.SEND_MAX_TENTATIVAS:
+                return self._reenviar(item, e)
+            self.metricas.incrementar("erros_envio")
+            self._registrar_log(item, "erro", str(e)[:200])
+            logger.error(
+                "[%s] Envio %s → %s falhou após %d tentativa(s): %s",
+                self.bot_nome, item.origem, item.destino, item.tentativas + 1, e,
+            )
+            self._concluir(item, False)
+        except Exception as e:
+            self.metricas.incrementar("erros_envio")
+            self._registrar_log(item, "erro", str(e)[:200])
+            logger.error(
+                "[%s] Erro ao enviar %s → %s: %s",
+                self.bot_nome, item.origem, item.destino, e,
+            )
+            self._concluir(item, False)
+        return None
+
+    def _concluir(self, item: ItemEnvio, sucesso: bool) -> None:
+        """Avisa quem enfileirou (ex.: agendamento sequencial) que o envio acabou."""
+        if item.ao_concluir is None:
+            return
+        try:
+            item.ao_concluir(item, sucesso)
+        except Exception as e:
+            logger.error(
+                "[%s] Erro ao concluir envio para %s (regra: %s): %s",
+                self.bot_nome, item.destino, item.regra_nome, e,
+            )
+
+    def _registrar_log(self, item: ItemEnvio, status: str, mensagem: str) -> None:
+        if item.rotulo_log:
+            mensagem = f"{item.rotulo_log} {mensagem}"[:200]
+        self.log_sink.registrar(
+            bot_id=self.bot_id,
+            bot_nome=self.bot_nome,
+            origem=str(item.origem),
+            destino=str(item.destino),
+            status=status,
+            mensagem=mensagem,
+            regra_id=item.regra_id,
+        )
+
+    async def _entregar(self, item: ItemEnvio) -> None:
+        """Uma única chamada ao Telegram: forward nativo ou envio."""
+        if item.mensagens_ids:
+            try:
+                await self.client.forward_messages(
+                    item.destino,
+                    item.mensagens_ids,
+                    item.encaminhar_de,
+                    drop_author=item.sem_autor,
                 )
-                logger.error(
-                    "[%s] Erro ao enviar %s → %s: %s",
-                    self.bot_nome, origem, destino, e,
+                self.metricas.incrementar("encaminhadas_nativas")
+                return
+            except (ChatForwardsRestrictedError, MessageIdInvalidError) as e:
+                # Origem protegida ou mensagem apagada: envia por referência
+                self.metricas.incrementar("encaminhamento_fallback")
+                logger.debug(
+                    "[%s] Forward para %s indisponível (%s); usando envio",
+                    self.bot_nome, item.destino, e,
                 )
-            finally:
-                db.close()
+        # Envia com mídia (foto/vídeo/doc) ou só texto
+        if item.media:
+            await self.client.send_file(
+                item.destino, item.media, caption=item.texto or None
+            )
+        else:
+            await self.client.send_message(item.destino, item.texto)
+
+    def _reenviar(self, item: ItemEnvio, erro) -> float:
+        """Rebaixa o item para a classe de reenvio e retorna o backoff do destino."""
+        item.tentativas += 1
+        self.fila_envio.adiar(item.destino)
+        if self._outbox is not None:
+            self._outbox.atualizar(item)
+        self.metricas.incrementar("reenvios")
+        espera = settings.SEND_REENVIO_ESPERA_SEGUNDOS * 2 ** (item.tentativas - 1)
+        logger.warning(
+            "[%s] Falha transitória ao enviar para %s (%s): tentativa %d em %ds",
+            self.bot_nome, item.destino, erro, item.tentativas + 1, espera,
+        )
+        return espera
+
+    def _registrar_flood(self, destino, erro) -> float:
+        """Decide o escopo do FloodWait e retorna por quanto estacionar o destino.
+
+        SlowMode é sempre do chat. FloodWait de um envio para um peer vale para
+        o destino, a menos que outro destino tenha levado FloodWait há pouco
+        (sinal de limite da conta); FloodWait de requests sem peer (ex.: upload
+        de arquivo) vale para a conta inteira.
+        """
+        segundos = erro.seconds
+        agora = time.monotonic()
+        self.metricas.incrementar("flood_waits")
+
+        conta = False
+        if isinstance(erro, FloodWaitError):
+            requisicao = getattr(erro, "request", None)
+            por_peer = any(
+                getattr(requisicao, campo, None) is not None
+                for campo in ("peer", "to_peer")
+            )
+            recentes = {
+                d
+                for d, instante in self._floods_recentes.items()
+                if agora - instante <= settings.FLOOD_JANELA_CONTA_SEGUNDOS
+            }
+            conta = not por_peer or bool(recentes - {destino})
+            self._floods_recentes = {d: self._floods_recentes[d] for d in recentes}
+            self._floods_recentes[destino] = agora
+
+        if conta:
+            self.metricas.incrementar("flood_waits_conta")
+            self._limitador.pausar_conta(segundos)
+            logger.warning(
+                "[%s] FloodWait da conta: envios pausados por %ds",
+                self.bot_nome, segundos,
+            )
+        else:
+            logger.warning(
+                "[%s] FloodWait em %s: destino estacionado por %ds",
+                self.bot_nome, destino, segundos,
+            )
+        return segundos
+
+    def _atualizar_metricas_fila(self) -> None:
+        self.metricas.definir("fila_profundidade", self.fila_envio.qsize())
+        self.metricas.definir("envios_em_voo", self.fila_envio.em_voo)
+        self.metricas.definir("destinos_estacionados", self.fila_envio.estacionados)
+        self.metricas.definir("destinos_prontos", self.fila_envio.prontos)
+        self.metricas.definir(
+            "fila_idade_max_s", round(self.fila_envio.idade_mais_antigo(), 1)
+        )
+
+    async def _relatorio_metricas_loop(self) -> None:
+        """Loga as métricas do worker periodicamente (quando houve atividade)."""
+        anterior: dict = {}
+        while self._running:
+            await asyncio.sleep(settings.METRICAS_INTERVALO_SEGUNDOS)
+            self._atualizar_metricas_fila()
+            atual = self.metricas.snapshot()
+            if atual != anterior:
+                logger.info("📊 [%s] %s", self.bot_nome, atual)
+                anterior = atual
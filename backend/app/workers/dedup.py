@@ -0,0 +1,65 @@
+"""Cache de deduplicação: evita enfileirar o mesmo conteúdo para o mesmo destino.
+
+Canais agregadores repostam a mesma oferta em várias origens e uma mensagem
+pode casar com várias regras do mesmo destino; cada cópia custaria um envio
+(e o delay anti-flood). A chave é um hash do texto final normalizado + id da
+mídia + destino, válida por uma janela (TTL) configurável por regra.
+"""
+
+import hashlib
+import re
+import time
+from collections import OrderedDict
+
+from app.core.config import settings
+
+_ESPACOS = re.compile(r"\s+")
+
+
+def chave_conteudo(texto: str | None, media_id, destino) -> bytes:
+    """Hash de (texto casefold com espaços colapsados, mídia, destino)."""
+    normalizado = _ESPACOS.sub(" ", (texto or "").casefold()).strip()
+    dados = f"{destino}\x00{media_id or ''}\x00{normalizado}"
+    return hashlib.blake2b(dados.encode(), digest_size=16).digest()
+
+
+class DedupCache:
+    """TTL cache limitado (LRU por ordem de inserção)."""
+
+    def __init__(self, capacidade: int | None = None, relogio=time.monotonic):
+        self.capacidade = capacidade or settings.DEDUP_MAX_ENTRADAS
+        self._relogio = relogio
+        # chave → instante de expiração (ordem de inserção = mais antiga primeiro)
+        self._entradas: OrderedDict[bytes, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def _expirar(self, agora: float) -> None:
+        entradas = self._entradas
+        while entradas:
+            chave, expira = next(iter(entradas.items()))
+            if expira > agora:
+                break
+            del entradas[chave]
+
+    def remover(self, chave: bytes) -> None:
+        """Esquece a chave (o envio registrado foi descartado)."""
+        self._entradas.pop(chave, None)
+
+    def registrar(self, chave: bytes, janela: float) -> bool:
+        """Registra a chave; True se ela já foi vista dentro da janela (duplicata).
+
+        Duplicatas não renovam a janela: a contagem parte do primeiro envio.
+        """
+        agora = self._relogio()
+        self._expirar(agora)
+        expira = self._entradas.get(chave)
+        if expira is not None and expira > agora:
+            return True
+
+        self._entradas[chave] = agora + janela
+        self._entradas.move_to_end(chave)
+        while len(self._entradas) > self.capacidade:
+            self._entradas.popitem(last=False)
+        return False
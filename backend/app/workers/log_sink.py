@@ -0,0 +1,121 @@
+"""Gravação em lote dos logs de execução (LogExecucao) dos workers.
+
+Em vez de um add/commit/refresh por mensagem no event loop (um fsync por
+envio, travando todos os bots do processo), os workers só acumulam o
+registro em memória; uma tarefa grava tudo com um INSERT em lote a cada
+LOG_LOTE registros ou LOG_FLUSH_MS, numa thread. O buffer é limitado a
+LOG_MAX_PENDENTES (os mais antigos são descartados se o banco travar) e o
+que restar é gravado no shutdown.
+"""
+
+import asyncio
+import contextlib
+import logging
+from collections import deque
+from datetime import datetime
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.log_service import LogService
+
+logger = logging.getLogger("conekta-bots.worker")
+
+
+class LogSink:
+    """Buffer de logs compartilhado pelos workers do manager."""
+
+    def __init__(
+        self,
+        lote: int | None = None,
+        flush_ms: int | None = None,
+        max_pendentes: int | None = None,
+        sessao=SessionLocal,
+    ):
+        self.lote = lote or settings.LOG_LOTE
+        self.intervalo = (flush_ms or settings.LOG_FLUSH_MS) / 1000
+        self._pendentes: deque[dict] = deque(
+            maxlen=max_pendentes or settings.LOG_MAX_PENDENTES
+        )
+        self._sessao = sessao
+        self._cheio: asyncio.Event | None = None
+        self.gravados = 0
+        self.descartados = 0
+
+    def __len__(self) -> int:
+        return len(self._pendentes)
+
+    def registrar(
+        self,
+        bot_id: int,
+        bot_nome: str,
+        origem: str,
+        destino: str,
+        status: str,
+        mensagem: str,
+        regra_id: int | None = None,
+    ) -> None:
+        """Acumula um log (gravado no próximo flush); não bloqueia."""
+        if len(self._pendentes) == self._pendentes.maxlen:
+            self.descartados += 1
+        self._pendentes.append(
+            {
+                "bot_id": bot_id,
+                "bot_nome": bot_nome,
+                "origem": origem,
+                "destino": destino,
+                "status": status,
+                "mensagem": mensagem,
+                "regra_id": regra_id,
+                # Hora do evento, não a do flush
+                "data_hora": datetime.now(),
+            }
+        )
+        if self._cheio is not None and len(self._pendentes) >= self.lote:
+            self._cheio.set()
+
+    def _gravar(self, registros: list[dict]) -> None:
+        db = self._sessao()
+        try:
+            LogService.create_many(db, registros)
+        finally:
+            db.close()
+
+    async def flush(self) -> None:
+        """Grava em uma transação tudo que foi acumulado desde o último flush."""
+        if not self._pendentes:
+            return
+        registros = list(self._pendentes)
+        self._pendentes.clear()
+        try:
+            await asyncio.to_thread(self._gravar, registros)
+        except Exception:
+            # Devolve ao buffer (na frente) para o próximo flush; o limite
+            # descarta os mais antigos se o banco continuar indisponível
+            espaco = self._pendentes.maxlen - len(self._pendentes)
+            self.descartados += max(0, len(registros) - espaco)
+            self._pendentes.extendleft(reversed(registros[-espaco:] if espaco else []))
+            raise
+        self.gravados += len(registros)
+
+    async def executar(self) -> None:
+        """Loop de flush: a cada LOG_FLUSH_MS ou quando o lote enche."""
+        self._cheio = asyncio.Event()
+        descartados = 0
+        while True:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._cheio.wait(), self.intervalo)
+            self._cheio.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Erro ao gravar logs de execução: %s", e)
+            if self.descartados != descartados:
+                logger.warning(
+                    "Buffer de logs cheio: %d log(s) descartado(s)",
+                    self.descartados - descartados,
+                )
+                descartados = self.descartados
+
+    async def fechar(self) -> None:
+        """Flush final (shutdown do manager)."""
+        await self.flush()
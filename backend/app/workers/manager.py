@@ -5,10 +5,15 @@ import logging
 
 from sqlalchemy import select
 
+from app.core.config import settings
 from app.db.base import Base
 from app.db.session import SessionLocal, engine
 from app.models.bot import Bot
 from app.workers.bot_worker import BotWorker
+from app.workers.log_sink import LogSink
+from app.workers.outbox import Outbox
+from app.workers.regex_sandbox import RegexSandbox
+from app.workers.retention import RetentionWorker
 from app.workers.scheduler_worker import SchedulerWorker
 
 logging.basicConfig(
@@ -46,28 +51,47 @@ async def main() -> None:
     finally:
         db.close()
 
+    # Retenção dos logs de execução (roda mesmo sem bots ativos)
+    retencao = RetentionWorker()
+
     if not bots_ativos:
         logger.warning("Nenhum bot ativo encontrado. Manager aguardando...")
         # Fica rodando para não encerrar o container
-        while True:
-            await asyncio.sleep(60)
+        await retencao.executar()
         return
 
     logger.info("Iniciando %d bot(s) ativo(s)", len(bots_ativos))
 
-    tarefas = []
+    # Um único sandbox de regex para todos os bots do processo
+    regex_sandbox = RegexSandbox()
+    # Outbox durável compartilhado (opcional): gravado em lote por uma tarefa
+    outbox = Outbox() if settings.OUTBOX_ATIVO else None
+    # Logs de execução de todos os workers, gravados em lote fora do loop
+    log_sink = LogSink()
+
+    tarefas = [log_sink.executar(), retencao.executar()]
+    if outbox is not None:
+        tarefas.append(outbox.executar())
     for bot_data in bots_ativos:
         # Worker de regras (encaminhamento)
-        worker = BotWorker(bot_data)
+        worker = BotWorker(
+            bot_data, regex_sandbox=regex_sandbox, outbox=outbox, log_sink=log_sink
+        )
         tarefas.append(worker.start())
 
-        # Worker de agendamentos
-        scheduler = SchedulerWorker(bot_data)
+        # Worker de agendamentos (envia pela fila do worker, com prioridade)
+        scheduler = SchedulerWorker(bot_data, bot_worker=worker, log_sink=log_sink)
         tarefas.append(scheduler.start())
 
         logger.info("  → %s (id=%d)", bot_data.nome, bot_data.id)
 
-    await asyncio.gather(*tarefas)
+    try:
+        await asyncio.gather(*tarefas)
+    finally:
+        regex_sandbox.fechar()
+        await log_sink.fechar()
+        if outbox is not None:
+            await outbox.fechar()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,45 @@
+"""Métricas em memória dos workers (contadores e medidores por bot)."""
+
+from collections import Counter, OrderedDict
+
+from app.core.config import settings
+
+
+class Metricas:
+    """Contadores (só crescem) e medidores (valor atual) de um worker.
+
+    Medidores com rótulo (ex.: "latencia_ms[-100123]") são limitados a
+    `max_rotulados`: os observados há mais tempo saem primeiro, então
+    destinos que deixaram de receber envios não se acumulam.
+    """
+
+    def __init__(self, max_rotulados: int | None = None):
+        self.contadores: Counter[str] = Counter()
+        self.medidores: dict[str, float] = {}
+        self.max_rotulados = max_rotulados or settings.METRICAS_MAX_ROTULOS
+        # Medidores com rótulo, do observado há mais tempo ao mais recente
+        self._rotulados: OrderedDict[str, None] = OrderedDict()
+
+    def incrementar(self, nome: str, valor: int = 1) -> None:
+        self.contadores[nome] += valor
+
+    def definir(self, nome: str, valor: float) -> None:
+        self.medidores[nome] = valor
+
+    def observar(self, nome: str, valor: float, peso: float = 0.2) -> None:
+        """Média móvel exponencial (ex.: latência por destino)."""
+        anterior = self.medidores.get(nome)
+        if anterior is None:
+            self.medidores[nome] = valor
+        else:
+            self.medidores[nome] = anterior + peso * (valor - anterior)
+        if "[" in nome:
+            self._rotulados[nome] = None
+            self._rotulados.move_to_end(nome)
+            while len(self._rotulados) > self.max_rotulados:
+                antigo, _ = self._rotulados.popitem(last=False)
+                self.medidores.pop(antigo, None)
+
+    def snapshot(self) -> dict[str, float]:
+        """Cópia de todos os valores (para log/exportação)."""
+        return {**self.contadores, **self.medidores}
@@ -0,0 +1,298 @@
+"""Outbox durável (SQLite/WAL) para a fila de envio.
+
+A fila em memória (FilaEnvio) continua sendo a fonte do envio; o outbox é um
+registro dela em disco: cada item enfileirado é gravado, confirmado (apagado)
+após o envio e, ao iniciar, os pendentes do bot são reivindicados e voltam
+para a fila. Cada processo grava os itens com o próprio `dono`, então a
+reivindicação pega só o que ficou de execuções anteriores. Gravações e
+confirmações são acumuladas em memória e escritas em lote (executemany) por
+uma única tarefa, fora do event loop.
+
+Itens enfileirados há menos de OUTBOX_FLUSH_MS ainda podem se perder em um
+crash; todo o resto sobrevive a restart do manager.
+"""
+
+import asyncio
+import contextlib
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from telethon import utils
+from telethon.extensions import BinaryReader
+
+from app.core.config import settings
+from app.workers.send_queue import ItemEnvio
+
+logger = logging.getLogger("conekta-bots.worker")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id TEXT PRIMARY KEY,
+    bot_id INTEGER NOT NULL,
+    destino TEXT NOT NULL,
+    texto TEXT,
+    media BLOB,
+    regra_nome TEXT,
+    origem TEXT,
+    criado REAL NOT NULL,
+    dono TEXT,
+    prioridade INTEGER NOT NULL DEFAULT 1,
+    regra_id INTEGER,
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    encaminhar_de TEXT,
+    mensagens_ids TEXT,
+    sem_autor INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ix_outbox_bot_dono ON outbox (bot_id, dono, criado);
+"""
+
+
+def serializar_media(media) -> bytes | None:
+    """Referência compacta (InputMedia em bytes TL) em vez do objeto Telethon.
+
+    Álbuns (lista de mídias) viram os objetos TL concatenados.
+    """
+    if not media:
+        return None
+    try:
+        if isinstance(media, list):
+            return b"".join(bytes(utils.get_input_media(m)) for m in media)
+        return bytes(utils.get_input_media(media))
+    except (TypeError, ValueError):
+        # Ex.: preview de link — o Telegram gera de novo a partir do texto
+        return None
+
+
+def restaurar_media(dados: bytes | None):
+    if not dados:
+        return None
+    leitor = BinaryReader(dados)
+    objetos = []
+    while leitor.tell_position() < len(dados):
+        objetos.append(leitor.tgread_object())
+    return objetos[0] if len(objetos) == 1 else objetos
+
+
+def _peer_para_texto(peer) -> str | None:
+    """Destino/origem (chat_id int ou '@username') com o tipo preservado."""
+    if peer is None:
+        return None
+    return f"i:{peer}" if isinstance(peer, int) else f"s:{peer}"
+
+
+def _peer_de_texto(valor: str | None):
+    if valor is None:
+        return None
+    tipo, _, peer = valor.partition(":")
+    return int(peer) if tipo == "i" else peer
+
+
+class Outbox:
+    """Tabela `outbox` compartilhada por todos os bots do manager."""
+
+    def __init__(
+        self,
+        caminho: str | None = None,
+        lote: int | None = None,
+        flush_ms: int | None = None,
+    ):
+        self.caminho = caminho or settings.OUTBOX_PATH
+        self.lote = lote or settings.OUTBOX_LOTE
+        self.intervalo = (flush_ms or settings.OUTBOX_FLUSH_MS) / 1000
+        if self.caminho != ":memory:":
+            Path(self.caminho).parent.mkdir(parents=True, exist_ok=True)
+        self._conexao = sqlite3.connect(
+            self.caminho, check_same_thread=False, isolation_level=None
+        )
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("PRAGMA synchronous=NORMAL")
+        self._conexao.executescript(_SCHEMA)
+        # Uma conexão: gravações (thread do flush) e claims serializados
+        self._trava = threading.Lock()
+        # Pendentes de gravação: id → (bot_id, item, criado); tentativas e
+        # prioridade de itens já gravados: id → (tentativas, prioridade);
+        # confirmações: ids
+        self._inserir: dict[str, tuple] = {}
+        self._atualizar: dict[str, tuple] = {}
+        self._apagar: list[str] = []
+        self._cheio: asyncio.Event | None = None
+        # Identifica esta execução: o que tiver outro dono ficou de um restart
+        self.dono = uuid.uuid4().hex
+
+    def adicionar(self, bot_id: int, item) -> None:
+        """Registra o item (gravado no próximo flush) e define `item.outbox_id`."""
+        item.outbox_id = uuid.uuid4().hex
+        self._inserir[item.outbox_id] = (bot_id, item, time.time())
+        self._sinalizar()
+
+    def atualizar(self, item) -> None:
+        """Tentativas/prioridade do item mudaram (reenvio): regrava no flush."""
+        outbox_id = getattr(item, "outbox_id", None)
+        # Ainda não gravado: a linha sai do item no flush, já atualizada
+        if outbox_id is None or outbox_id in self._inserir:
+            return
+        self._atualizar[outbox_id] = (item.tentativas, item.prioridade)
+        self._sinalizar()
+
+    def confirmar(self, item) -> None:
+        """Item enviado (ou descartado): remove do outbox."""
+        outbox_id = getattr(item, "outbox_id", None)
+        if outbox_id is None:
+            return
+        self._atualizar.pop(outbox_id, None)
+        # Enviado antes do flush: nem chega a ser gravado
+        if self._inserir.pop(outbox_id, None) is None:
+            self._apagar.append(outbox_id)
+            self._sinalizar()
+
+    def _sinalizar(self) -> None:
+        pendentes = len(self._inserir) + len(self._atualizar) + len(self._apagar)
+        if self._cheio is not None and pendentes >= self.lote:
+            self._cheio.set()
+
+    def _linha(self, bot_id: int, item, criado: float) -> tuple:
+        mensagens_ids = getattr(item, "mensagens_ids", None)
+        return (
+            item.outbox_id,
+            bot_id,
+            _peer_para_texto(item.destino),
+            item.texto,
+            serializar_media(item.media),
+            item.regra_nome,
+            _peer_para_texto(item.origem),
+            criado,
+            self.dono,
+            item.prioridade,
+            item.regra_id,
+            item.tentativas,
+            _peer_para_texto(item.encaminhar_de),
+            ",".join(map(str, mensagens_ids)) if mensagens_ids else None,
+            int(item.sem_autor),
+        )
+
+    def _gravar(
+        self, linhas: list[tuple], atualizacoes: list[tuple], ids: list[str]
+    ) -> None:
+        with self._trava:
+            conexao = self._conexao
+            conexao.execute("BEGIN")
+            try:
+                if linhas:
+                    conexao.executemany(
+                        "INSERT OR IGNORE INTO outbox (id, bot_id, destino, texto,"
+                        " media, regra_nome, origem, criado, dono, prioridade,"
+                        " regra_id, tentativas, encaminhar_de, mensagens_ids,"
+                        " sem_autor)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        linhas,
+                    )
+                if atualizacoes:
+                    conexao.executemany(
+                        "UPDATE outbox SET tentativas = ?, prioridade = ? WHERE id = ?",
+                        atualizacoes,
+                    )
+                if ids:
+                    conexao.executemany(
+                        "DELETE FROM outbox WHERE id = ?", ((i,) for i in ids)
+                    )
+                conexao.execute("COMMIT")
+            except Exception:
+                conexao.execute("ROLLBACK")
+                raise
+
+    async def flush(self) -> None:
+        """Grava em uma transação tudo que foi acumulado desde o último flush."""
+        if not (self._inserir or self._atualizar or self._apagar):
+            return
+        inserir, self._inserir = self._inserir, {}
+        atualizar, self._atualizar = self._atualizar, {}
+        ids, self._apagar = self._apagar, []
+        linhas = [self._linha(*pendente) for pendente in inserir.values()]
+        atualizacoes = [(*valores, i) for i, valores in atualizar.items()]
+        try:
+            await asyncio.to_thread(self._gravar, linhas, atualizacoes, ids)
+        except Exception:
+            # Transação desfeita: devolve ao buffer para o próximo flush
+            self._inserir = {**inserir, **self._inserir}
+            self._atualizar = {**atualizar, **self._atualizar}
+            self._apagar = ids + self._apagar
+            raise
+
+    async def executar(self) -> None:
+        """Loop de flush: a cada OUTBOX_FLUSH_MS ou quando o lote enche."""
+        self._cheio = asyncio.Event()
+        while True:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._cheio.wait(), self.intervalo)
+            self._cheio.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Erro ao gravar outbox: %s", e)
+
+    def _reivindicar(self, bot_id: int) -> list[tuple]:
+        with self._trava:
+            return self._conexao.execute(
+                "UPDATE outbox SET dono = ? WHERE bot_id = ? AND dono IS NOT ?"
+                " RETURNING id, bot_id, destino, texto, media, regra_nome, origem,"
+                " criado, dono, prioridade, regra_id, tentativas, encaminhar_de,"
+                " mensagens_ids, sem_autor",
+                (self.dono, bot_id, self.dono),
+            ).fetchall()
+
+    async def reivindicar(self, bot_id: int) -> list[ItemEnvio]:
+        """Pendentes do bot deixados por execuções anteriores, em ordem.
+
+        Retorna ItemEnvio já com `outbox_id`, prontos para voltar à fila, com
+        prioridade, regra, tentativas, forward nativo e idade restaurados.
+        """
+        linhas = await asyncio.to_thread(self._reivindicar, bot_id)
+        agora, agora_monotonico = time.time(), time.monotonic()
+        itens = []
+        for (
+            outbox_id,
+            _bot_id,
+            destino,
+            texto,
+            media,
+            regra_nome,
+            origem,
+            criado,
+            _dono,
+            prioridade,
+            regra_id,
+            tentativas,
+            encaminhar_de,
+            mensagens_ids,
+            sem_autor,
+        ) in sorted(linhas, key=lambda linha: linha[7]):
+            item = ItemEnvio(
+                _peer_de_texto(destino),
+                texto,
+                restaurar_media(media),
+                regra_nome,
+                _peer_de_texto(origem),
+                prioridade,
+            )
+            item.outbox_id = outbox_id
+            item.regra_id = regra_id
+            item.tentativas = tentativas
+            # Idade real (envelhecimento na fila e latência contam o restart)
+            item.criado = agora_monotonico - max(agora - criado, 0)
+            item.encaminhar_de = _peer_de_texto(encaminhar_de)
+            if mensagens_ids:
+                item.mensagens_ids = [int(i) for i in mensagens_ids.split(",")]
+            item.sem_autor = bool(sem_autor)
+            itens.append(item)
+        return itens
+
+    async def fechar(self) -> None:
+        """Flush final e fechamento da conexão (shutdown do manager)."""
+        try:
+            await self.flush()
+        finally:
+            self._conexao.close()
@@ -0,0 +1,119 @@
+"""Rate limiting de envios: token bucket por destino + bucket global da conta.
+
+Substitui o sleep aleatório de 2–5 s após cada envio. Cada chat de destino tem
+o próprio balde (limite do Telegram por chat) e todos compartilham o balde da
+conta; um envio só sai quando os dois têm ficha.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+
+from app.core.config import settings
+
+
+class TokenBucket:
+    """Balde de fichas: `taxa` fichas por segundo, até `capacidade` acumuladas."""
+
+    __slots__ = ("taxa", "capacidade", "fichas", "atualizado", "_relogio")
+
+    def __init__(self, taxa: float, capacidade: float, relogio=time.monotonic):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.fichas = capacidade
+        self._relogio = relogio
+        self.atualizado = relogio()
+
+    def _repor(self) -> None:
+        agora = self._relogio()
+        self.fichas = min(
+            self.capacidade, self.fichas + (agora - self.atualizado) * self.taxa
+        )
+        self.atualizado = agora
+
+    def espera(self) -> float:
+        """Segundos até haver uma ficha (0 se já houver)."""
+        self._repor()
+        if self.fichas >= 1:
+            return 0.0
+        return (1 - self.fichas) / self.taxa
+
+    def consumir(self) -> None:
+        self._repor()
+        self.fichas -= 1
+
+    def pausar(self, segundos: float) -> None:
+        """Zera o balde de forma que a próxima ficha só exista após `segundos`."""
+        self._repor()
+        self.fichas = min(self.fichas, 1 - segundos * self.taxa)
+
+    @property
+    def cheio(self) -> bool:
+        self._repor()
+        return self.fichas >= self.capacidade
+
+
+class RateLimiter:
+    """Limites de envio de um bot (uma conta do Telegram)."""
+
+    def __init__(
+        self,
+        por_minuto_destino: float | None = None,
+        rajada_destino: int | None = None,
+        por_minuto_global: float | None = None,
+        rajada_global: int | None = None,
+        max_destinos: int = 1000,
+        relogio=time.monotonic,
+    ):
+        self.taxa_destino = (
+            por_minuto_destino or settings.SEND_LIMITE_DESTINO_POR_MINUTO
+        ) / 60
+        self.rajada_destino = rajada_destino or settings.SEND_RAJADA_DESTINO
+        self.max_destinos = max_destinos
+        self._relogio = relogio
+        self.global_ = TokenBucket(
+            (por_minuto_global or settings.SEND_LIMITE_GLOBAL_POR_MINUTO) / 60,
+            rajada_global or settings.SEND_RAJADA_GLOBAL,
+            relogio,
+        )
+        self._destinos: OrderedDict = OrderedDict()
+
+    def _balde(self, destino) -> TokenBucket:
+        balde = self._destinos.get(destino)
+        if balde is None:
+            balde = TokenBucket(self.taxa_destino, self.rajada_destino, self._relogio)
+            self._destinos[destino] = balde
+            if len(self._destinos) > self.max_destinos:
+                self._descartar_ociosos()
+        else:
+            self._destinos.move_to_end(destino)
+        return balde
+
+    def _descartar_ociosos(self) -> None:
+        """Remove baldes cheios (equivalem a um balde novo) dos menos usados."""
+        for destino in list(self._destinos):
+            if len(self._destinos) <= self.max_destinos:
+                break
+            if self._destinos[destino].cheio:
+                del self._destinos[destino]
+
+    def espera(self, destino) -> float:
+        """Segundos até `destino` poder enviar (0 = pode agora)."""
+        return max(self.global_.espera(), self._balde(destino).espera())
+
+    def tentar(self, destino) -> float:
+        """Consome as fichas se possível; senão retorna quanto esperar."""
+        espera = self.espera(destino)
+        if espera <= 0:
+            self.global_.consumir()
+            self._balde(destino).consumir()
+        return espera
+
+    def pausar_conta(self, segundos: float) -> None:
+        """FloodWait da conta: nenhum destino envia antes de `segundos`."""
+        self.global_.pausar(segundos)
+
+    async def adquirir(self, destino) -> None:
+        """Aguarda até haver ficha no destino e na conta, e consome ambas."""
+        while (espera := self.tentar(destino)) > 0:
+            await asyncio.sleep(espera)
@@ -0,0 +1,99 @@
+"""Sandbox de regex: executa regras com regex em processos separados com timeout.
+
+O `re` do CPython não libera o GIL durante o matching, então uma regex
+patológica travaria o event loop do manager inteiro (todos os bots). Aqui ela
+roda em um ProcessPoolExecutor limitado; se estourar o orçamento de tempo, os
+processos do pool são encerrados e o chamador recebe RegexTimeoutError.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.core.config import settings
+
+logger = logging.getLogger("conekta-bots.worker")
+
+
+class RegexTimeoutError(Exception):
+    """A avaliação excedeu o orçamento de tempo e foi cancelada."""
+
+
+def _aquecer() -> None:
+    """Tarefa vazia: força o start dos processos antes de medir tempo."""
+    import app.services.rule_engine  # noqa: F401
+
+
+class RegexSandbox:
+    """Pool de processos compartilhado por todos os workers do manager."""
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        timeout_ms: int | None = None,
+    ):
+        self.workers = workers or settings.REGEX_SANDBOX_WORKERS
+        self.timeout = (timeout_ms or settings.REGEX_TIMEOUT_MS) / 1000
+        self._pool: ProcessPoolExecutor | None = None
+        self._pronto: asyncio.Lock | None = None
+        # Só submete quando há processo livre: o timeout mede execução, não fila
+        self._vagas: asyncio.Semaphore | None = None
+
+    async def _obter_pool(self) -> ProcessPoolExecutor:
+        if self._pronto is None:
+            self._pronto = asyncio.Lock()
+        async with self._pronto:
+            if self._pool is None:
+                pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                loop = asyncio.get_running_loop()
+                await asyncio.gather(
+                    *(loop.run_in_executor(pool, _aquecer) for _ in range(self.workers))
+                )
+                self._pool = pool
+            return self._pool
+
+    def _descartar_pool(self, pool: ProcessPoolExecutor) -> None:
+        """Encerra os processos (inclusive o que está preso na regex)."""
+        if self._pool is pool:
+            self._pool = None
+        # ProcessPoolExecutor não cancela tarefas em execução: mata os processos
+        for processo in list((getattr(pool, "_processes", None) or {}).values()):
+            processo.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def executar(self, func, *args):
+        """Executa `func(*args)` em um processo do pool, com timeout.
+
+        Raises:
+            RegexTimeoutError: se a execução passar de `timeout` segundos.
+        """
+        if self._vagas is None:
+            self._vagas = asyncio.Semaphore(self.workers)
+        loop = asyncio.get_running_loop()
+        async with self._vagas:
+            for tentativa in range(2):
+                pool = await self._obter_pool()
+                futuro = loop.run_in_executor(pool, func, *args)
+                try:
+                    return await asyncio.wait_for(futuro, self.timeout)
+                except asyncio.TimeoutError:
+                    self._descartar_pool(pool)
+                    raise RegexTimeoutError(
+                        f"regex excedeu {int(self.timeout * 1000)}ms"
+                    ) from None
+                except BrokenProcessPool:
+                    # Pool derrubado por outra tarefa que estourou o tempo
+                    self._descartar_pool(pool)
+                    if tentativa:
+                        raise
+        return None
+
+    def fechar(self) -> None:
+        """Encerra o pool (shutdown do manager)."""
+        if self._pool is not None:
+            self._descartar_pool(self._pool)
@@ -0,0 +1,79 @@
+"""Job de retenção dos logs de execução (ver RetentionService).
+
+Roda dentro do manager a cada LOG_RETENCAO_INTERVALO_MINUTOS, numa thread
+(não trava o event loop dos bots). Também pode ser executado à mão:
+
+Uso (a partir de backend/):
+    python -m app.workers.retention
+    python -m app.workers.retention --converter-vacuum
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.retention_service import RetentionService
+
+logger = logging.getLogger("conekta-bots.manager")
+
+
+class RetentionWorker:
+    """Loop periódico de limpeza dos logs expirados."""
+
+    def __init__(self, intervalo_minutos: int | None = None, sessao=SessionLocal):
+        minutos = intervalo_minutos or settings.LOG_RETENCAO_INTERVALO_MINUTOS
+        self.intervalo = minutos * 60
+        self._sessao = sessao
+
+    def _executar(self) -> dict:
+        db = self._sessao()
+        try:
+            return RetentionService.executar(db)
+        finally:
+            db.close()
+
+    async def executar(self) -> None:
+        """Aplica a retenção agora e depois a cada intervalo (não retorna)."""
+        while True:
+            try:
+                relatorio = await asyncio.to_thread(self._executar)
+            except Exception as e:
+                logger.error("Erro na retenção de logs: %s", e)
+            else:
+                if relatorio["linhas"] or relatorio["bytes"]:
+                    logger.info(
+                        "🧹 Retenção: %d log(s) apagado(s), %.1f MB recuperado(s)",
+                        relatorio["linhas"],
+                        relatorio["bytes"] / 1024 / 1024,
+                    )
+            await asyncio.sleep(self.intervalo)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--converter-vacuum",
+        action="store_true",
+        help="liga auto_vacuum=INCREMENTAL (VACUUM completo; pare API e manager)",
+    )
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.converter_vacuum:
+            RetentionService.converter_vacuum(db)
+        relatorio = RetentionService.executar(db)
+    finally:
+        db.close()
+    print(
+        f"{relatorio['linhas']} log(s) apagado(s), "
+        f"{relatorio['bytes'] / 1024 / 1024:.1f} MB recuperado(s)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
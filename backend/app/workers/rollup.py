@@ -0,0 +1,41 @@
+"""Compactação dos rollups de analytics a partir da logexecucao.
+
+Os rollups são mantidos na gravação dos logs; este job reconstrói os
+buckets (carga inicial dos logs anteriores à tabela, ou correção depois de
+apagar logs).
+
+Uso (a partir de backend/):
+    python -m app.workers.rollup
+    python -m app.workers.rollup --bot 3 --desde 2026-10-01
+"""
+
+import argparse
+import sys
+from datetime import datetime
+
+from app.db.session import SessionLocal
+from app.services.analytics_service import AnalyticsService
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bot", type=int, default=None, help="só este bot")
+    parser.add_argument(
+        "--desde",
+        type=datetime.fromisoformat,
+        default=None,
+        help="reconstrói a partir deste dia (AAAA-MM-DD); padrão: tudo",
+    )
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        linhas = AnalyticsService.recompactar(db, bot_id=args.bot, desde=args.desde)
+    finally:
+        db.close()
+    print(f"{linhas} linha(s) de rollup gravada(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
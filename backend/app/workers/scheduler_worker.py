@@ -10,8 +10,10 @@ from telethon.sessions import StringSession
 from app.core.config import settings
 from app.db.session import SessionLocal
 from app.models.bot import Bot
-from app.services.log_service import LogService
 from app.services.schedule_service import ScheduleService
+from app.workers.bot_worker import BotWorker
+from app.workers.log_sink import LogSink
+from app.workers.send_queue import PRIORIDADE_AGENDADO, ItemEnvio, referencia_media
 
 logger = logging.getLogger("conekta-bots.scheduler")
 
@@ -19,7 +21,12 @@ logger = logging.getLogger("conekta-bots.scheduler")
 class SchedulerWorker:
     """Worker que verifica e executa agendamentos de envio de mensagens."""
 
-    def __init__(self, bot_data: Bot):
+    def __init__(
+        self,
+        bot_data: Bot,
+        bot_worker: BotWorker | None = None,
+        log_sink: LogSink | None = None,
+    ):
         self.bot_id = bot_data.id
         self.bot_nome = bot_data.nome
         self.api_id = int(bot_data.api_id)
@@ -29,6 +36,12 @@ class SchedulerWorker:
             StringSession(self.session_string), self.api_id, self.api_hash
         )
         self._running = False
+        # Envio pela fila do BotWorker (prioridade de agendamento, mesmos
+        # limites anti-flood); sem ele, envia direto pelo próprio client
+        self._bot_worker = bot_worker
+        # Logs gravados em lote (sink do manager; sem ele, um próprio)
+        self._log_sink_proprio = log_sink is None
+        self.log_sink = log_sink or LogSink()
 
     @staticmethod
     def _processar_chat_id(chat_id: str):
@@ -48,12 +61,17 @@ class SchedulerWorker:
             return
 
         self._running = True
-        await self._loop_verificacao()
+        if self._log_sink_proprio:
+            await asyncio.gather(self.log_sink.executar(), self._loop_verificacao())
+        else:
+            await self._loop_verificacao()
 
     async def stop(self) -> None:
         """Para o scheduler e desconecta."""
         self._running = False
         await self.client.disconnect()
+        if self._log_sink_proprio:
+            await self.log_sink.fechar()
         logger.info("Scheduler parado: %s", self.bot_nome)
 
     async def _loop_verificacao(self) -> None:
@@ -80,6 +98,28 @@ class SchedulerWorker:
         finally:
             db.close()
 
+    def _avancar_sequencia(self, agendamento_id: int, msg_id: int):
+        """Callback de conclusão do envio enfileirado de um agendamento sequencial.
+
+        Avança para a próxima mensagem só se o post foi entregue e a sequência
+        não mudou enquanto ele esperava na fila; falha ou descarte mantém o
+        post para o próximo horário.
+        """
+
+        def _ao_concluir(_item: ItemEnvio, sucesso: bool) -> None:
+            if not sucesso:
+                return
+            db = SessionLocal()
+            try:
+                agendamento = ScheduleService.get_by_id(db, agendamento_id, self.bot_id)
+                if agendamento and agendamento.msg_id_atual == msg_id:
+                    agendamento.msg_id_atual = msg_id + 1
+                    db.commit()
+            finally:
+                db.close()
+
+        return _ao_concluir
+
     async def _executar_agendamento(self, db, agendamento) -> None:
         """Executa um agendamento: busca mensagem na origem e envia ao destino."""
         try:
@@ -99,23 +139,42 @@ class SchedulerWorker:
                 return
 
             texto = mensagem.text or ""
-            # Envia o objeto Message completo (preserva mídia/formatação)
-            await self.client.send_message(destino, mensagem)
-
-            LogService.create(
-                db,
-                bot_id=self.bot_id,
-                bot_nome=self.bot_nome,
-                origem=agendamento.origem,
-                destino=agendamento.destino,
-                status="sucesso",
-                mensagem=f"[Agendamento: {agendamento.nome}] {texto[:150]}",
-            )
+            if self._bot_worker is not None:
+                # Texto com formatação (markdown) + mídia; o log de envio fica
+                # a cargo do worker de envio e a sequência só avança quando
+                # ele confirma o envio
+                item = ItemEnvio(
+                    destino,
+                    texto,
+                    referencia_media(mensagem.media),
+                    f"Agendamento: {agendamento.nome}",
+                    agendamento.origem,
+                    prioridade=PRIORIDADE_AGENDADO,
+                )
+                item.rotulo_log = f"[Agendamento: {agendamento.nome}]"
+                if agendamento.tipo_envio == "sequencial":
+                    item.ao_concluir = self._avancar_sequencia(
+                        agendamento.id, agendamento.msg_id_atual
+                    )
+                if not await self._bot_worker.enfileirar(item):
+                    raise RuntimeError("fila de envio cheia, agendamento descartado")
+            else:
+                # Envia o objeto Message completo (preserva mídia/formatação)
+                await self.client.send_message(destino, mensagem)
+
+                self.log_sink.registrar(
+                    bot_id=self.bot_id,
+                    bot_nome=self.bot_nome,
+                    origem=agendamento.origem,
+                    destino=agendamento.destino,
+                    status="sucesso",
+                    mensagem=f"[Agendamento: {agendamento.nome}] {texto[:150]}",
+                )
 
-            # Se envio sequencial, avança para próxima mensagem
-            if agendamento.tipo_envio == "sequencial":
-                agendamento.msg_id_atual += 1
-                db.commit()
+                # Se envio sequencial, avança para próxima mensagem
+                if agendamento.tipo_envio == "sequencial":
+                    agendamento.msg_id_atual += 1
+                    db.commit()
 
             logger.info(
                 "⏰ [%s] Agendamento '%s': %s → %s",
@@ -124,8 +183,7 @@ class SchedulerWorker:
             )
 
         except Exception as e:
-            LogService.create(
-                db,
+            self.log_sink.registrar(
                 bot_id=self.bot_id,
                 bot_nome=self.bot_nome,
                 origem=agendamento.origem,
@@ -0,0 +1,439 @@
+"""Fila de envio de um bot, particionada por destino.
+
+Cada chat de destino tem a própria deque e só é atendido por um worker de
+envio por vez: a ordem é preservada dentro do destino, enquanto destinos
+diferentes são enviados em paralelo (um upload lento de vídeo não segura os
+canais só de texto).
+
+Os itens têm uma classe de prioridade (agendados > encaminhados > reenvios).
+Dentro de um destino, um item passa à frente dos pendentes de classe menor;
+entre destinos, os workers escolhem a classe por round-robin ponderado
+(`pesos`), e destinos cuja cabeça espera há mais de `envelhecimento` s
+concorrem com o peso da classe mais alta — nenhuma classe fica sem vez.
+
+Um destino em FloodWait fica estacionado até o prazo: o item continua na
+cabeça da deque (mantém a posição) e nenhum worker fica preso esperando.
+
+A fila é limitada (`capacidade`); cheia, aplica a política configurada:
+- "drop-oldest": descarta o item pendente mais antigo da classe menos
+  prioritária (de qualquer destino);
+- "drop-newest": descarta o item que está chegando;
+- "coalesce": o item novo substitui o último pendente da mesma classe no
+  mesmo destino (só a versão mais recente sobrevive à rajada); sem pendente,
+  cai em drop-oldest;
+- "block": o handler aguarda espaço até `bloqueio_max` s e então descarta o
+  item novo.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+
+from telethon import utils
+
+POLITICAS = ("drop-oldest", "drop-newest", "coalesce", "block")
+
+# Classes de prioridade (menor = mais urgente)
+PRIORIDADE_AGENDADO = 0
+PRIORIDADE_ENCAMINHADO = 1
+PRIORIDADE_REENVIO = 2
+
+
+def referencia_media(media):
+    """Só o que o envio precisa da mídia: a referência InputMedia.
+
+    O objeto do Telethon (Photo/Document com tamanhos, thumbs, atributos...)
+    não fica preso na fila. Álbum (lista) vira lista de referências; mídia
+    sem referência (ex.: preview de link) vira None — o Telegram gera o
+    preview de novo a partir do texto.
+    """
+    if not media:
+        return None
+    if isinstance(media, list):
+        referencias = [referencia_media(m) for m in media]
+        return [r for r in referencias if r is not None] or None
+    try:
+        return utils.get_input_media(media)
+    except (TypeError, ValueError):
+        return None
+
+
+class ItemEnvio:
+    """Uma mensagem pronta para envio (compacta: milhares podem esperar na fila)."""
+
+    __slots__ = (
+        "destino",
+        "texto",
+        "media",
+        "regra_nome",
+        "regra_id",
+        "origem",
+        "prioridade",
+        "tentativas",
+        "criado",
+        "outbox_id",
+        "encaminhar_de",
+        "mensagens_ids",
+        "sem_autor",
+        "chave_dedup",
+        "rotulo_log",
+        "ao_concluir",
+    )
+
+    def __init__(
+        self,
+        destino,
+        texto: str,
+        media,
+        regra_nome: str,
+        origem,
+        prioridade: int = PRIORIDADE_ENCAMINHADO,
+    ):
+        self.destino = destino
+        self.texto = texto
+        # InputMedia (ou lista, em álbuns) — ver referencia_media
+        self.media = media
+        self.regra_nome = regra_nome
+        # Regra que gerou o envio (dimensão dos rollups); None em agendamentos
+        self.regra_id: int | None = None
+        self.origem = origem
+        self.prioridade = prioridade
+        self.tentativas = 0
+        self.criado = time.monotonic()
+        # Chave no outbox durável (None se o outbox estiver desligado)
+        self.outbox_id: str | None = None
+        # Forward nativo (sem reupload): chat e ids das mensagens originais
+        self.encaminhar_de = None
+        self.mensagens_ids: list[int] | None = None
+        self.sem_autor = False
+        # Chave reservada no cache de deduplicação (liberada se descartado)
+        self.chave_dedup: bytes | None = None
+        # Prefixo da mensagem de log (ex.: "[Agendamento: X]")
+        self.rotulo_log: str | None = None
+        # ao_concluir(item, sucesso): chamado quando o envio termina (enviado,
+        # falhou de vez ou foi descartado pela fila); não é persistido no outbox
+        self.ao_concluir = None
+
+
+class FilaEnvio:
+    """Deques por destino + destinos prontos por classe de prioridade."""
+
+    def __init__(
+        self,
+        capacidade: int = 0,
+        politica: str = "drop-oldest",
+        bloqueio_max: float = 30.0,
+        ao_descartar=None,
+        pesos: tuple[int, ...] = (6, 3, 1),
+        envelhecimento: float = 60.0,
+    ):
+        if politica not in POLITICAS:
+            raise ValueError(f"Política de fila inválida: {politica!r}")
+        if len(pesos) != PRIORIDADE_REENVIO + 1 or min(pesos) <= 0:
+            raise ValueError(
+                f"Pesos de prioridade inválidos: {pesos!r} "
+                f"(esperado {PRIORIDADE_REENVIO + 1} inteiros positivos)"
+            )
+        # 0 = sem limite
+        self.capacidade = capacidade
+        self.politica = politica
+        self.bloqueio_max = bloqueio_max
+        self.pesos = tuple(pesos)
+        # 0 = sem promoção por idade
+        self.envelhecimento = envelhecimento
+        # Chamado com (item, motivo) a cada descarte (métricas, outbox)
+        self._ao_descartar = ao_descartar
+        self._por_destino: dict[object, deque[ItemEnvio]] = {}
+        # Destinos com itens e sem worker atendendo, por classe da cabeça.
+        # `_listados` diz em qual classe o destino está de fato: entradas que
+        # não batem (destino reservado, esvaziado ou promovido) são ignoradas
+        self._classes: list[deque] = [deque() for _ in self.pesos]
+        self._listados: dict[object, int] = {}
+        # Round-robin ponderado suave entre as classes
+        self._creditos = [0] * len(self.pesos)
+        self._pronto = asyncio.Event()
+        self._em_uso: set = set()
+        # Destinos em FloodWait → instante (monotonic) em que voltam a ficar prontos
+        self._estacionados: dict[object, float] = {}
+        self._total = 0
+        # Heap (criado, seq, item) para a idade do mais antigo sem varrer a
+        # fila; itens que saíram ficam no heap até chegarem ao topo (ids em
+        # `_na_fila` dizem quais ainda valem)
+        self._idades: list[tuple] = []
+        self._na_fila: set[int] = set()
+        self._sequencia = itertools.count()
+        # Sinaliza espaço livre para handlers bloqueados (política "block")
+        self._espaco: asyncio.Event | None = None
+
+    def qsize(self) -> int:
+        return self._total
+
+    def empty(self) -> bool:
+        return self._total == 0
+
+    def cheia(self) -> bool:
+        return bool(self.capacidade) and self._total >= self.capacidade
+
+    @property
+    def em_voo(self) -> int:
+        """Destinos sendo atendidos por algum worker agora."""
+        return len(self._em_uso)
+
+    @property
+    def estacionados(self) -> int:
+        return len(self._estacionados)
+
+    @property
+    def prontos(self) -> int:
+        """Destinos aguardando um worker livre."""
+        return len(self._listados)
+
+    def profundidade(self, destino) -> int:
+        return len(self._por_destino.get(destino, ()))
+
+    def idade_mais_antigo(self) -> float:
+        """Segundos desde a criação do item mais antigo ainda na fila."""
+        idades = self._idades
+        while idades and id(idades[0][2]) not in self._na_fila:
+            heapq.heappop(idades)
+        if not idades:
+            return 0.0
+        return time.monotonic() - idades[0][0]
+
+    def _registrar_idade(self, item: ItemEnvio) -> None:
+        self._na_fila.add(id(item))
+        heapq.heappush(self._idades, (item.criado, next(self._sequencia), item))
+
+    def _esquecer_idade(self, item: ItemEnvio) -> None:
+        self._na_fila.discard(id(item))
+        # Muitas entradas mortas no meio do heap: reconstrói só com as vivas
+        if len(self._idades) > 2 * self._total + 64:
+            self._idades = [e for e in self._idades if id(e[2]) in self._na_fila]
+            heapq.heapify(self._idades)
+
+    # ------------------------------------------------------------------
+    # Entrada (handlers de mensagem e agendamentos)
+    # ------------------------------------------------------------------
+
+    def _classe(self, item: ItemEnvio) -> int:
+        return min(max(item.prioridade, 0), len(self.pesos) - 1)
+
+    def _listar(self, destino) -> None:
+        """Coloca o destino livre entre os prontos, na classe da sua cabeça."""
+        itens = self._por_destino.get(destino)
+        if not itens or destino in self._em_uso or destino in self._estacionados:
+            return
+        classe = self._classe(itens[0])
+        if self._listados.get(destino) == classe:
+            return
+        self._listados[destino] = classe
+        self._classes[classe].append(destino)
+        self._pronto.set()
+
+    def _pendentes_desde(self, destino) -> int:
+        """Índice do primeiro item que pode mudar de lugar ou ser descartado.
+
+        A cabeça de um destino em envio ou estacionado fica onde está.
+        """
+        if destino in self._em_uso or destino in self._estacionados:
+            return 1
+        return 0
+
+    def _prioridade_efetiva(self, item: ItemEnvio, agora: float) -> float:
+        """Classe do item menos uma classe a cada `envelhecimento` de espera."""
+        if not self.envelhecimento:
+            return item.prioridade
+        return item.prioridade - (agora - item.criado) / self.envelhecimento
+
+    def _inserir(self, item: ItemEnvio) -> None:
+        itens = self._por_destino.get(item.destino)
+        if itens is None:
+            itens = self._por_destino[item.destino] = deque()
+        # Passa à frente dos pendentes de prioridade efetiva menor, atrás dos
+        # de igual ou maior: um reenvio que esperou o bastante deixa de ser
+        # ultrapassado pelos encaminhamentos novos do mesmo destino
+        agora = time.monotonic()
+        efetiva = self._prioridade_efetiva(item, agora)
+        limite = self._pendentes_desde(item.destino)
+        posicao = len(itens)
+        while (
+            posicao > limite
+            and self._prioridade_efetiva(itens[posicao - 1], agora) > efetiva
+        ):
+            posicao -= 1
+        itens.insert(posicao, item)
+        self._total += 1
+        self._registrar_idade(item)
+        # Destino ocioso entra entre os prontos; em uso, o worker o recoloca;
+        # estacionado, volta sozinho quando o prazo vencer
+        self._listar(item.destino)
+
+    def _remover(self, destino, indice: int) -> ItemEnvio:
+        itens = self._por_destino[destino]
+        item = itens[indice]
+        del itens[indice]
+        self._total -= 1
+        self._esquecer_idade(item)
+        if not itens:
+            del self._por_destino[destino]
+            self._listados.pop(destino, None)
+        else:
+            self._listar(destino)
+        return item
+
+    def _descartar(self, item: ItemEnvio, motivo: str) -> None:
+        if self._ao_descartar is not None:
+            self._ao_descartar(item, motivo)
+
+    def _descartar_mais_antigo(self) -> bool:
+        escolhido, chave = None, None
+        for destino, itens in self._por_destino.items():
+            limite = self._pendentes_desde(destino)
+            if len(itens) <= limite:
+                continue
+            # Primeiro pendente da classe menos prioritária do destino
+            indice = len(itens) - 1
+            while (
+                indice > limite and itens[indice - 1].prioridade == itens[-1].prioridade
+            ):
+                indice -= 1
+            candidato = (-itens[indice].prioridade, itens[indice].criado)
+            if chave is None or candidato < chave:
+                escolhido, chave = (destino, indice), candidato
+        if escolhido is None:
+            return False
+        self._descartar(self._remover(*escolhido), "drop-oldest")
+        return True
+
+    def _coalescer(self, item: ItemEnvio) -> bool:
+        """Troca o último pendente da classe no destino pelo item novo."""
+        itens = self._por_destino.get(item.destino)
+        if not itens:
+            return False
+        for indice in range(
+            len(itens) - 1, self._pendentes_desde(item.destino) - 1, -1
+        ):
+            if itens[indice].prioridade == item.prioridade:
+                substituido, itens[indice] = itens[indice], item
+                self._esquecer_idade(substituido)
+                self._registrar_idade(item)
+                self._descartar(substituido, "coalesce")
+                return True
+        return False
+
+    def put_nowait(self, item: ItemEnvio, forcar: bool = False) -> bool:
+        """Enfileira sem esperar; False se o próprio item foi descartado.
+
+        `forcar` ignora a capacidade (itens restaurados do outbox).
+        """
+        if forcar or not self.cheia():
+            self._inserir(item)
+            return True
+        if self.politica == "coalesce" and self._coalescer(item):
+            return True
+        if (
+            self.politica in ("drop-oldest", "coalesce")
+            and self._descartar_mais_antigo()
+        ):
+            self._inserir(item)
+            return True
+        # Em "block" o handler já esperou o máximo: o descarte é da política
+        self._descartar(item, "block" if self.politica == "block" else "drop-newest")
+        return False
+
+    async def put(self, item: ItemEnvio) -> bool:
+        """Enfileira aplicando a política; em "block" espera por espaço."""
+        if self.politica == "block" and self.cheia():
+            if self._espaco is None:
+                self._espaco = asyncio.Event()
+            prazo = time.monotonic() + self.bloqueio_max
+            while self.cheia() and (restante := prazo - time.monotonic()) > 0:
+                self._espaco.clear()
+                try:
+                    await asyncio.wait_for(self._espaco.wait(), restante)
+                except asyncio.TimeoutError:
+                    break
+        return self.put_nowait(item)
+
+    # ------------------------------------------------------------------
+    # Saída (workers de envio)
+    # ------------------------------------------------------------------
+
+    def _cabeca(self, classe: int):
+        """Primeiro destino válido da classe (descarta entradas obsoletas)."""
+        fila = self._classes[classe]
+        while fila:
+            if self._listados.get(fila[0]) == classe:
+                return fila[0]
+            fila.popleft()
+        return None
+
+    def _escolher(self):
+        """Round-robin ponderado suave entre as classes com destinos prontos."""
+        agora = time.monotonic()
+        escolhida, total = None, 0
+        for classe, peso in enumerate(self.pesos):
+            destino = self._cabeca(classe)
+            if destino is None:
+                self._creditos[classe] = 0
+                continue
+            # Cabeça esperando demais concorre como a classe mais alta
+            if (
+                self.envelhecimento
+                and agora - self._por_destino[destino][0].criado >= self.envelhecimento
+            ):
+                peso = self.pesos[0]
+            self._creditos[classe] += peso
+            total += peso
+            if escolhida is None or self._creditos[classe] > self._creditos[escolhida]:
+                escolhida = classe
+        if escolhida is None:
+            return None
+        self._creditos[escolhida] -= total
+        destino = self._classes[escolhida].popleft()
+        del self._listados[destino]
+        self._em_uso.add(destino)
+        return destino
+
+    async def proximo(self):
+        """Aguarda um destino pronto e o reserva para o worker chamador."""
+        while (destino := self._escolher()) is None:
+            self._pronto.clear()
+            await self._pronto.wait()
+        return destino
+
+    def primeiro(self, destino) -> ItemEnvio:
+        """Próximo item do destino reservado (continua na fila até `concluir`)."""
+        return self._por_destino[destino][0]
+
+    def concluir(self, destino, remover: bool = True) -> None:
+        """Libera o destino; `remover=False` mantém o item na cabeça (retry)."""
+        self._em_uso.discard(destino)
+        if remover:
+            self._remover(destino, 0)
+            if self._espaco is not None:
+                self._espaco.set()
+        else:
+            self._listar(destino)
+
+    def adiar(self, destino, prioridade: int = PRIORIDADE_REENVIO) -> None:
+        """Rebaixa a cabeça do destino reservado (reenvio após erro transitório).
+
+        O item continua na cabeça (a ordem do destino não muda e o backoff
+        vale para ele, não para um pendente que nunca falhou); a classe de
+        reenvio só pesa na escolha entre destinos.
+        """
+        self._por_destino[destino][0].prioridade = prioridade
+
+    def estacionar(self, destino, segundos: float) -> None:
+        """Libera o destino reservado mantendo o item na cabeça até o prazo."""
+        self._em_uso.discard(destino)
+        self._estacionados[destino] = time.monotonic() + segundos
+        asyncio.get_running_loop().call_later(segundos, self._reativar, destino)
+
+    def _reativar(self, destino) -> None:
+        if self._estacionados.pop(destino, None) is None:
+            return
+        self._listar(destino)
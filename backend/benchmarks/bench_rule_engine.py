@@ -0,0 +1,186 @@
+"""Micro-benchmark do pipeline de regras (filtros + substituição) do BotWorker.
+
+Executa o mesmo caminho síncrono do handler `_despachar` — MessageContext,
+autômato de palavras-chave e avaliação de cada RulePlan da origem — sobre um
+corpus sintético, para 1, 10, 100 e 1000 regras por bot.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_rule_engine                  # compara c/ baseline
+    python -m benchmarks.bench_rule_engine --salvar-baseline
+    task bench
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from app.services.message_context import MessageContext
+from app.services.rule_engine import RulePlan, RuleSet
+from benchmarks.corpus import TIPOS, gerar_corpus, gerar_planos
+
+BASELINE_PADRAO = Path(__file__).with_name("baselines.json")
+
+
+def montar_regras(planos: list[RulePlan]) -> RuleSet:
+    """RuleSet com o índice por origem (origens do corpus já são chat_ids)."""
+    por_origem: dict[int, list[RulePlan]] = {}
+    for plano in planos:
+        for origem in plano.origens:
+            por_origem.setdefault(origem, []).append(plano)
+    return RuleSet(planos, por_origem)
+
+
+def processar(regras: RuleSet, chat_id: int, texto: str) -> int:
+    """Mesmo fluxo do BotWorker._despachar, sem Telethon e sem fila."""
+    planos = regras.por_origem.get(chat_id)
+    if not planos:
+        return 0
+    contexto = MessageContext.de_texto(texto)
+    encontradas = regras.buscar_palavras(contexto.texto_normalizado)
+    encaminhadas = 0
+    for plano in planos:
+        if plano.avaliar(contexto, encontradas) is not None:
+            encaminhadas += 1
+    return encaminhadas
+
+
+def _percentil(valores: list[int], p: float) -> float:
+    indice = min(len(valores) - 1, int(round(p * (len(valores) - 1))))
+    return valores[indice]
+
+
+def _resumo(latencias: list[int]) -> dict:
+    latencias = sorted(latencias)
+    return {
+        "p50_us": round(_percentil(latencias, 0.50) / 1000, 1),
+        "p99_us": round(_percentil(latencias, 0.99) / 1000, 1),
+    }
+
+
+def _passada(regras: RuleSet, corpus: list[tuple[int, str, str]]) -> tuple:
+    """Uma passada cronometrada: (total_ns, latências, latências por tipo, enviadas)."""
+    latencias: list[int] = []
+    por_tipo: dict[str, list[int]] = {tipo: [] for tipo in TIPOS}
+    encaminhadas = 0
+    inicio = time.perf_counter_ns()
+    for chat_id, tipo, texto in corpus:
+        t0 = time.perf_counter_ns()
+        encaminhadas += processar(regras, chat_id, texto)
+        duracao = time.perf_counter_ns() - t0
+        latencias.append(duracao)
+        por_tipo[tipo].append(duracao)
+    return time.perf_counter_ns() - inicio, latencias, por_tipo, encaminhadas
+
+
+def medir(
+    n_regras: int, corpus: list[tuple[int, str, str]], repeticoes: int = 3
+) -> dict:
+    regras = montar_regras(gerar_planos(n_regras))
+
+    # Aquecimento (caches do re, cached_property, etc.)
+    for chat_id, _tipo, texto in corpus[:200]:
+        processar(regras, chat_id, texto)
+
+    # Melhor de N passadas: reduz o ruído de agendamento do SO no baseline
+    total_ns, latencias, por_tipo, encaminhadas = min(
+        (_passada(regras, corpus) for _ in range(repeticoes)), key=lambda p: p[0]
+    )
+
+    # Alocações em uma segunda passada (tracemalloc distorce o tempo)
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    for chat_id, _tipo, texto in corpus:
+        processar(regras, chat_id, texto)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "regras": n_regras,
+        "mensagens": len(corpus),
+        "encaminhadas": encaminhadas,
+        "msgs_s": round(len(corpus) / (total_ns / 1e9), 1),
+        **_resumo(latencias),
+        "pico_alloc_kb": round((pico - base) / 1024, 1),
+        "por_tipo": {tipo: _resumo(v) for tipo, v in por_tipo.items() if v},
+    }
+
+
+def comparar(resultados: list[dict], baseline: dict, tolerancia: float) -> bool:
+    """Imprime a variação contra o baseline; True se houve regressão."""
+    regressao = False
+    for r in resultados:
+        ref = baseline.get("cenarios", {}).get(str(r["regras"]))
+        if not ref:
+            continue
+        delta = (r["msgs_s"] - ref["msgs_s"]) / ref["msgs_s"]
+        marca = ""
+        if delta < -tolerancia:
+            marca = "  ⚠️ REGRESSÃO"
+            regressao = True
+        print(
+            f"  {r['regras']:>5} regras: {ref['msgs_s']:>10.1f} → "
+            f"{r['msgs_s']:>10.1f} msgs/s ({delta:+.1%}){marca}"
+        )
+    return regressao
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mensagens", type=int, default=2000)
+    parser.add_argument("--regras", default="1,10,100,1000")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PADRAO)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--salvar-baseline", action="store_true")
+    parser.add_argument(
+        "--tolerancia",
+        type=float,
+        default=0.25,
+        help="queda de msgs/s aceita antes de acusar regressão (0.25 = 25%%)",
+    )
+    args = parser.parse_args(argv)
+
+    corpus = gerar_corpus(args.mensagens)
+    resultados = []
+    print(
+        f"{'regras':>6} {'msgs/s':>10} {'p50 µs':>9} {'p99 µs':>9} "
+        f"{'pico KB':>9} {'encaminhadas':>12}"
+    )
+    for n in (int(x) for x in args.regras.split(",")):
+        r = medir(n, corpus, args.repeticoes)
+        resultados.append(r)
+        print(
+            f"{r['regras']:>6} {r['msgs_s']:>10.1f} {r['p50_us']:>9.1f} "
+            f"{r['p99_us']:>9.1f} {r['pico_alloc_kb']:>9.1f} {r['encaminhadas']:>12}"
+        )
+        for tipo, lat in r["por_tipo"].items():
+            print(
+                f"{'':>6} {tipo:>16} p50 {lat['p50_us']:>7.1f} "
+                f"p99 {lat['p99_us']:>7.1f}"
+            )
+
+    if args.salvar_baseline:
+        dados = {
+            "python": platform.python_version(),
+            "maquina": platform.machine(),
+            "mensagens": args.mensagens,
+            "cenarios": {str(r["regras"]): r for r in resultados},
+        }
+        texto = json.dumps(dados, indent=2, ensure_ascii=False)
+        args.baseline.write_text(texto + "\n", encoding="utf-8")
+        print(f"Baseline salvo em {args.baseline}")
+        return 0
+
+    if args.baseline.exists():
+        print(f"\nComparação com {args.baseline.name}:")
+        baseline = json.loads(args.baseline.read_text())
+        if comparar(resultados, baseline, args.tolerancia):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
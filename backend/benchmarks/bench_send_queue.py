@@ -0,0 +1,119 @@
+"""Memória por item da fila de envio: tupla com mídia do Telethon vs ItemEnvio.
+
+A forma antiga enfileirava `(destino, mensagem_final, media, regra_nome,
+chat_id)` com o objeto `media` do update (Photo/Document com tamanhos,
+thumbs e atributos); ItemEnvio tem __slots__ e guarda só a referência
+InputMedia. Mede com tracemalloc o que uma fila de N itens mantém vivo.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_send_queue
+    python -m benchmarks.bench_send_queue --itens 50000
+"""
+
+import argparse
+import random
+import sys
+import tracemalloc
+from datetime import datetime, timezone
+
+from telethon.tl.types import (
+    Document,
+    DocumentAttributeFilename,
+    DocumentAttributeVideo,
+    MessageMediaDocument,
+    MessageMediaPhoto,
+    Photo,
+    PhotoSize,
+    PhotoSizeProgressive,
+    PhotoStrippedSize,
+)
+
+from app.workers.send_queue import ItemEnvio, referencia_media
+from benchmarks.corpus import gerar_corpus
+
+
+def media_telethon(i: int, rng: random.Random):
+    """Mídia como chega num update: fotos (70%) e vídeos (30%)."""
+    data = datetime.now(timezone.utc)
+    referencia = rng.randbytes(16)
+    miniatura = PhotoStrippedSize("i", rng.randbytes(600))
+    if rng.random() < 0.7:
+        return MessageMediaPhoto(
+            photo=Photo(
+                id=i,
+                access_hash=rng.getrandbits(63),
+                file_reference=referencia,
+                date=data,
+                sizes=[
+                    miniatura,
+                    PhotoSize("m", 320, 320, 18000),
+                    PhotoSize("x", 800, 800, 75000),
+                    PhotoSizeProgressive("y", 1280, 1280, [9000, 30000, 90000]),
+                ],
+                dc_id=4,
+            )
+        )
+    return MessageMediaDocument(
+        document=Document(
+            id=i,
+            access_hash=rng.getrandbits(63),
+            file_reference=referencia,
+            date=data,
+            mime_type="video/mp4",
+            size=rng.randint(2_000_000, 50_000_000),
+            dc_id=4,
+            attributes=[
+                DocumentAttributeVideo(60.0, 1280, 720, supports_streaming=True),
+                DocumentAttributeFilename(f"video_{i}.mp4"),
+            ],
+            thumbs=[miniatura, PhotoSize("m", 320, 180, 12000)],
+        )
+    )
+
+
+def _medir(n: int, construir) -> float:
+    """Bytes retidos por item numa fila de `n` itens."""
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    fila = [construir(i) for i in range(n)]
+    atual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del fila
+    return (atual - base) / n
+
+
+def medir(n: int, seed: int = 42) -> dict:
+    textos = [texto for _chat, _tipo, texto in gerar_corpus(n, seed)]
+    regra_nome = "Ofertas"
+
+    def tupla(i: int):
+        rng = random.Random(i)
+        return (-1002, textos[i], media_telethon(i, rng), regra_nome, -1001)
+
+    def compacto(i: int):
+        rng = random.Random(i)
+        media = referencia_media(media_telethon(i, rng))
+        return ItemEnvio(-1002, textos[i], media, regra_nome, -1001)
+
+    return {"itens": n, "tupla": _medir(n, tupla), "compacto": _medir(n, compacto)}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--itens", type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    r = medir(args.itens)
+    print(f"{'forma':>10} {'bytes/item':>12} {'MB na fila':>12}")
+    for forma in ("tupla", "compacto"):
+        print(
+            f"{forma:>10} {r[forma]:>12.0f} "
+            f"{r[forma] * r['itens'] / 1024 / 1024:>12.1f}"
+        )
+    print(f"Redução: {1 - r['compacto'] / r['tupla']:.0%} ({r['itens']} itens)")
+    # Regressão: o item compacto não pode reter mais que a tupla
+    return 0 if r["compacto"] < r["tupla"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
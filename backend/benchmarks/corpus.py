@@ -0,0 +1,101 @@
+"""Corpus sintético para os benchmarks do motor de regras.
+
+Tudo é gerado a partir de uma seed fixa, então duas execuções produzem
+exatamente as mesmas mensagens e regras (comparáveis com o baseline).
+"""
+
+import random
+
+from app.services.rule_engine import RulePlan
+
+PALAVRAS = (
+    "oferta promoção desconto cupom frete grátis relâmpago imperdível preço "
+    "baixou menor histórico black friday liquidação compre agora estoque limitado "
+    "smartphone notebook fone bluetooth cafeteira airfryer tênis camiseta kit "
+    "parcelado vista pix boleto cashback loja oficial vendedor avaliação entrega "
+    "rápida hoje amanhã último dia aproveite garanta link abaixo clique aqui"
+).split()
+
+UNICODE = (
+    "🔥 ⚡ 💥 🛒 ✅ ❌ 👉 💰 São Paulo açúcar coração ÇÃO straße İstanbul ΣΊΣΥΦΟΣ "
+    "日本語 テスト 한국어 مرحبا"
+).split()
+
+ORIGENS = [-1001000000000 - i for i in range(20)]
+
+TIPOS = ("curto", "legenda_longa", "oferta_links", "unicode")
+
+
+def _frase(rng: random.Random, n: int, vocab=PALAVRAS) -> str:
+    return " ".join(rng.choice(vocab) for _ in range(n))
+
+
+def _link(rng: random.Random) -> str:
+    if rng.random() < 0.5:
+        return f"https://shopee.com.br/produto-i.{rng.randint(10**8, 10**9)}"
+    return f"https://amzn.to/{rng.randint(10**6, 10**7):x}"
+
+
+def gerar_mensagem(rng: random.Random, tipo: str) -> str:
+    if tipo == "curto":
+        return _frase(rng, rng.randint(3, 10)).capitalize()
+    if tipo == "legenda_longa":
+        return "\n".join(_frase(rng, rng.randint(12, 20)) for _ in range(8))
+    if tipo == "oferta_links":
+        linhas = [
+            f"🔥 {_frase(rng, 6).upper()}",
+            f"💰 R$ {rng.randint(9, 4999)},{rng.randint(0, 99):02d} no pix",
+            f"🎟️ Cupom: CUPOM{rng.randint(5, 50)}",
+        ]
+        linhas += [f"👉 {_link(rng)}" for _ in range(rng.randint(2, 6))]
+        linhas.append(f"#{rng.choice(PALAVRAS)} #{rng.choice(PALAVRAS)}")
+        return "\n".join(linhas)
+    return _frase(rng, rng.randint(10, 40), PALAVRAS + UNICODE)
+
+
+def gerar_corpus(n: int, seed: int = 42) -> list[tuple[int, str, str]]:
+    """Lista de (chat_id de origem, tipo, texto), alternando os quatro tipos."""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(n):
+        tipo = TIPOS[i % len(TIPOS)]
+        corpus.append((rng.choice(ORIGENS), tipo, gerar_mensagem(rng, tipo)))
+    return corpus
+
+
+def gerar_planos(n: int, seed: int = 7) -> list[RulePlan]:
+    """Regras com a mistura típica de bloqueios/obrigatórias/substituições."""
+    rng = random.Random(seed)
+    planos = []
+    for i in range(n):
+        # ~70% dos bloqueios não aparecem no corpus (ex.: "cupom42")
+        bloqueios = ", ".join(
+            rng.choice(PALAVRAS)
+            + (str(rng.randint(0, 99)) if rng.random() < 0.7 else "")
+            for _ in range(rng.randint(5, 20))
+        )
+        obrigatorias = None
+        if rng.random() < 0.5:
+            obrigatorias = ", ".join(
+                rng.choice(PALAVRAS) for _ in range(rng.randint(1, 4))
+            )
+            if rng.random() < 0.3:
+                obrigatorias += r", R\$\s*\d+"
+        substituto = None
+        if rng.random() < 0.5:
+            substituto = "|".join(
+                f"CUPOM{rng.randint(5, 50)}->MEUCUPOM{j}"
+                for j in range(rng.randint(1, 60))
+            )
+        planos.append(
+            RulePlan(
+                id=i + 1,
+                nome=f"regra-{i + 1}",
+                origens=rng.sample(ORIGENS, rng.randint(1, 3)),
+                destino=-1002000000000 - i,
+                bloqueios=bloqueios,
+                somente_se_tiver=obrigatorias,
+                substituto=substituto,
+            )
+        )
+    return planos
@@ -1,5 +1,7 @@
 """Fixtures compartilhadas para os testes."""
 
+from pathlib import Path
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
@@ -8,7 +10,7 @@ from sqlalchemy.pool import StaticPool
 
 from app.core.security import create_access_token, hash_password
 from app.db.base import Base
-from app.db.session import get_db
+from app.db.session import engine, get_db
 from app.main import app
 from app.models.user import User
 
@@ -23,6 +25,14 @@ engine_test = create_engine(
 TestingSessionLocal = sessionmaker(bind=engine_test, autoflush=False, autocommit=False)
 
 
+@pytest.fixture(scope="session", autouse=True)
+def _diretorio_do_banco():
+    """O lifespan do app (TestClient) cria as tabelas no banco configurado
+    (./data/database.db por padrão): o diretório precisa existir."""
+    if engine.url.database:
+        Path(engine.url.database).parent.mkdir(parents=True, exist_ok=True)
+
+
 @pytest.fixture(autouse=True)
 def db():
     """Cria tabelas antes de cada teste e dropa depois."""
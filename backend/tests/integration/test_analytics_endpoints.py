@@ -0,0 +1,96 @@
+"""Testes de integração para endpoints de analytics."""
+
+from datetime import datetime
+
+from app.services.log_service import LogService
+
+
+class TestAnalyticsEndpoints:
+    def _create_bot(self, client, auth_headers) -> int:
+        resp = client.post("/api/v1/bots/", headers=auth_headers, json={
+            "nome": "Bot Analytics",
+            "api_id": "12345",
+            "api_hash": "abc123",
+            "tipo": "user",
+        })
+        return resp.json()["id"]
+
+    def test_series_por_dia(self, client, auth_headers, db):
+        bot_id = self._create_bot(client, auth_headers)
+        LogService.create_many(db, [
+            {
+                "bot_id": bot_id, "bot_nome": "Bot Analytics", "origem": "-1001",
+                "destino": "-1002", "status": status, "mensagem": "msg",
+                "data_hora": datetime(2026, 10, 17, 15, 30),
+            }
+            for status in ("sucesso", "sucesso", "erro")
+        ])
+
+        resp = client.get(
+            f"/api/v1/analytics/series/{bot_id}",
+            headers=auth_headers,
+            params={
+                "granularidade": "dia",
+                "inicio": "2026-10-16T00:00:00",
+                "fim": "2026-10-18T00:00:00",
+            },
+        )
+        assert resp.status_code == 200
+        data = resp.json()
+        assert [(p["sucesso"], p["erro"]) for p in data["pontos"]] == [(0, 0), (2, 1)]
+        assert data["total_sucesso"] == 2
+
+    def test_series_granularidade_invalida(self, client, auth_headers):
+        bot_id = self._create_bot(client, auth_headers)
+        resp = client.get(
+            f"/api/v1/analytics/series/{bot_id}",
+            headers=auth_headers,
+            params={"granularidade": "semana"},
+        )
+        assert resp.status_code == 400
+
+    def test_series_bot_de_outro_usuario(self, client, auth_headers):
+        resp = client.get("/api/v1/analytics/series/999", headers=auth_headers)
+        assert resp.status_code == 404
+
+    def test_logs_paginados_por_cursor(self, client, auth_headers, db):
+        bot_id = self._create_bot(client, auth_headers)
+        for i in range(3):
+            LogService.create(
+                db, bot_id, "Bot Analytics", "-1001", "-1002", "sucesso", f"msg {i}"
+            )
+        url = f"/api/v1/analytics/logs/{bot_id}"
+
+        resp = client.get(url, headers=auth_headers, params={"limit": 2})
+        assert [log["mensagem"] for log in resp.json()] == ["msg 2", "msg 1"]
+        cursor = resp.headers["X-Next-Cursor"]
+
+        resp = client.get(
+            url, headers=auth_headers, params={"limit": 2, "cursor": cursor}
+        )
+        assert [log["mensagem"] for log in resp.json()] == ["msg 0"]
+        assert "X-Next-Cursor" not in resp.headers
+
+        resp = client.get(url, headers=auth_headers, params={"cursor": "???"})
+        assert resp.status_code == 400
+
+    def test_export_ndjson(self, client, auth_headers, db):
+        bot_id = self._create_bot(client, auth_headers)
+        for i in range(3):
+            LogService.create(
+                db, bot_id, "Bot Analytics", "-1001", "-1002", "sucesso", f"msg {i}"
+            )
+
+        resp = client.get(
+            f"/api/v1/analytics/logs/{bot_id}/export", headers=auth_headers
+        )
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("application/x-ndjson")
+        assert len(resp.text.splitlines()) == 3
+
+        resp = client.get(
+            f"/api/v1/analytics/logs/{bot_id}/export",
+            headers=auth_headers,
+            params={"formato": "xml"},
+        )
+        assert resp.status_code == 400
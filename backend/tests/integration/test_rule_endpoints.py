@@ -0,0 +1,137 @@
+"""Testes de integração para endpoints de regras."""
+
+
+class TestRuleEndpoints:
+    def _create_bot(self, client, auth_headers) -> int:
+        resp = client.post("/api/v1/bots/", headers=auth_headers, json={
+            "nome": "Bot Regras",
+            "api_id": "12345",
+            "api_hash": "abc123",
+            "tipo": "user",
+        })
+        return resp.json()["id"]
+
+    def test_create_rule(self, client, auth_headers):
+        bot_id = self._create_bot(client, auth_headers)
+        resp = client.post("/api/v1/rules/", headers=auth_headers, json={
+            "nome": "Ofertas",
+            "origem": "-1001",
+            "destino": "-1002",
+            "bot_id": bot_id,
+            "somente_se_tiver": "cupom, R\\$\\s*\\d+",
+        })
+        assert resp.status_code == 201
+        assert resp.json()["ativo"] is True
+
+    def test_create_rule_modo_envio(self, client, auth_headers):
+        bot_id = self._create_bot(client, auth_headers)
+        regra = {
+            "nome": "Vídeos",
+            "origem": "-1001",
+            "destino": "-1002",
+            "bot_id": bot_id,
+        }
+        resp = client.post("/api/v1/rules/", headers=auth_headers, json=regra)
+        assert resp.json()["modo_envio"] == "envio"
+
+        resp = client.post(
+            "/api/v1/rules/",
+            headers=auth_headers,
+            json={**regra, "modo_envio": "copiar"},
+        )
+        assert resp.status_code == 201
+        assert resp.json()["modo_envio"] == "copiar"
+
+        resp = client.post(
+            "/api/v1/rules/",
+            headers=auth_headers,
+            json={**regra, "modo_envio": "upload"},
+        )
+        assert resp.status_code == 400
+
+    def test_create_rule_regex_perigosa(self, client, auth_headers):
+        bot_id = self._create_bot(client, auth_headers)
+        resp = client.post("/api/v1/rules/", headers=auth_headers, json={
+            "nome": "ReDoS",
+            "origem": "-1001",
+            "destino": "-1002",
+            "bot_id": bot_id,
+            "somente_se_tiver": "(a+)+$",
+        })
+        assert resp.status_code == 400
+        assert resp.json()["error_code"] == "BAD_REQUEST"
+
+    def test_replay_mensagens(self, client, auth_headers):
+        bot_id = self._create_bot(client, auth_headers)
+        client.post("/api/v1/rules/", headers=auth_headers, json={
+            "nome": "Cupons",
+            "origem": "-1001",
+            "destino": "-1002",
+            "bot_id": bot_id,
+            "somente_se_tiver": "cupom",
+            "substituto": "CUPOM10->MEU10",
+        })
+        resp = client.post(
+            f"/api/v1/rules/bot/{bot_id}/replay",
+            headers=auth_headers,
+            json={"mensagens": [{"texto": "Use CUPOM10"}, {"texto": "nada"}]},
+        )
+        assert resp.status_code == 200
+        dados = resp.json()
+        assert dados["resumo"]["reescritas"] == 1
+        assert dados["resumo"]["descartadas"] == {"sem_palavra_obrigatoria": 1}
+        assert dados["resultados"][0]["regras"][0]["texto_final"] == "Use MEU10"
+
+    def test_replay_upload(self, client, auth_headers):
+        bot_id = self._create_bot(client, auth_headers)
+        client.post("/api/v1/rules/", headers=auth_headers, json={
+            "nome": "Bloqueio",
+            "origem": "-1001",
+            "destino": "-1002",
+            "bot_id": bot_id,
+            "bloqueios": "spam",
+        })
+        resp = client.post(
+            f"/api/v1/rules/bot/{bot_id}/replay/upload",
+            headers=auth_headers,
+            files={"arquivo": ("msgs.txt", b"oferta\nspam total\n", "text/plain")},
+        )
+        assert resp.status_code == 200
+        assert resp.json()["resumo"] == {
+            **resp.json()["resumo"],
+            "mensagens": 2,
+            "encaminhadas": 1,
+            "descartadas": {"bloqueio": 1},
+        }
+
+    def test_replay_upload_grande_demais(self, client, auth_headers, monkeypatch):
+        monkeypatch.setattr("app.core.config.settings.REPLAY_MAX_BYTES", 10)
+        bot_id = self._create_bot(client, auth_headers)
+        resp = client.post(
+            f"/api/v1/rules/bot/{bot_id}/replay/upload",
+            headers=auth_headers,
+            files={"arquivo": ("msgs.txt", b"x" * 11, "text/plain")},
+        )
+        assert resp.status_code == 400
+
+    def test_replay_logs_origem_por_username(self, client, auth_headers):
+        bot_id = self._create_bot(client, auth_headers)
+        client.post("/api/v1/rules/", headers=auth_headers, json={
+            "nome": "Canal",
+            "origem": "@ofertas",
+            "destino": "-1002",
+            "bot_id": bot_id,
+        })
+        resp = client.post(
+            f"/api/v1/rules/bot/{bot_id}/replay",
+            headers=auth_headers,
+            json={"fonte": "logs"},
+        )
+        assert resp.status_code == 400
+        assert "username" in resp.json()["detail"]
+
+    def test_replay_bot_de_outro_usuario(self, client, auth_headers):
+        resp = client.post(
+            "/api/v1/rules/bot/999/replay", headers=auth_headers, json={}
+        )
+        assert resp.status_code == 404
@@ -0,0 +1,104 @@
+"""Testes unitários para os rollups e séries de analytics."""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from app.models.log_rollup import LogRollup
+from app.services.analytics_service import AnalyticsService
+from app.services.log_service import LogService
+
+T0 = datetime(2026, 10, 18, 9, 0)
+
+
+def _log(minuto: int, status: str = "sucesso", **kwargs) -> dict:
+    registro = {
+        "bot_id": 1,
+        "bot_nome": "Bot",
+        "origem": "-1001",
+        "destino": "-1002",
+        "status": status,
+        "mensagem": "msg",
+        "regra_id": 7,
+        "data_hora": T0.replace(hour=9 + minuto // 60, minute=minuto % 60),
+    }
+    return {**registro, **kwargs}
+
+
+def _rollups(db, granularidade: str) -> list[tuple]:
+    stmt = (
+        select(
+            LogRollup.bucket,
+            LogRollup.regra_id,
+            LogRollup.destino,
+            LogRollup.sucesso,
+            LogRollup.erro,
+        )
+        .where(LogRollup.granularidade == granularidade)
+        .order_by(LogRollup.bucket, LogRollup.destino)
+    )
+    return [tuple(linha) for linha in db.execute(stmt)]
+
+
+class TestAcumular:
+    def test_create_many_atualiza_rollups(self, db):
+        LogService.create_many(db, [_log(5), _log(10, "erro"), _log(70)])
+        LogService.create_many(db, [_log(20), _log(30, destino="-1003", regra_id=None)])
+
+        assert _rollups(db, "hora") == [
+            (T0, 7, "-1002", 2, 1),
+            (T0, 0, "-1003", 1, 0),
+            (T0.replace(hour=10), 7, "-1002", 1, 0),
+        ]
+        assert _rollups(db, "dia") == [
+            (T0.replace(hour=0), 7, "-1002", 3, 1),
+            (T0.replace(hour=0), 0, "-1003", 1, 0),
+        ]
+
+    def test_create_unitario_tambem_acumula(self, db):
+        LogService.create(db, 1, "Bot", "-1001", "-1002", "erro", "falhou", regra_id=7)
+        assert [linha[3:] for linha in _rollups(db, "dia")] == [(0, 1)]
+
+    def test_recompactar_reconstroi_a_partir_dos_logs(self, db):
+        LogService.create_many(db, [_log(5), _log(10, "erro"), _log(70)])
+        esperado = {g: _rollups(db, g) for g in ("hora", "dia")}
+        db.execute(LogRollup.__table__.delete())
+        db.commit()
+
+        assert AnalyticsService.recompactar(db) == 3
+        assert {g: _rollups(db, g) for g in ("hora", "dia")} == esperado
+        # Recompactar de novo não duplica as contagens
+        AnalyticsService.recompactar(db, bot_id=1, desde=T0)
+        assert {g: _rollups(db, g) for g in ("hora", "dia")} == esperado
+
+
+class TestSerie:
+    def test_serie_preenche_buckets_vazios(self, db):
+        LogService.create_many(
+            db, [_log(5), _log(10, "erro"), _log(130), _log(140, destino="-1003")]
+        )
+        serie = AnalyticsService.serie(
+            db, 1, "hora", inicio=T0, fim=T0.replace(hour=12)
+        )
+
+        assert [(p["sucesso"], p["erro"]) for p in serie["pontos"]] == [
+            (1, 1),
+            (0, 0),
+            (2, 0),
+        ]
+        assert (serie["total_sucesso"], serie["total_erro"]) == (3, 1)
+
+    def test_serie_filtra_por_destino_e_regra(self, db):
+        LogService.create_many(db, [_log(5), _log(6, destino="-1003", regra_id=8)])
+        fim = T0.replace(hour=10)
+
+        por_destino = AnalyticsService.serie(db, 1, inicio=T0, fim=fim, destino="-1003")
+        por_regra = AnalyticsService.serie(db, 1, inicio=T0, fim=fim, regra_id=7)
+        assert por_destino["total_sucesso"] == por_regra["total_sucesso"] == 1
+
+    def test_serie_invalida(self, db):
+        with pytest.raises(ValueError, match="Granularidade"):
+            AnalyticsService.serie(db, 1, "semana")
+        with pytest.raises(ValueError, match="grande demais"):
+            AnalyticsService.serie(db, 1, "hora", inicio=datetime(2020, 1, 1), fim=T0)
@@ -1,12 +1,19 @@
 """Testes unitários para BotWorker (helpers e lógica de envio)."""
 
 import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch
+from telethon.errors import ChatForwardsRestrictedError, FloodWaitError
+from telethon.tl.types import MessageMediaPhoto, Photo
 
 from app.models.bot import Bot
+from app.services.rule_engine import RulePlan, RuleSet
 from app.workers.bot_worker import BotWorker
+from app.workers.dedup import chave_conteudo
+from app.workers.rate_limiter import RateLimiter
+from app.workers.send_queue import ItemEnvio
 
 
 class TestBotWorkerHelpers:
@@ -77,3 +84,494 @@ class TestBotWorkerSendMessage:
             mock_client.send_message.assert_awaited_once_with(
                 "me", "Mensagem de teste"
             )
+
+    def test_destino_lento_nao_bloqueia_os_demais(self, mock_bot):
+        """Workers de envio atendem destinos diferentes em paralelo, em ordem."""
+        enviados = []
+
+        async def _send_message(destino, texto):
+            if destino == "lento":
+                await asyncio.sleep(0.2)
+            enviados.append((destino, texto))
+
+        mock_client = MagicMock()
+        mock_client.send_message = AsyncMock(side_effect=_send_message)
+        with patch("app.workers.bot_worker.StringSession"), patch(
+            "app.workers.bot_worker.TelegramClient", return_value=mock_client
+        ):
+            worker = BotWorker(mock_bot)
+        worker._limitador = RateLimiter(6000, 10, 6000, 10)
+
+        async def _run():
+            worker._running = True
+            for destino, texto in [("lento", "1"), ("lento", "2"), ("rapido", "a")]:
+                await worker.fila_envio.put(ItemEnvio(destino, texto, None, "R", 1))
+            tarefas = [asyncio.create_task(worker._worker_envio()) for _ in range(2)]
+            while not worker.fila_envio.empty():
+                await asyncio.sleep(0.01)
+            worker._running = False
+            await asyncio.gather(*tarefas)
+
+        asyncio.run(_run())
+
+        assert enviados == [("rapido", "a"), ("lento", "1"), ("lento", "2")]
+        assert worker.metricas.contadores["enviadas"] == 3
+
+    def test_flood_wait_estaciona_so_o_destino(self, mock_bot):
+        """FloodWait em um chat não segura os outros e o item mantém a posição."""
+        enviados = []
+        floods = {"a": 1}
+
+        async def _send_message(destino, texto):
+            if floods.get(destino):
+                floods[destino] -= 1
+                raise FloodWaitError(request=MagicMock(peer=destino), capture=0)
+            enviados.append((destino, texto))
+
+        mock_client = MagicMock()
+        mock_client.send_message = AsyncMock(side_effect=_send_message)
+        with patch("app.workers.bot_worker.StringSession"), patch(
+            "app.workers.bot_worker.TelegramClient", return_value=mock_client
+        ):
+            worker = BotWorker(mock_bot)
+        worker._limitador = RateLimiter(6000, 10, 6000, 10)
+
+        async def _run():
+            worker._running = True
+            itens = [("a", "1"), ("a", "2"), ("b", "x")]
+            for destino, texto in itens:
+                await worker.fila_envio.put(ItemEnvio(destino, texto, None, "R", 1))
+            tarefa = asyncio.create_task(worker._worker_envio())
+            while not worker.fila_envio.empty():
+                await asyncio.sleep(0.01)
+            worker._running = False
+            await tarefa
+
+        asyncio.run(_run())
+
+        # "b" sai durante o FloodWait de "a"; "a" mantém a ordem 1, 2
+        assert enviados == [("b", "x"), ("a", "1"), ("a", "2")]
+        assert worker.metricas.contadores["flood_waits"] == 1
+        assert worker.metricas.contadores["flood_waits_conta"] == 0
+
+    def test_falha_transitoria_volta_como_reenvio(self, mock_bot):
+        """Erro de rede estaciona o destino com o item na cabeça (ordem mantida)."""
+        enviados = []
+        falhas = {"1": 1}
+
+        async def _send_message(destino, texto):
+            if falhas.get(texto):
+                falhas[texto] -= 1
+                raise ConnectionError("rede caiu")
+            enviados.append(texto)
+
+        mock_client = MagicMock()
+        mock_client.send_message = AsyncMock(side_effect=_send_message)
+        with patch("app.workers.bot_worker.StringSession"), patch(
+            "app.workers.bot_worker.TelegramClient", return_value=mock_client
+        ):
+            worker = BotWorker(mock_bot)
+        worker._limitador = RateLimiter(6000, 10, 6000, 10)
+
+        async def _run():
+            worker._running = True
+            for texto in ("1", "2"):
+                await worker.fila_envio.put(ItemEnvio("a", texto, None, "R", 1))
+            tarefa = asyncio.create_task(worker._worker_envio())
+            while not worker.fila_envio.empty():
+                await asyncio.sleep(0.01)
+            worker._running = False
+            await tarefa
+
+        with patch.multiple(
+            "app.workers.bot_worker.settings", SEND_REENVIO_ESPERA_SEGUNDOS=0.01
+        ):
+            asyncio.run(_run())
+
+        assert enviados == ["1", "2"]
+        assert worker.metricas.contadores["reenvios"] == 1
+        assert worker.metricas.contadores["erros_envio"] == 0
+
+    def test_flood_wait_sem_peer_pausa_a_conta(self, mock_bot):
+        with patch("app.workers.bot_worker.StringSession"), patch(
+            "app.workers.bot_worker.TelegramClient"
+        ):
+            worker = BotWorker(mock_bot)
+        worker._limitador = MagicMock()
+
+        upload = FloodWaitError(request=MagicMock(spec=[]), capture=30)
+        assert worker._registrar_flood("a", upload) == 30
+        worker._limitador.pausar_conta.assert_called_once_with(30)
+
+    def test_flood_wait_em_varios_destinos_pausa_a_conta(self, mock_bot):
+        with patch("app.workers.bot_worker.StringSession"), patch(
+            "app.workers.bot_worker.TelegramClient"
+        ):
+            worker = BotWorker(mock_bot)
+        worker._limitador = MagicMock()
+
+        worker._registrar_flood("a", FloodWaitError(MagicMock(peer="a"), capture=5))
+        worker._limitador.pausar_conta.assert_not_called()
+        worker._registrar_flood("b", FloodWaitError(MagicMock(peer="b"), capture=5))
+        worker._limitador.pausar_conta.assert_called_once_with(5)
+
+    def test_fila_cheia_descarta_e_confirma_no_outbox(self, mock_bot):
+        outbox = MagicMock()
+        with patch("app.workers.bot_worker.StringSession"), patch(
+            "app.workers.bot_worker.TelegramClient"
+        ), patch.multiple(
+            "app.workers.bot_worker.settings",
+            SEND_FILA_CAPACIDADE=1,
+            SEND_FILA_POLITICA="drop-newest",
+        ):
+            worker = BotWorker(mock_bot, outbox=outbox)
+
+        async def _run():
+            await worker.fila_envio.put(ItemEnvio("a", "1", None, "R", 1))
+            item = ItemEnvio("a", "2", None, "R", 1)
+            assert await worker.fila_envio.put(item) is False
+            return item
+
+        descartado = asyncio.run(_run())
+        outbox.confirmar.assert_called_once_with(descartado)
+        assert worker.metricas.contadores["descartadas"] == 1
+        assert worker.metricas.contadores["descartadas_drop-newest"] == 1
+
+    def test_conclusao_avisa_quem_enfileirou(self, mock_bot):
+        mock_client = MagicMock()
+        mock_client.send_message = AsyncMock(
+            side_effect=[None, ValueError("chat inválido")]
+        )
+        with patch("app.workers.bot_worker.StringSession"), patch(
+            "app.workers.bot_worker.TelegramClient", return_value=mock_client
+        ):
+            worker = BotWorker(mock_bot)
+        worker._limitador = RateLimiter(6000, 10, 6000, 10)
+        worker.log_sink = MagicMock()
+        concluidos = []
+
+        async def _run():
+            for texto in ("ok", "falha"):
+                item = ItemEnvio("a", texto, None, "Agendamento: Diário", "-1001")
+                item.rotulo_log = "[Agendamento: Diário]"
+                item.ao_concluir = lambda i, sucesso: concluidos.append(
+                    (i.texto, sucesso)
+                )
+                await worker._enviar(item)
+
+        asyncio.run(_run())
+
+        assert concluidos == [("ok", True), ("falha", False)]
+        mensagens = [
+            c.kwargs["mensagem"] for c in worker.log_sink.registrar.call_args_list
+        ]
+        assert mensagens == [
+            "[Agendamento: Diário] ok",
+            "[Agendamento: Diário] chat inválido",
+        ]
+
+    def test_envio_cancelado_nao_confirma_no_outbox(self, mock_bot):
+        outbox = MagicMock()
+        with patch("app.workers.bot_worker.StringSession"), patch(
+            "app.workers.bot_worker.TelegramClient"
+        ):
+            worker = BotWorker(mock_bot, outbox=outbox)
+        worker._running = True
+
+        async def _preso(item):
+            await asyncio.Event().wait()
+
+        worker._enviar = _preso
+
+        async def _run():
+            worker.fila_envio.put_nowait(ItemEnvio("a", "1", None, "R", 1))
+            tarefa = asyncio.create_task(worker._worker_envio())
+            await asyncio.sleep(0.01)
+            # Shutdown com o envio em andamento
+            tarefa.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await tarefa
+
+        asyncio.run(_run())
+        outbox.confirmar.assert_not_called()
+        assert worker.fila_envio.qsize() == 1
+        assert worker.fila_envio.em_voo == 0
+
+
+class TestBotWorkerDespacho:
+    """Testes para o handler único indexado por chat de origem."""
+
+    @pytest.fixture
+    def worker(self):
+        bot = MagicMock(spec=Bot)
+        bot.id = 1
+        bot.nome = "TestBot"
+        bot.owner_id = 1
+        bot.api_id = "12345"
+        bot.api_hash = "abc123"
+        bot.session_string = "any"
+        mock_client = MagicMock()
+        mock_client.get_peer_id = AsyncMock(return_value=-1001)
+        with patch(
+            "app.workers.bot_worker.StringSession", return_value=MagicMock()
+        ), patch(
+            "app.workers.bot_worker.TelegramClient", return_value=mock_client
+        ):
+            yield BotWorker(bot)
+
+    @staticmethod
+    def _event(chat_id: int, texto: str):
+        event = MagicMock()
+        event.chat_id = chat_id
+        event.message.text = texto
+        event.message.caption = None
+        event.message.media = None
+        event.message.grouped_id = None
+        return event
+
+    @staticmethod
+    def _drenar(fila) -> list:
+        async def _run():
+            itens = []
+            while not fila.empty():
+                destino = await fila.proximo()
+                itens.append(fila.primeiro(destino))
+                fila.concluir(destino)
+            return itens
+
+        return asyncio.run(_run())
+
+    def test_indice_resolve_usernames(self, worker):
+        plano_a = RulePlan(id=1, nome="A", origens=[100, "@canal"], destino=200)
+        plano_b = RulePlan(id=2, nome="B", origens=[100], destino=300)
+
+        indice = asyncio.run(worker._construir_indice([plano_a, plano_b]))
+
+        assert indice == {100: [plano_a, plano_b], -1001: [plano_a]}
+        worker.client.get_peer_id.assert_awaited_once_with("@canal")
+
+    def test_despacha_somente_regras_da_origem(self, worker):
+        plano_a = RulePlan(id=1, nome="A", origens=[100], destino=200)
+        plano_b = RulePlan(id=2, nome="B", origens=[101], destino=300)
+        worker._regras = RuleSet([plano_a, plano_b], {100: [plano_a], 101: [plano_b]})
+
+        asyncio.run(worker._despachar(self._event(100, "oferta")))
+
+        (item,) = self._drenar(worker.fila_envio)
+        assert (item.destino, item.texto, item.media, item.regra_nome, item.origem) == (
+            200, "oferta", None, "A", 100
+        )
+
+    def test_album_vira_um_unico_envio(self, worker):
+        plano = RulePlan(id=1, nome="A", origens=[100], destino=200, filtro="oferta")
+        worker._regras = RuleSet([plano], {100: [plano]})
+        partes = [self._event(100, t).message for t in ("", "Oferta", "")]
+        for i, mensagem in enumerate(partes):
+            mensagem.media = MessageMediaPhoto(
+                photo=Photo(
+                    id=i,
+                    access_hash=0,
+                    file_reference=b"",
+                    date=None,
+                    sizes=[],
+                    dc_id=2,
+                )
+            )
+            mensagem.grouped_id = 42
+            mensagem.photo.id = i
+
+        # Partes avulsas do álbum são ignoradas pelo handler de NewMessage
+        evento_parte = MagicMock(chat_id=100, message=partes[1])
+        asyncio.run(worker._despachar(evento_parte))
+        assert worker.fila_envio.empty()
+
+        album = MagicMock(chat_id=100, messages=partes)
+        asyncio.run(worker._despachar_album(album))
+
+        (item,) = self._drenar(worker.fila_envio)
+        assert item.texto == "Oferta"
+        # Só as referências (InputMediaPhoto) ficam na fila
+        assert [m.id.id for m in item.media] == [0, 1, 2]
+        assert worker.metricas.contadores["albuns"] == 1
+
+    def test_modo_copiar_usa_forward_so_sem_reescrita(self, worker):
+        copia = RulePlan(
+            id=1, nome="A", origens=[100], destino=200, modo_envio="copiar"
+        )
+        reescrita = RulePlan(
+            id=2, nome="B", origens=[100], destino=300, filtro="oferta",
+            substituto="promo", modo_envio="copiar",
+        )
+        worker._regras = RuleSet([copia, reescrita], {100: [copia, reescrita]})
+        event = self._event(100, "oferta")
+        event.message.id = 7
+
+        asyncio.run(worker._despachar(event))
+
+        itens = {i.regra_nome: i for i in self._drenar(worker.fila_envio)}
+        assert (itens["A"].encaminhar_de, itens["A"].mensagens_ids) == (100, [7])
+        assert itens["A"].sem_autor is True
+        assert itens["B"].mensagens_ids is None
+
+    def test_fan_out_avalia_e_converte_uma_vez(self, worker):
+        plano = RulePlan(
+            id=1, nome="A", origens=[100], destino=[200, 300, 400],
+            converter_shopee=True,
+        )
+        worker._regras = RuleSet([plano], {100: [plano]})
+        worker._get_shopee_api = MagicMock(return_value=MagicMock())
+        # 300 já recebeu este conteúdo: só ele fica de fora
+        texto = "oferta https://s.shopee.com.br/abc"
+        worker._dedup.registrar(chave_conteudo(texto, None, 300), 300)
+
+        with patch(
+            "app.workers.bot_worker.converter_links_shopee",
+            AsyncMock(return_value="oferta convertida"),
+        ) as converter:
+            asyncio.run(worker._despachar(self._event(100, texto)))
+
+        converter.assert_awaited_once()
+        itens = self._drenar(worker.fila_envio)
+        assert sorted(i.destino for i in itens) == [200, 400]
+        assert {i.texto for i in itens} == {"oferta convertida"}
+
+    def test_forward_restrito_cai_no_envio(self, worker):
+        worker.client.forward_messages = AsyncMock(
+            side_effect=ChatForwardsRestrictedError(request=None)
+        )
+        worker.client.send_file = AsyncMock()
+        item = ItemEnvio(200, "legenda", "foto", "A", 100)
+        item.encaminhar_de, item.mensagens_ids = 100, [7]
+
+        asyncio.run(worker._entregar(item))
+
+        worker.client.send_file.assert_awaited_once_with(200, "foto", caption="legenda")
+        assert worker.metricas.contadores["encaminhamento_fallback"] == 1
+
+    def test_origem_sem_regras_e_ignorada(self, worker):
+        plano = RulePlan(id=1, nome="A", origens=[100], destino=200)
+        worker._regras = RuleSet([plano], {100: [plano]})
+
+        asyncio.run(worker._despachar(self._event(999, "oferta")))
+
+        assert worker.fila_envio.empty()
+
+    def test_duplicata_para_o_mesmo_destino_e_suprimida(self, worker):
+        plano_a = RulePlan(id=1, nome="A", origens=[100], destino=200)
+        plano_b = RulePlan(id=2, nome="B", origens=[100, 101], destino=200)
+        plano_c = RulePlan(id=3, nome="C", origens=[101], destino=200, janela_dedup=0)
+        worker._regras = RuleSet(
+            [plano_a, plano_b, plano_c],
+            {100: [plano_a, plano_b], 101: [plano_b, plano_c]},
+        )
+
+        asyncio.run(worker._despachar(self._event(100, "Oferta  X")))
+        # Repost em outra origem (só muda caixa/espaços)
+        asyncio.run(worker._despachar(self._event(101, "oferta x")))
+
+        # A enfileira; B (mesmo destino) e o repost são suprimidos; C não deduplica
+        assert [i.regra_nome for i in self._drenar(worker.fila_envio)] == ["A", "C"]
+        assert worker.metricas.contadores["duplicadas_suprimidas"] == 2
+
+    def test_regra_desativada_loga_cada_destino(self, worker):
+        plano = RulePlan(id=1, nome="A", origens=[100], destino=[200, "@canal"])
+        worker.log_sink = MagicMock()
+        with patch("app.workers.bot_worker.SessionLocal"), patch(
+            "app.workers.bot_worker.RuleService.get_by_id", return_value=None
+        ):
+            asyncio.run(worker._desativar_regra(plano, 100, "regex excedeu 50ms"))
+
+        chamadas = worker.log_sink.registrar.call_args_list
+        assert [c.kwargs["destino"] for c in chamadas] == ["200", "@canal"]
+        assert 1 in worker._regras_suspensas
+
+    def test_envio_descartado_libera_a_chave_de_dedup(self, worker):
+        plano = RulePlan(id=1, nome="A", origens=[100], destino=200)
+        worker._regras = RuleSet([plano], {100: [plano]})
+        worker.fila_envio.capacidade = 1
+        worker.fila_envio.politica = "drop-newest"
+        asyncio.run(worker.fila_envio.put(ItemEnvio(200, "outra", None, "A", 100)))
+
+        # Fila cheia: descartado, não conta como já enviado
+        asyncio.run(worker._despachar(self._event(100, "oferta")))
+        assert worker.metricas.contadores["descartadas"] == 1
+        assert len(worker._dedup) == 0
+
+        self._drenar(worker.fila_envio)
+        asyncio.run(worker._despachar(self._event(100, "oferta")))
+        assert [i.texto for i in self._drenar(worker.fila_envio)] == ["oferta"]
+        assert "duplicadas_suprimidas" not in worker.metricas.contadores
+
+    @staticmethod
+    def _regra(id_: int, **kwargs):
+        campos = {
+            "nome": f"R{id_}", "origem": "100", "destino": "200", "filtro": None,
+            "substituto": None, "bloqueios": None, "somente_se_tiver": None,
+            "converter_shopee": False, "janela_dedup": None,
+            "modo_envio": "envio", "ativo": True,
+        }
+        campos.update(kwargs)
+        return MagicMock(id=id_, **campos)
+
+    def _recarregar(self, worker, regras):
+        with patch("app.workers.bot_worker.SessionLocal"), patch(
+            "app.workers.bot_worker.RuleService.get_all_by_bot", return_value=regras
+        ):
+            asyncio.run(worker._aplicar_regras())
+
+    def test_reload_incremental_mantem_planos_inalterados(self, worker):
+        self._recarregar(worker, [self._regra(1, bloqueios="spam"), self._regra(2)])
+        regras_antes = worker._regras
+        plano_1 = worker._planos[1][1]
+        plano_2 = worker._planos[2][1]
+
+        # Sem mudanças: nada é trocado
+        self._recarregar(worker, [self._regra(1, bloqueios="spam"), self._regra(2)])
+        assert worker._regras is regras_antes
+
+        # Só a regra 2 muda; a 1 e o autômato continuam os mesmos objetos
+        self._recarregar(
+            worker, [self._regra(1, bloqueios="spam"), self._regra(2, destino="300")]
+        )
+        assert worker._regras is not regras_antes
+        assert worker._planos[1][1] is plano_1
+        assert worker._planos[2][1] is not plano_2
+        assert worker._regras.automato is regras_antes.automato
+        assert worker._regras.por_origem[100] == [plano_1, worker._planos[2][1]]
+
+    def test_origem_que_falhou_e_retentada_no_poll(self, worker):
+        worker.client.get_peer_id = AsyncMock(
+            side_effect=[ConnectionError("offline"), -1001]
+        )
+        regras = [self._regra(1, origem="@canal")]
+        self._recarregar(worker, regras)
+        assert worker._regras.por_origem == {}
+
+        # Dentro do backoff: nenhuma chamada nova
+        self._recarregar(worker, regras)
+        assert worker.client.get_peer_id.await_count == 1
+
+        # Prazo vencido: o poll refaz o índice mesmo sem mudança nas regras
+        worker._origens_pendentes["@canal"] = (1, 0.0)
+        self._recarregar(worker, regras)
+        assert worker._regras.por_origem == {-1001: [worker._planos[1][1]]}
+        assert worker._origens_pendentes == {}
+
+    def test_flood_wait_ao_resolver_agenda_nova_tentativa(self, worker):
+        worker.client.get_peer_id = AsyncMock(
+            side_effect=FloodWaitError(MagicMock(), capture=120)
+        )
+        self._recarregar(worker, [self._regra(1, origem="@canal")])
+
+        falhas, proxima = worker._origens_pendentes["@canal"]
+        assert falhas == 1
+        assert 110 < proxima - time.monotonic() <= 120
+
+    def test_reload_remove_regras_inativas(self, worker):
+        self._recarregar(worker, [self._regra(1), self._regra(2)])
+        worker._regras_suspensas.add(2)
+
+        self._recarregar(worker, [self._regra(1), self._regra(2, ativo=False)])
+
+        assert set(worker._planos) == {1}
+        assert worker._regras_suspensas == set()
@@ -0,0 +1,60 @@
+"""Testes unitários para o cache de deduplicação do worker."""
+
+from app.workers.dedup import DedupCache, chave_conteudo
+
+
+class _Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self) -> float:
+        return self.agora
+
+
+class TestChaveConteudo:
+    def test_normaliza_caixa_e_espacos(self):
+        assert chave_conteudo("Oferta\n do dia ", None, 1) == chave_conteudo(
+            "oferta do dia", None, 1
+        )
+
+    def test_midia_e_destino_fazem_parte_da_chave(self):
+        base = chave_conteudo("oferta", 10, 1)
+        assert base != chave_conteudo("oferta", 11, 1)
+        assert base != chave_conteudo("oferta", 10, 2)
+        assert base != chave_conteudo("oferta", None, 1)
+
+
+class TestDedupCache:
+    def test_duplicata_dentro_da_janela(self):
+        relogio = _Relogio()
+        cache = DedupCache(capacidade=10, relogio=relogio)
+        assert cache.registrar(b"a", 60) is False
+        relogio.agora = 59
+        assert cache.registrar(b"a", 60) is True
+        relogio.agora = 61
+        assert cache.registrar(b"a", 60) is False
+
+    def test_duplicata_nao_renova_janela(self):
+        relogio = _Relogio()
+        cache = DedupCache(capacidade=10, relogio=relogio)
+        cache.registrar(b"a", 10)
+        relogio.agora = 9
+        assert cache.registrar(b"a", 10) is True
+        relogio.agora = 10
+        assert cache.registrar(b"a", 10) is False
+
+    def test_capacidade_descarta_mais_antigas(self):
+        cache = DedupCache(capacidade=2, relogio=_Relogio())
+        for chave in (b"a", b"b", b"c"):
+            cache.registrar(chave, 60)
+        assert len(cache) == 2
+        assert cache.registrar(b"a", 60) is False
+
+    def test_expiradas_sao_removidas(self):
+        relogio = _Relogio()
+        cache = DedupCache(capacidade=10, relogio=relogio)
+        cache.registrar(b"a", 5)
+        cache.registrar(b"b", 5)
+        relogio.agora = 6
+        cache.registrar(b"c", 5)
+        assert len(cache) == 1
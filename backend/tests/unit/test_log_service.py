@@ -0,0 +1,128 @@
+"""Testes unitários para a consulta paginada e a exportação de logs."""
+
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+from app.services.log_service import LogService
+
+T0 = datetime(2026, 10, 18, 9, 0)
+
+
+@pytest.fixture
+def logs(db):
+    # 2 logs por segundo: o desempate por id precisa funcionar
+    LogService.create_many(
+        db,
+        [
+            {
+                "bot_id": bot_id,
+                "bot_nome": "Bot",
+                "origem": "-1001",
+                "destino": "-1002",
+                "status": "sucesso",
+                "mensagem": f"{bot_id}:{i}",
+                "data_hora": T0 + timedelta(seconds=i // 2),
+            }
+            for i in range(7)
+            for bot_id in (1, 2)
+        ],
+    )
+
+
+class TestPaginacaoPorCursor:
+    def test_percorre_todas_as_paginas_sem_repetir(self, db, logs):
+        vistos, cursor = [], None
+        while True:
+            pagina, cursor = LogService.get_page_by_bot(db, 1, limit=3, cursor=cursor)
+            vistos += [log.mensagem for log in pagina]
+            if cursor is None:
+                break
+        assert vistos == [f"1:{i}" for i in reversed(range(7))]
+
+    def test_pagina_estavel_com_logs_novos(self, db, logs):
+        _pagina, cursor = LogService.get_page_by_bot(db, 1, limit=2)
+        LogService.create(db, 1, "Bot", "-1001", "-1002", "sucesso", "novo")
+        pagina, _ = LogService.get_page_by_bot(db, 1, limit=2, cursor=cursor)
+        assert [log.mensagem for log in pagina] == ["1:4", "1:3"]
+
+    def test_ultima_pagina_cheia_sem_cursor(self, db, logs):
+        pagina, cursor = LogService.get_page_by_bot(db, 1, limit=7)
+        assert len(pagina) == 7
+        assert cursor is None
+
+    def test_cursor_invalido(self, db):
+        with pytest.raises(ValueError, match="Cursor"):
+            LogService.get_page_by_bot(db, 1, cursor="nao-e-cursor")
+
+
+class TestExportacao:
+    def _exportar(self, db, **kwargs) -> bytes:
+        return b"".join(LogService.exportar(db.get_bind(), 1, **kwargs))
+
+    def test_ndjson_em_chunks_no_intervalo(self, db, logs):
+        with patch("app.services.log_service.settings.LOG_EXPORT_LOTE", 2):
+            chunks = list(
+                LogService.exportar(
+                    db.get_bind(), 1, inicio=T0, fim=T0 + timedelta(seconds=2)
+                )
+            )
+
+        assert len(chunks) == 2
+        linhas = [json.loads(linha) for linha in b"".join(chunks).splitlines()]
+        assert [linha["mensagem"] for linha in linhas] == ["1:0", "1:1", "1:2", "1:3"]
+        assert linhas[0]["data_hora"] == T0.isoformat()
+
+    def test_csv_gzip(self, db, logs):
+        dados = gzip.decompress(self._exportar(db, formato="csv", compactar=True))
+        linhas = list(csv.reader(io.StringIO(dados.decode())))
+        assert linhas[0][:3] == ["id", "bot_id", "bot_nome"]
+        assert len(linhas) == 1 + 7
+
+    def test_export_vazio_tem_cabecalho(self, db):
+        assert self._exportar(db, formato="csv").startswith(b"id,bot_id")
+        assert self._exportar(db) == b""
+
+    def test_escrita_durante_o_export(self, tmp_path):
+        # Arquivo com o journal padrão (sem WAL), como o banco de produção;
+        # timeout=0: um lock de leitura preso faria o INSERT falhar na hora
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'logs.db'}", connect_args={"timeout": 0}
+        )
+        Base.metadata.create_all(engine)
+        registro = {
+            "bot_id": 1,
+            "bot_nome": "Bot",
+            "origem": "-1001",
+            "destino": "-1002",
+            "status": "sucesso",
+            "mensagem": "x",
+            "data_hora": T0,
+        }
+        with Session(engine) as db:
+            LogService.create_many(db, [registro] * 5)
+
+        with patch("app.services.log_service.settings.LOG_EXPORT_LOTE", 2):
+            chunks = LogService.exportar(engine, 1)
+            primeiro = next(chunks)
+            # Download parado no meio: gravar logs continua funcionando
+            with Session(engine) as db:
+                LogService.create_many(
+                    db, [{**registro, "data_hora": T0 + timedelta(seconds=1)}]
+                )
+            dados = primeiro + b"".join(chunks)
+        engine.dispose()
+
+        assert len(dados.splitlines()) == 6
+
+    def test_formato_invalido_falha_antes_do_streaming(self, db):
+        with pytest.raises(ValueError, match="Formato"):
+            LogService.exportar(db.get_bind(), 1, formato="xlsx")
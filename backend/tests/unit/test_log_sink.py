@@ -0,0 +1,71 @@
+"""Testes unitários para a gravação em lote dos logs de execução."""
+
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from app.models.log import LogExecucao
+from app.workers.log_sink import LogSink
+
+
+def _registrar(sink: LogSink, n: int, inicio: int = 0) -> None:
+    for i in range(inicio, inicio + n):
+        sink.registrar(
+            bot_id=1,
+            bot_nome="Bot",
+            origem="-1001",
+            destino="-1002",
+            status="sucesso",
+            mensagem=f"msg {i}",
+        )
+
+
+class TestLogSink:
+    @pytest.fixture
+    def sink(self, db):
+        return LogSink(lote=3, flush_ms=10, sessao=sessionmaker(bind=db.get_bind()))
+
+    def test_flush_grava_em_lote(self, sink, db):
+        _registrar(sink, 5)
+        assert db.execute(select(LogExecucao)).first() is None
+
+        asyncio.run(sink.flush())
+
+        mensagens = db.execute(select(LogExecucao.mensagem)).scalars().all()
+        assert mensagens == [f"msg {i}" for i in range(5)]
+        assert (len(sink), sink.gravados) == (0, 5)
+
+    def test_loop_grava_quando_o_lote_enche(self, sink, db):
+        sink.intervalo = 60
+
+        async def _run():
+            tarefa = asyncio.create_task(sink.executar())
+            await asyncio.sleep(0)
+            _registrar(sink, 3)
+            for _ in range(100):
+                if sink.gravados:
+                    break
+                await asyncio.sleep(0.01)
+            tarefa.cancel()
+
+        asyncio.run(_run())
+        assert sink.gravados == 3
+
+    def test_buffer_limitado_descarta_os_mais_antigos(self):
+        sink = LogSink(max_pendentes=2)
+        _registrar(sink, 3)
+        assert sink.descartados == 1
+        assert [r["mensagem"] for r in sink._pendentes] == ["msg 1", "msg 2"]
+
+    def test_erro_no_flush_devolve_ao_buffer(self):
+        def _sessao():
+            raise RuntimeError("banco travado")
+
+        sink = LogSink(max_pendentes=10, sessao=_sessao)
+        _registrar(sink, 2)
+        with pytest.raises(RuntimeError):
+            asyncio.run(sink.flush())
+        _registrar(sink, 1, inicio=2)
+        assert [r["mensagem"] for r in sink._pendentes] == ["msg 0", "msg 1", "msg 2"]
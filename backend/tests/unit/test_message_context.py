@@ -0,0 +1,68 @@
+"""Testes unitários para MessageContext."""
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+from app.services.message_context import MessageContext
+from app.services.shopee_service import converter_links_shopee
+
+
+def _message(text: str, caption: str | None = None, media=None):
+    message = MagicMock(spec=["text", "caption", "media", "photo", "document"])
+    message.text = text
+    message.caption = caption
+    message.media = media
+    message.photo = None
+    message.document = None
+    return message
+
+
+class TestMessageContext:
+    def test_texto_com_caption(self):
+        ctx = MessageContext(_message("Oferta", caption="legenda"))
+        assert ctx.texto == "Oferta legenda"
+        assert ctx.texto_normalizado == "oferta legenda"
+
+    def test_visoes_sao_calculadas_uma_vez(self):
+        message = _message("Oi")
+        ctx = MessageContext(message)
+        assert ctx.texto == "Oi"
+        message.text = "Mudou"
+        assert ctx.texto == "Oi"
+
+    def test_urls_shopee_e_hashtags(self):
+        ctx = MessageContext.de_texto(
+            "#oferta Veja https://s.shopee.com.br/abc e https://amzn.to/x #top"
+        )
+        assert ctx.urls == ["https://s.shopee.com.br/abc", "https://amzn.to/x"]
+        assert ctx.shopee_urls == ["https://s.shopee.com.br/abc"]
+        assert ctx.hashtags == ["#oferta", "#top"]
+
+    def test_sem_links_shopee(self):
+        assert MessageContext.de_texto("sem links").shopee_urls == []
+
+    def test_tipo_midia(self):
+        assert MessageContext(_message("t")).tipo_midia is None
+        foto = _message("t", media=object())
+        foto.photo = object()
+        assert MessageContext(foto).tipo_midia == "foto"
+
+    def test_media_id(self):
+        assert MessageContext(_message("t")).media_id is None
+        doc = _message("t", media=object())
+        doc.document = MagicMock(id=42)
+        assert MessageContext(doc).media_id == 42
+
+    def test_converter_shopee_reaproveita_links(self):
+        api = MagicMock()
+        api.gen_link.return_value = "https://s.shopee.com.br/afiliado"
+        texto = "Compre https://shopee.com.br/produto"
+        ctx = MessageContext.de_texto(texto)
+
+        with patch("app.services.shopee_service.SHOPEE_URL_REGEX") as regex:
+            resultado = asyncio.run(
+                converter_links_shopee(texto, api, ctx.shopee_urls)
+            )
+            regex.findall.assert_not_called()
+
+        assert resultado == "Compre https://s.shopee.com.br/afiliado"
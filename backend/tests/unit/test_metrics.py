@@ -0,0 +1,23 @@
+"""Testes unitários para as métricas em memória dos workers."""
+
+from app.workers.metrics import Metricas
+
+
+class TestMetricas:
+    def test_observar_media_movel(self):
+        metricas = Metricas()
+        metricas.observar("envio_ms", 100)
+        metricas.observar("envio_ms", 200, peso=0.5)
+        assert metricas.medidores["envio_ms"] == 150
+
+    def test_rotulados_limitados_aos_mais_recentes(self):
+        metricas = Metricas(max_rotulados=2)
+        metricas.definir("fila_profundidade", 3)
+        for destino in (1, 2, 1, 3):
+            metricas.observar(f"latencia_ms[{destino}]", 10)
+
+        assert set(metricas.snapshot()) == {
+            "fila_profundidade",
+            "latencia_ms[1]",
+            "latencia_ms[3]",
+        }
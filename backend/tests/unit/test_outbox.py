@@ -0,0 +1,147 @@
+"""Testes unitários para o outbox durável da fila de envio."""
+
+import asyncio
+
+from telethon.tl.types import InputMediaPhoto, InputPhoto, MessageMediaPhoto, Photo
+
+from app.workers.outbox import Outbox, restaurar_media, serializar_media
+from app.workers.send_queue import PRIORIDADE_AGENDADO, PRIORIDADE_REENVIO, ItemEnvio
+
+
+def _item(destino, texto: str, media=None) -> ItemEnvio:
+    return ItemEnvio(destino, texto, media, "Regra", -1001)
+
+
+def _contar(outbox: Outbox) -> int:
+    return outbox._conexao.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+
+class TestOutbox:
+    def test_pendentes_sobrevivem_ao_restart(self, tmp_path):
+        caminho = str(tmp_path / "outbox.db")
+
+        async def _primeira_execucao():
+            outbox = Outbox(caminho)
+            for destino, texto in [(-100, "1"), ("@canal", "2"), (-100, "3")]:
+                outbox.adicionar(7, _item(destino, texto))
+            agendado = ItemEnvio(
+                -300, "4", None, "Agenda", "@origem", PRIORIDADE_AGENDADO
+            )
+            agendado.regra_id = 42
+            agendado.encaminhar_de = "@origem"
+            agendado.mensagens_ids = [10, 11]
+            agendado.sem_autor = True
+            outbox.adicionar(7, agendado)
+            enviado = _item(-200, "enviado")
+            outbox.adicionar(7, enviado)
+            await outbox.flush()
+            outbox.confirmar(enviado)
+            # Reenvio depois de gravado: tentativas e classe vão no próximo flush
+            agendado.tentativas = 2
+            agendado.prioridade = PRIORIDADE_REENVIO
+            outbox.atualizar(agendado)
+            await outbox.fechar()
+
+        async def _segunda_execucao():
+            outbox = Outbox(caminho)
+            itens = await outbox.reivindicar(7)
+            # Já reivindicados por esta execução: não voltam de novo
+            assert await outbox.reivindicar(7) == []
+            assert await outbox.reivindicar(8) == []
+            await outbox.fechar()
+            return itens
+
+        asyncio.run(_primeira_execucao())
+        itens = asyncio.run(_segunda_execucao())
+
+        assert [(i.destino, i.texto) for i in itens] == [
+            (-100, "1"),
+            ("@canal", "2"),
+            (-100, "3"),
+            (-300, "4"),
+        ]
+        assert all(i.outbox_id for i in itens)
+        assert itens[0].origem == -1001
+        assert itens[0].regra_id is None
+        assert itens[0].mensagens_ids is None
+        agendado = itens[3]
+        assert agendado.origem == "@origem"
+        assert agendado.prioridade == PRIORIDADE_REENVIO
+        assert agendado.regra_id == 42
+        assert agendado.tentativas == 2
+        assert agendado.encaminhar_de == "@origem"
+        assert agendado.mensagens_ids == [10, 11]
+        assert agendado.sem_autor is True
+
+    def test_confirmado_antes_do_flush_nao_e_gravado(self):
+        async def _run():
+            outbox = Outbox(":memory:")
+            item = _item(-100, "rápido")
+            outbox.adicionar(1, item)
+            outbox.confirmar(item)
+            await outbox.flush()
+            return _contar(outbox)
+
+        assert asyncio.run(_run()) == 0
+
+    def test_itens_da_propria_execucao_nao_sao_reivindicados(self):
+        async def _run():
+            outbox = Outbox(":memory:")
+            outbox.adicionar(1, _item(-100, "x"))
+            await outbox.flush()
+            return await outbox.reivindicar(1), _contar(outbox)
+
+        assert asyncio.run(_run()) == ([], 1)
+
+    def test_loop_grava_quando_o_lote_enche(self):
+        async def _run():
+            outbox = Outbox(":memory:", lote=2, flush_ms=60_000)
+            tarefa = asyncio.create_task(outbox.executar())
+            await asyncio.sleep(0)
+            outbox.adicionar(1, _item(-100, "a"))
+            outbox.adicionar(1, _item(-100, "b"))
+            for _ in range(100):
+                if _contar(outbox) == 2:
+                    break
+                await asyncio.sleep(0.01)
+            tarefa.cancel()
+            return _contar(outbox)
+
+        assert asyncio.run(_run()) == 2
+
+
+class TestMediaCompacta:
+    def test_media_vira_input_media(self):
+        foto = Photo(
+            id=1,
+            access_hash=2,
+            file_reference=b"ref",
+            date=None,
+            sizes=[],
+            dc_id=2,
+        )
+        dados = serializar_media(MessageMediaPhoto(photo=foto))
+        restaurada = restaurar_media(dados)
+        assert isinstance(restaurada, InputMediaPhoto)
+        assert restaurada.id == InputPhoto(1, 2, b"ref")
+
+    def test_album_vira_lista(self):
+        fotos = [
+            MessageMediaPhoto(
+                photo=Photo(
+                    id=i,
+                    access_hash=2,
+                    file_reference=b"",
+                    date=None,
+                    sizes=[],
+                    dc_id=2,
+                )
+            )
+            for i in (1, 2, 3)
+        ]
+        restaurada = restaurar_media(serializar_media(fotos))
+        assert [m.id.id for m in restaurada] == [1, 2, 3]
+
+    def test_sem_media(self):
+        assert serializar_media(None) is None
+        assert restaurar_media(None) is None
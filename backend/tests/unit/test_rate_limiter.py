@@ -0,0 +1,98 @@
+"""Testes unitários para o rate limiter de envios (token bucket)."""
+
+import asyncio
+
+from app.workers.rate_limiter import RateLimiter, TokenBucket
+
+
+class _Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self) -> float:
+        return self.agora
+
+
+class TestTokenBucket:
+    def test_rajada_e_reposicao(self):
+        relogio = _Relogio()
+        balde = TokenBucket(taxa=1, capacidade=2, relogio=relogio)
+        balde.consumir()
+        balde.consumir()
+        assert balde.espera() == 1.0
+        relogio.agora = 0.5
+        assert balde.espera() == 0.5
+        relogio.agora = 10
+        # Não acumula além da capacidade
+        assert balde.espera() == 0
+        assert balde.fichas == 2
+
+
+class TestRateLimiter:
+    def _limitador(self, relogio, **kwargs):
+        params = {
+            "por_minuto_destino": 60,
+            "rajada_destino": 1,
+            "por_minuto_global": 600,
+            "rajada_global": 10,
+            "relogio": relogio,
+        }
+        params.update(kwargs)
+        return RateLimiter(**params)
+
+    def test_destinos_independentes(self):
+        relogio = _Relogio()
+        limitador = self._limitador(relogio)
+        assert limitador.tentar("a") == 0
+        # "a" esgotou a rajada; "b" ainda pode enviar
+        assert limitador.tentar("a") == 1.0
+        assert limitador.tentar("b") == 0
+
+    def test_bucket_global_limita_todos(self):
+        relogio = _Relogio()
+        limitador = self._limitador(relogio, por_minuto_global=60, rajada_global=2)
+        assert limitador.tentar("a") == 0
+        assert limitador.tentar("b") == 0
+        assert limitador.tentar("c") == 1.0
+
+    def test_espera_nao_consome(self):
+        relogio = _Relogio()
+        limitador = self._limitador(relogio)
+        limitador.tentar("a")
+        assert limitador.tentar("a") > 0
+        relogio.agora = 1
+        assert limitador.tentar("a") == 0
+
+    def test_adquirir_aguarda_ficha(self):
+        limitador = RateLimiter(
+            por_minuto_destino=600,
+            rajada_destino=1,
+            por_minuto_global=6000,
+            rajada_global=10,
+        )
+
+        async def _run():
+            await limitador.adquirir("a")
+            inicio = asyncio.get_running_loop().time()
+            await limitador.adquirir("a")
+            return asyncio.get_running_loop().time() - inicio
+
+        # 600/min = 1 ficha a cada 0,1 s
+        assert asyncio.run(_run()) >= 0.09
+
+    def test_descarta_baldes_ociosos(self):
+        relogio = _Relogio()
+        limitador = self._limitador(relogio, max_destinos=2)
+        for destino in ("a", "b", "c"):
+            limitador.tentar(destino)
+        relogio.agora = 5
+        limitador.tentar("d")
+        assert len(limitador._destinos) <= 2
+
+    def test_pausar_conta(self):
+        relogio = _Relogio()
+        limitador = self._limitador(relogio)
+        limitador.pausar_conta(30)
+        assert limitador.tentar("a") == 30
+        relogio.agora = 30
+        assert limitador.tentar("a") == 0
@@ -0,0 +1,43 @@
+"""Testes unitários para o sandbox de regex (timeout em processo separado)."""
+
+import asyncio
+
+import pytest
+
+from app.services.rule_engine import RulePlan
+from app.workers.regex_sandbox import RegexSandbox, RegexTimeoutError
+
+
+class TestRegexSandbox:
+    def test_executa_plano_no_processo(self):
+        plano = RulePlan(
+            id=1, nome="R", origens=[1], destino=2, filtro="amzn", substituto="amazon"
+        )
+        sandbox = RegexSandbox(workers=1, timeout_ms=5000)
+
+        async def _run():
+            try:
+                return await sandbox.executar(plano.aplicar, "AMZN", "amzn", set())
+            finally:
+                sandbox.fechar()
+
+        assert asyncio.run(_run()) == "amazon"
+
+    def test_timeout_encerra_e_recria_pool(self):
+        # Regex catastrófica (compilada sem passar pela validação)
+        plano = RulePlan(
+            id=1, nome="R", origens=[1], destino=2, somente_se_tiver=r"(a+)+$"
+        )
+        texto = "a" * 40 + "b"
+        sandbox = RegexSandbox(workers=1, timeout_ms=300)
+
+        async def _run():
+            try:
+                with pytest.raises(RegexTimeoutError):
+                    await sandbox.executar(plano.aplicar, texto, texto, set())
+                # Pool novo continua atendendo
+                return await sandbox.executar(plano.aplicar, "aaa", "aaa", set())
+            finally:
+                sandbox.fechar()
+
+        assert asyncio.run(_run()) == "aaa"
@@ -0,0 +1,157 @@
+"""Testes unitários para ReplayService (dry-run de regras)."""
+
+import json
+
+import pytest
+
+from app.models.bot import Bot
+from app.models.log import LogExecucao
+from app.models.rule import Regra
+from app.schemas.rule import ReplayMensagem
+from app.services.replay_service import ReplayService
+
+
+class TestReplayService:
+    @pytest.fixture
+    def bot(self, db, test_user) -> Bot:
+        bot = Bot(nome="Bot", api_id="1", api_hash="h", owner_id=test_user.id)
+        db.add(bot)
+        db.commit()
+        db.refresh(bot)
+        return bot
+
+    def _regra(self, db, bot, **kwargs) -> Regra:
+        dados = {"nome": "Regra", "origem": "-1001", "destino": "-2001"}
+        regra = Regra(bot_id=bot.id, **{**dados, **kwargs})
+        db.add(regra)
+        db.commit()
+        db.refresh(regra)
+        return regra
+
+    def test_resultado_por_regra(self, db, bot):
+        self._regra(db, bot, nome="Bloqueia", bloqueios="spam")
+        self._regra(db, bot, nome="Troca", substituto="CUPOM10->MEU10")
+        regras = ReplayService.compilar(ReplayService.carregar_regras(db, bot.id))
+
+        resposta = ReplayService.executar(
+            regras,
+            [
+                ReplayMensagem(texto="Use CUPOM10", origem="-1001"),
+                ReplayMensagem(texto="isso é SPAM"),
+            ],
+        )
+
+        primeira, segunda = resposta.resultados
+        assert [r.resultado for r in primeira.regras] == ["encaminhada", "reescrita"]
+        assert primeira.regras[1].texto_final == "Use MEU10"
+        assert segunda.regras[0].resultado == "descartada"
+        assert segunda.regras[0].motivo == "bloqueio"
+        assert resposta.resumo.reescritas == 1
+        assert resposta.resumo.descartadas == {"bloqueio": 1}
+
+    def test_origem_sem_regras_nao_avalia(self, db, bot):
+        self._regra(db, bot)
+        regras = ReplayService.compilar(ReplayService.carregar_regras(db, bot.id))
+        resposta = ReplayService.executar(
+            regras, [ReplayMensagem(texto="oi", origem="-999")]
+        )
+        assert resposta.resultados[0].regras == []
+
+    def test_inativas_e_filtro_por_id(self, db, bot):
+        ativa = self._regra(db, bot, nome="Ativa")
+        self._regra(db, bot, nome="Inativa", ativo=False)
+        assert [r.nome for r in ReplayService.carregar_regras(db, bot.id)] == ["Ativa"]
+        todas = ReplayService.carregar_regras(db, bot.id, incluir_inativas=True)
+        assert len(todas) == 2
+        assert ReplayService.carregar_regras(db, bot.id, [ativa.id + 1]) == []
+
+    def test_limite_de_mensagens(self, db, bot, monkeypatch):
+        monkeypatch.setattr("app.core.config.settings.REPLAY_MAX_MENSAGENS", 2)
+        regras = ReplayService.compilar([])
+        with pytest.raises(ValueError, match="Máximo"):
+            ReplayService.executar(regras, [ReplayMensagem(texto="x")] * 3)
+
+    def test_regex_avaliada_pelo_callback(self, db, bot):
+        self._regra(db, bot, nome="Regex", somente_se_tiver=r"R\$\s*\d+")
+        self._regra(db, bot, nome="Simples", bloqueios="spam")
+        regras = ReplayService.compilar(ReplayService.carregar_regras(db, bot.id))
+        chamadas = []
+
+        def avaliar_regex(plano, texto, normalizado, encontradas):
+            chamadas.append(plano.nome)
+            return "regex_timeout", None
+
+        resposta = ReplayService.executar(
+            regras, [ReplayMensagem(texto="R$ 10")] * 3, avaliar_regex
+        )
+        # Estourou uma vez: a regra fica suspensa no resto do replay
+        assert chamadas == ["Regex"]
+        for resultado in resposta.resultados:
+            assert [r.motivo for r in resultado.regras] == ["regex_timeout", None]
+        assert resposta.resumo.descartadas == {"regex_timeout": 3}
+
+    def test_orcamento_de_tempo_do_replay(self, db, bot, monkeypatch):
+        monkeypatch.setattr("app.core.config.settings.REPLAY_TEMPO_MAX_SEGUNDOS", 0)
+        self._regra(db, bot, nome="Regex", somente_se_tiver=r"R\$\s*\d+")
+        self._regra(db, bot, nome="Simples", bloqueios="spam")
+        regras = ReplayService.compilar(ReplayService.carregar_regras(db, bot.id))
+
+        resposta = ReplayService.executar(regras, [ReplayMensagem(texto="spam")])
+        assert [r.motivo for r in resposta.resultados[0].regras] == [
+            "tempo_esgotado",
+            "bloqueio",
+        ]
+
+    def test_fonte_logs_rejeita_origem_por_username(self, db, bot):
+        self._regra(db, bot, nome="Numérica")
+        regras = ReplayService.compilar(ReplayService.carregar_regras(db, bot.id))
+        ReplayService.verificar_fonte_logs(regras)
+
+        self._regra(db, bot, nome="Canal", origem="@ofertas")
+        regras = ReplayService.compilar(ReplayService.carregar_regras(db, bot.id))
+        with pytest.raises(ValueError, match="Canal"):
+            ReplayService.verificar_fonte_logs(regras)
+
+    def test_mensagens_dos_logs(self, db, bot):
+        for status, mensagem in [("sucesso", "oferta"), ("erro", "FloodWait")]:
+            db.add(
+                LogExecucao(
+                    bot_id=bot.id,
+                    bot_nome="Bot",
+                    origem="-1001",
+                    destino="-2001",
+                    status=status,
+                    mensagem=mensagem,
+                )
+            )
+        db.commit()
+        mensagens = ReplayService.mensagens_dos_logs(db, bot.id, 10)
+        assert [(m.texto, m.origem) for m in mensagens] == [("oferta", "-1001")]
+
+
+class TestReplayArquivo:
+    def test_texto_uma_por_linha(self):
+        mensagens = ReplayService.ler_arquivo("msgs.txt", b"a\n\nb\n")
+        assert [m.texto for m in mensagens] == ["a", "b"]
+
+    def test_jsonl(self):
+        conteudo = b'{"texto": "a", "origem": -1001}\n"b"\n'
+        mensagens = ReplayService.ler_arquivo("msgs.jsonl", conteudo)
+        assert [(m.texto, m.origem) for m in mensagens] == [("a", "-1001"), ("b", None)]
+
+    def test_export_telegram_desktop(self):
+        export = {
+            "messages": [
+                {"id": 1, "text": "Oferta simples"},
+                {"id": 2, "text": ["Compre ", {"type": "link", "text": "aqui"}]},
+                {"id": 3, "type": "service", "text": ""},
+            ]
+        }
+        mensagens = ReplayService.ler_arquivo(
+            "result.json", json.dumps(export).encode()
+        )
+        assert [m.texto for m in mensagens] == ["Oferta simples", "Compre aqui"]
+
+    def test_json_invalido(self):
+        with pytest.raises(ValueError, match="JSON inválido"):
+            ReplayService.ler_arquivo("x.json", b"{")
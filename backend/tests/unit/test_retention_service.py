@@ -0,0 +1,105 @@
+"""Testes unitários para a retenção dos logs de execução."""
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.orm import Session
+
+from app.core.security import hash_password
+from app.db.base import Base
+from app.models.bot import Bot
+from app.models.log import LogExecucao
+from app.models.user import User
+from app.services.log_service import LogService
+from app.services.retention_service import RetentionService
+
+AGORA = datetime(2026, 10, 18, 12, 0)
+
+
+def _bot(db, plano: str) -> int:
+    user = User(
+        email=f"{plano}@example.com",
+        hashed_password=hash_password("senha1234"),
+        plan=plano,
+    )
+    db.add(user)
+    db.flush()
+    bot = Bot(nome=plano, api_id="1", api_hash="h", owner_id=user.id)
+    db.add(bot)
+    db.commit()
+    return bot.id
+
+
+def _logs(db, bot_id: int, idades_dias: list[int]) -> None:
+    LogService.create_many(
+        db,
+        [
+            {
+                "bot_id": bot_id,
+                "bot_nome": "Bot",
+                "origem": "-1001",
+                "destino": "-1002",
+                "status": "sucesso",
+                "mensagem": "x" * 500,
+                "data_hora": AGORA - timedelta(days=dias),
+            }
+            for dias in idades_dias
+        ],
+    )
+
+
+def _restantes(db, bot_id: int) -> int:
+    stmt = select(func.count()).where(LogExecucao.bot_id == bot_id)
+    return db.execute(stmt).scalar_one()
+
+
+class TestRetencao:
+    def test_dias_por_plano(self):
+        assert RetentionService.dias_por_plano("free:30, pro:0") == {
+            "free": 30,
+            "pro": 0,
+        }
+        with pytest.raises(ValueError, match="inválida"):
+            RetentionService.dias_por_plano("free=30")
+        with pytest.raises(ValueError, match="negativa"):
+            RetentionService.dias_por_plano("free:-1")
+
+    def test_apaga_em_lotes_por_plano(self, db):
+        free, pro, vip = _bot(db, "free"), _bot(db, "pro"), _bot(db, "vip")
+        for bot_id in (free, pro, vip):
+            _logs(db, bot_id, [1, 10, 31, 40, 50, 100, 400])
+
+        with patch.multiple(
+            "app.services.retention_service.settings",
+            LOG_RETENCAO_DIAS="free:30,pro:0",
+            LOG_RETENCAO_PADRAO_DIAS=60,
+        ):
+            relatorio = RetentionService.executar(db, lote=2, pausa=0, agora=AGORA)
+
+        assert relatorio == {"linhas": 5 + 2, "bytes": 0}
+        assert (_restantes(db, free), _restantes(db, pro), _restantes(db, vip)) == (
+            2,
+            7,
+            5,
+        )
+
+    def test_incremental_vacuum_devolve_espaco(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'logs.db'}")
+
+        @event.listens_for(engine, "connect")
+        def _incremental(dbapi_connection, _record):
+            dbapi_connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+        Base.metadata.create_all(engine)
+        with Session(engine) as db:
+            bot_id = _bot(db, "free")
+            _logs(db, bot_id, [40] * 2000)
+            relatorio = RetentionService.executar(
+                db, lote=500, pausa=0, vacuum_paginas=100000, agora=AGORA
+            )
+        engine.dispose()
+
+        assert relatorio["linhas"] == 2000
+        assert relatorio["bytes"] > 1_000_000
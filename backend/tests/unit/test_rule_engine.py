@@ -0,0 +1,191 @@
+"""Testes unitários para o motor de regras (RulePlan)."""
+
+import pickle
+
+import pytest
+
+from app.services.rule_engine import (
+    KeywordAutomaton,
+    RulePlan,
+    RuleSet,
+    validar_padroes_regra,
+    validar_regex,
+)
+
+
+def _plano(**kwargs) -> RulePlan:
+    return RulePlan(id=1, nome="Regra", origens=[100], destino=200, **kwargs)
+
+
+class TestRulePlanFiltros:
+    """Bloqueios, obrigatórias e filtro pré-compilados."""
+
+    def test_destinos_lista_ou_unico(self):
+        plano = RulePlan(id=1, nome="R", origens=[100], destino=[200, "@canal"])
+        assert (plano.destinos, plano.destino) == ([200, "@canal"], 200)
+        plano = _plano()
+        assert (plano.destinos, plano.destino) == ([200], 200)
+
+    def test_sem_filtros_encaminha_texto_original(self):
+        assert _plano().aplicar("Oferta do dia") == "Oferta do dia"
+
+    def test_bloqueio_case_insensitive(self):
+        plano = _plano(bloqueios="spam, Golpe ")
+        assert plano.aplicar("Isso é um GOLPE") is None
+        assert plano.aplicar("Oferta legítima") == "Oferta legítima"
+
+    def test_bloqueios_pre_separados_e_casefolded(self):
+        plano = _plano(bloqueios="Spam, , GOLPE")
+        assert plano.bloqueios == {"spam", "golpe"}
+
+    def test_somente_se_tiver_substring_ou_regex(self):
+        plano = _plano(somente_se_tiver=r"cupom, R\$\s*\d+")
+        assert plano.aplicar("Use o CUPOM agora") is not None
+        assert plano.aplicar("Por apenas R$ 19") is not None
+        assert plano.aplicar("Nada relevante") is None
+
+    def test_somente_se_tiver_regex_invalida_usa_substring(self):
+        plano = _plano(somente_se_tiver="promo(")
+        assert plano.obrigatorias_regex == ()
+        assert plano.aplicar("super PROMO( hoje") is not None
+        assert plano.aplicar("promo hoje") is None
+
+    def test_filtro_substring(self):
+        plano = _plano(filtro="Shopee")
+        assert plano.aplicar("link da shopee") == "link da shopee"
+        assert plano.aplicar("link da amazon") is None
+
+    def test_motivo_descarte(self):
+        plano = _plano(bloqueios="spam", somente_se_tiver="cupom", filtro="loja")
+        assert plano.motivo_descarte("spam", "spam") == "bloqueio"
+        assert plano.motivo_descarte("oi", "oi") == "sem_palavra_obrigatoria"
+        assert plano.motivo_descarte("cupom", "cupom") == "filtro"
+        assert plano.motivo_descarte("cupom loja", "cupom loja") is None
+
+
+class TestRulePlanSubstituicao:
+    """Passo de substituição preparado na compilação."""
+
+    def test_filtro_com_substituto_usa_regex(self):
+        plano = _plano(filtro="amzn", substituto="amazon")
+        assert plano.aplicar("Compre na AMZN") == "Compre na amazon"
+
+    def test_so_filtro_com_metacaracteres_vai_ao_sandbox(self):
+        assert not _plano(filtro="amzn", substituto="amazon").usa_regex
+        assert _plano(filtro=r"amzn\.to/\w+", substituto="link").usa_regex
+
+    def test_pares_de_substituicao(self):
+        plano = _plano(substituto="@canal_a->@canal_b | CUPOM10->CUPOM20")
+        assert plano.aplicar("Siga @canal_a e use CUPOM10") == (
+            "Siga @canal_b e use CUPOM20"
+        )
+
+    def test_pares_em_passada_unica_nao_encadeiam(self):
+        plano = _plano(substituto="a->b|b->c")
+        assert plano.aplicar("ab") == "bc"
+
+    def test_pares_leftmost_longest(self):
+        plano = _plano(substituto="CUPOM->X|CUPOM10->Y|10->Z")
+        assert plano.aplicar("CUPOM10 CUPOM 10") == "Y X Z"
+
+    def test_par_repetido_vale_o_primeiro(self):
+        plano = _plano(substituto="a->1|a->2|b->3")
+        assert plano.aplicar("ab") == "13"
+
+    def test_pares_com_metacaracteres(self):
+        plano = _plano(substituto="R$ 10->R$ 9|(vip)->[vip]")
+        assert plano.aplicar("R$ 10 (vip)") == "R$ 9 [vip]"
+
+    def test_pares_malformados_sao_ignorados(self):
+        plano = _plano(substituto="sem seta|a->b->c")
+        assert plano.aplicar("texto a") == "texto a"
+
+
+class TestKeywordAutomaton:
+    """Aho-Corasick: todas as ocorrências em uma passada."""
+
+    def test_encontra_palavras_sobrepostas(self):
+        automato = KeywordAutomaton(["he", "she", "his", "hers"])
+        assert automato.buscar("ushers") == {"he", "she", "hers"}
+
+    def test_sufixo_via_link_de_falha(self):
+        automato = KeywordAutomaton(["abcd", "bc"])
+        assert automato.buscar("xabcx") == {"bc"}
+
+    def test_unicode_e_vazio(self):
+        automato = KeywordAutomaton(["promoção", ""])
+        assert automato.buscar("super promoção!") == {"promoção"}
+        assert automato.buscar("") == set()
+        assert not KeywordAutomaton([])
+
+    def test_equivale_a_busca_por_substring(self):
+        palavras = ["ab", "bab", "b", "abba", "ca"]
+        automato = KeywordAutomaton(palavras)
+        for texto in ["abbabca", "cab", "xyz", "babab"]:
+            assert automato.buscar(texto) == {p for p in palavras if p in texto}
+
+
+class TestRuleSet:
+    """Decisão por regra a partir do conjunto de palavras encontradas."""
+
+    def test_automato_reune_palavras_de_todas_as_regras(self):
+        a = _plano(bloqueios="spam")
+        b = RulePlan(id=2, nome="B", origens=[1], destino=2, somente_se_tiver="cupom")
+        regras = RuleSet([a, b])
+        assert regras.automato.palavras == {"spam", "cupom"}
+
+    def test_regras_decidem_pelo_hit_set(self):
+        a = _plano(bloqueios="spam")
+        b = RulePlan(id=2, nome="B", origens=[1], destino=2, somente_se_tiver="cupom")
+        regras = RuleSet([a, b])
+
+        texto = "Cupom novo (sem spam)"
+        encontradas = regras.buscar_palavras(texto.casefold())
+
+        assert a.aplicar(texto, texto.casefold(), encontradas) is None
+        assert b.aplicar(texto, texto.casefold(), encontradas) == texto
+
+    def test_obrigatoria_regex_fora_do_automato_ainda_vale(self):
+        plano = _plano(somente_se_tiver=r"R\$\s*\d+")
+        regras = RuleSet([plano])
+        texto = "Por R$ 10"
+        encontradas = regras.buscar_palavras(texto.casefold())
+        assert plano.aplicar(texto, texto.casefold(), encontradas) == texto
+
+
+class TestValidacaoRegex:
+    """Rejeição de padrões perigosos antes de salvar."""
+
+    @pytest.mark.parametrize(
+        "padrao", [r"(a+)+$", r"(\w+\s?)*x", r"(.*)*", r"((ab)*c)+", r"(a|b+)*"]
+    )
+    def test_quantificador_aninhado_rejeitado(self, padrao):
+        with pytest.raises(ValueError, match="aninhados"):
+            validar_regex(padrao, 300)
+
+    @pytest.mark.parametrize(
+        "padrao", [r"R\$\s*\d+", r"https?://\S+", r"(promo|oferta)s?", r"a{2,5}b+"]
+    )
+    def test_padroes_comuns_aceitos(self, padrao):
+        validar_regex(padrao, 300)
+
+    def test_tamanho_maximo(self):
+        with pytest.raises(ValueError, match="muito longa"):
+            validar_regex("a" * 301, 300)
+
+    def test_regex_invalida_e_aceita_como_literal(self):
+        validar_regex("promo(", 300)
+
+    def test_campos_da_regra(self):
+        # filtro só vira regex quando há substituto
+        validar_padroes_regra("(a+)+", None, None, 300)
+        with pytest.raises(ValueError):
+            validar_padroes_regra("(a+)+", "x", None, 300)
+        with pytest.raises(ValueError):
+            validar_padroes_regra(None, None, "cupom, (x*)*", 300)
+
+    def test_plano_e_picklavel_para_o_sandbox(self):
+        plano = _plano(filtro="amzn", substituto="amazon", somente_se_tiver=r"\d+")
+        assert plano.usa_regex
+        copia = pickle.loads(pickle.dumps(plano))  # noqa: S301
+        assert copia.aplicar("AMZN 10") == "amazon 10"
@@ -0,0 +1,40 @@
+"""Testes unitários para RuleService."""
+
+import pytest
+
+from app.models.bot import Bot
+from app.schemas.rule import RuleCreate, RuleUpdate
+from app.services.rule_service import RuleService
+
+
+class TestRuleService:
+    @pytest.fixture
+    def bot(self, db, test_user) -> Bot:
+        bot = Bot(nome="Bot", api_id="1", api_hash="h", owner_id=test_user.id)
+        db.add(bot)
+        db.commit()
+        db.refresh(bot)
+        return bot
+
+    def _data(self, bot_id: int, **kwargs) -> RuleCreate:
+        return RuleCreate(
+            nome="Regra", origem="100", destino="200", bot_id=bot_id, **kwargs
+        )
+
+    def test_create(self, db, bot):
+        regra = RuleService.create(db, self._data(bot.id, somente_se_tiver=r"R\$\d+"))
+        assert regra.id is not None
+        assert regra.ativo is True
+
+    def test_create_rejeita_regex_perigosa(self, db, bot):
+        with pytest.raises(ValueError, match="aninhados"):
+            RuleService.create(db, self._data(bot.id, somente_se_tiver=r"(a+)+$"))
+        assert RuleService.get_all_by_bot(db, bot.id) == []
+
+    def test_update_valida_com_campos_existentes(self, db, bot):
+        regra = RuleService.create(db, self._data(bot.id, filtro=r"(x+)+"))
+        # filtro só é regex quando há substituto: a combinação é que é validada
+        with pytest.raises(ValueError):
+            RuleService.update(db, regra, RuleUpdate(substituto="y"))
+        db.refresh(regra)
+        assert regra.substituto is None
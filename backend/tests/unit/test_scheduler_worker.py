@@ -0,0 +1,70 @@
+"""Testes unitários para o SchedulerWorker (envio pela fila do BotWorker)."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.models.bot import Bot
+from app.models.schedule import Agendamento
+from app.workers.scheduler_worker import SchedulerWorker
+from tests.conftest import TestingSessionLocal
+
+
+class TestAgendamentoSequencial:
+    @pytest.fixture
+    def agendamento(self, db, test_user) -> Agendamento:
+        bot = Bot(nome="Bot", api_id="1", api_hash="h", owner_id=test_user.id)
+        db.add(bot)
+        db.commit()
+        agendamento = Agendamento(
+            nome="Diário",
+            origem="-1001",
+            destino="-2001",
+            msg_id_atual=10,
+            tipo_envio="sequencial",
+            horario="09:00",
+            bot_id=bot.id,
+        )
+        db.add(agendamento)
+        db.commit()
+        db.refresh(agendamento)
+        return agendamento
+
+    @pytest.fixture
+    def scheduler(self, agendamento):
+        bot = MagicMock(id=agendamento.bot_id, nome="Bot", api_id="1")
+        bot_worker = MagicMock()
+        bot_worker.enfileirar = AsyncMock(return_value=True)
+        with (
+            patch("app.workers.scheduler_worker.StringSession"),
+            patch("app.workers.scheduler_worker.TelegramClient"),
+            patch("app.workers.scheduler_worker.SessionLocal", TestingSessionLocal),
+        ):
+            scheduler = SchedulerWorker(bot, bot_worker=bot_worker)
+            scheduler.client.get_messages = AsyncMock(
+                return_value=MagicMock(text="post", media=None)
+            )
+            yield scheduler
+
+    def _enfileirar(self, db, scheduler, agendamento):
+        asyncio.run(scheduler._executar_agendamento(db, agendamento))
+        return scheduler._bot_worker.enfileirar.await_args.args[0]
+
+    def test_avanca_so_quando_o_envio_conclui(self, db, scheduler, agendamento):
+        item = self._enfileirar(db, scheduler, agendamento)
+        assert item.rotulo_log == "[Agendamento: Diário]"
+        db.refresh(agendamento)
+        assert agendamento.msg_id_atual == 10
+
+        item.ao_concluir(item, True)
+        db.refresh(agendamento)
+        assert agendamento.msg_id_atual == 11
+
+    def test_falha_mantem_o_post_para_o_proximo_horario(
+        self, db, scheduler, agendamento
+    ):
+        item = self._enfileirar(db, scheduler, agendamento)
+        item.ao_concluir(item, False)
+        db.refresh(agendamento)
+        assert agendamento.msg_id_atual == 10
@@ -0,0 +1,380 @@
+"""Testes unitários para a fila de envio particionada por destino."""
+
+import asyncio
+
+import pytest
+from telethon.tl.types import (
+    InputMediaPhoto,
+    MessageMediaPhoto,
+    MessageMediaWebPage,
+    Photo,
+    WebPageEmpty,
+)
+
+from app.workers.send_queue import (
+    PRIORIDADE_AGENDADO,
+    PRIORIDADE_REENVIO,
+    FilaEnvio,
+    ItemEnvio,
+    referencia_media,
+)
+
+
+def _item(destino, texto: str, **kwargs) -> ItemEnvio:
+    return ItemEnvio(destino, texto, None, "Regra", 1, **kwargs)
+
+
+def _foto(id_: int) -> MessageMediaPhoto:
+    return MessageMediaPhoto(
+        photo=Photo(
+            id=id_, access_hash=1, file_reference=b"ref", date=None, sizes=[], dc_id=2
+        )
+    )
+
+
+class TestItemEnvio:
+    def test_item_compacto_sem_dict(self):
+        item = _item("a", "1")
+        assert not hasattr(item, "__dict__")
+        with pytest.raises(AttributeError):
+            item.extra = 1
+
+    def test_referencia_media(self):
+        assert isinstance(referencia_media(_foto(1)), InputMediaPhoto)
+        assert [m.id.id for m in referencia_media([_foto(1), _foto(2)])] == [1, 2]
+        # Preview de link não tem referência: o Telegram o gera pelo texto
+        assert referencia_media(MessageMediaWebPage(webpage=WebPageEmpty(id=1))) is None
+        assert referencia_media(None) is None
+
+
+class TestFilaEnvio:
+    def test_destino_reservado_nao_e_entregue_a_outro_worker(self):
+        fila = FilaEnvio()
+
+        async def _run():
+            fila.put_nowait(_item("a", "1"))
+            fila.put_nowait(_item("a", "2"))
+            fila.put_nowait(_item("b", "x"))
+            primeiro = await fila.proximo()
+            segundo = await fila.proximo()
+            # "a" está reservado: só "b" fica pronto para o segundo worker
+            assert (primeiro, segundo) == ("a", "b")
+            assert fila.em_voo == 2
+            assert fila.prontos == 0
+
+            fila.concluir("a")
+            assert await fila.proximo() == "a"
+            assert fila.primeiro("a").texto == "2"
+
+        asyncio.run(_run())
+
+    def test_round_robin_entre_destinos(self):
+        fila = FilaEnvio()
+
+        async def _run():
+            for destino, texto in [("a", "1"), ("a", "2"), ("b", "x"), ("b", "y")]:
+                fila.put_nowait(_item(destino, texto))
+            ordem = []
+            while not fila.empty():
+                destino = await fila.proximo()
+                ordem.append(fila.primeiro(destino).texto)
+                fila.concluir(destino)
+            return ordem
+
+        assert asyncio.run(_run()) == ["1", "x", "2", "y"]
+
+    def test_concluir_sem_remover_mantem_item_na_cabeca(self):
+        fila = FilaEnvio()
+
+        async def _run():
+            fila.put_nowait(_item("a", "1"))
+            fila.put_nowait(_item("a", "2"))
+            destino = await fila.proximo()
+            fila.concluir(destino, remover=False)
+            destino = await fila.proximo()
+            return fila.primeiro(destino).texto
+
+        assert asyncio.run(_run()) == "1"
+        assert fila.qsize() == 2
+
+    def test_destino_vazio_e_removido(self):
+        fila = FilaEnvio()
+
+        async def _run():
+            fila.put_nowait(_item("a", "1"))
+            fila.concluir(await fila.proximo())
+
+        asyncio.run(_run())
+        assert fila.empty()
+        assert fila.profundidade("a") == 0
+        assert fila._por_destino == {}
+
+    def test_destino_estacionado_volta_apos_o_prazo(self):
+        fila = FilaEnvio()
+
+        async def _run():
+            fila.put_nowait(_item("a", "1"))
+            destino = await fila.proximo()
+            fila.estacionar(destino, 0.05)
+            # Novos itens não reativam o destino antes do prazo
+            fila.put_nowait(_item("a", "2"))
+            assert fila.prontos == 0
+            assert fila.estacionados == 1
+            destino = await asyncio.wait_for(fila.proximo(), 1)
+            return fila.primeiro(destino).texto
+
+        assert asyncio.run(_run()) == "1"
+        assert fila.estacionados == 0
+
+
+class TestFilaLimitada:
+    def _fila(self, politica: str, capacidade: int = 2, **kwargs):
+        descartes = []
+        fila = FilaEnvio(
+            capacidade=capacidade,
+            politica=politica,
+            ao_descartar=lambda item, motivo: descartes.append((item.texto, motivo)),
+            **kwargs,
+        )
+        return fila, descartes
+
+    def test_politica_invalida(self):
+        with pytest.raises(ValueError, match="Política"):
+            FilaEnvio(politica="aleatoria")
+
+    def test_drop_oldest_descarta_o_mais_antigo(self):
+        fila, descartes = self._fila("drop-oldest")
+
+        async def _run():
+            fila.put_nowait(_item("a", "1"))
+            fila.put_nowait(_item("b", "2"))
+            assert fila.put_nowait(_item("c", "3"))
+            # "a" ficou vazio mas continua na fila de prontos: é ignorado
+            destino = await fila.proximo()
+            return fila.primeiro(destino).texto
+
+        assert asyncio.run(_run()) == "2"
+        assert descartes == [("1", "drop-oldest")]
+        assert fila.qsize() == 2
+
+    def test_drop_oldest_preserva_item_em_envio(self):
+        fila, descartes = self._fila("drop-oldest")
+
+        async def _run():
+            fila.put_nowait(_item("a", "1"))
+            fila.put_nowait(_item("a", "2"))
+            await fila.proximo()
+            fila.put_nowait(_item("b", "3"))
+
+        asyncio.run(_run())
+        assert descartes == [("2", "drop-oldest")]
+        assert fila.primeiro("a").texto == "1"
+
+    def test_drop_newest_rejeita_o_item_novo(self):
+        fila, descartes = self._fila("drop-newest")
+        itens = [_item("a", "1"), _item("a", "2"), _item("a", "3")]
+
+        async def _run():
+            return [fila.put_nowait(item) for item in itens]
+
+        assert asyncio.run(_run()) == [True, True, False]
+        assert descartes == [("3", "drop-newest")]
+        assert fila.profundidade("a") == 2
+
+    def test_coalesce_substitui_ultimo_pendente_do_destino(self):
+        fila, descartes = self._fila("coalesce")
+
+        async def _run():
+            fila.put_nowait(_item("a", "1"))
+            fila.put_nowait(_item("b", "x"))
+            fila.put_nowait(_item("b", "y"))
+            # Sem pendente em "c": cai em drop-oldest
+            fila.put_nowait(_item("c", "z"))
+
+        asyncio.run(_run())
+        assert descartes == [("x", "coalesce"), ("1", "drop-oldest")]
+        assert fila.primeiro("b").texto == "y"
+        assert fila.qsize() == 2
+
+    def test_block_espera_espaco(self):
+        fila, descartes = self._fila("block", capacidade=1, bloqueio_max=1)
+
+        async def _run():
+            await fila.put(_item("a", "1"))
+            tarefa = asyncio.create_task(fila.put(_item("a", "2")))
+            await asyncio.sleep(0.01)
+            assert not tarefa.done()
+            fila.concluir(await fila.proximo())
+            return await asyncio.wait_for(tarefa, 1)
+
+        assert asyncio.run(_run()) is True
+        assert descartes == []
+        assert fila.primeiro("a").texto == "2"
+
+    def test_block_descarta_apos_o_prazo(self):
+        fila, descartes = self._fila("block", capacidade=1, bloqueio_max=0.02)
+
+        async def _run():
+            await fila.put(_item("a", "1"))
+            return await fila.put(_item("a", "2"))
+
+        assert asyncio.run(_run()) is False
+        assert descartes == [("2", "block")]
+
+    def test_forcar_ignora_capacidade(self):
+        fila, descartes = self._fila("drop-newest", capacidade=1)
+
+        async def _run():
+            fila.put_nowait(_item("a", "1"))
+            fila.put_nowait(_item("a", "2"), forcar=True)
+
+        asyncio.run(_run())
+        assert fila.qsize() == 2
+        assert descartes == []
+
+    def test_idade_mais_antigo(self):
+        fila = FilaEnvio()
+        assert fila.idade_mais_antigo() == 0.0
+
+        async def _run():
+            item = _item("a", "1")
+            item.criado -= 5
+            fila.put_nowait(item)
+            fila.put_nowait(_item("b", "2"))
+
+        asyncio.run(_run())
+        assert 5 <= fila.idade_mais_antigo() < 6
+
+        async def _enviar_a():
+            destino = await fila.proximo()
+            assert destino == "a"
+            fila.primeiro(destino)
+            fila.concluir(destino)
+
+        # O mais antigo saiu: a idade passa a ser a do próximo
+        asyncio.run(_enviar_a())
+        assert fila.idade_mais_antigo() < 1
+
+    def test_idade_nao_acumula_itens_que_sairam(self):
+        fila = FilaEnvio(capacidade=1, politica="coalesce")
+
+        async def _run():
+            fila.put_nowait(_item("a", "0"))
+            for i in range(500):
+                fila.put_nowait(_item("a", str(i)))
+
+        asyncio.run(_run())
+        assert fila.qsize() == 1
+        assert len(fila._idades) <= 2 * fila.qsize() + 64
+        assert fila.idade_mais_antigo() < 1
+
+
+class TestPrioridades:
+    @staticmethod
+    async def _ordem(fila, n: int) -> list[str]:
+        ordem = []
+        for _ in range(n):
+            destino = await fila.proximo()
+            ordem.append(fila.primeiro(destino).texto)
+            fila.concluir(destino)
+        return ordem
+
+    def test_pesos_invalidos(self):
+        with pytest.raises(ValueError, match="Pesos"):
+            FilaEnvio(pesos=(1, 0, 1))
+
+    def test_agendado_passa_a_frente_no_destino(self):
+        fila = FilaEnvio()
+
+        async def _run():
+            fila.put_nowait(_item("a", "1"))
+            fila.put_nowait(_item("a", "2"))
+            fila.put_nowait(_item("a", "09:00", prioridade=PRIORIDADE_AGENDADO))
+            return await self._ordem(fila, 3)
+
+        assert asyncio.run(_run()) == ["09:00", "1", "2"]
+
+    def test_item_em_envio_nao_e_ultrapassado(self):
+        fila = FilaEnvio()
+
+        async def _run():
+            fila.put_nowait(_item("a", "1"))
+            destino = await fila.proximo()
+            fila.put_nowait(_item("a", "09:00", prioridade=PRIORIDADE_AGENDADO))
+            assert fila.primeiro(destino).texto == "1"
+
+        asyncio.run(_run())
+
+    def test_round_robin_ponderado_entre_classes(self):
+        fila = FilaEnvio(pesos=(2, 1, 1), envelhecimento=0)
+
+        async def _run():
+            for i in range(4):
+                fila.put_nowait(_item(f"e{i}", f"e{i}"))
+                fila.put_nowait(_item(f"g{i}", f"g{i}", prioridade=PRIORIDADE_AGENDADO))
+            return await self._ordem(fila, 6)
+
+        # Agendados recebem 2 de cada 3 vezes, mas encaminhados não param
+        assert asyncio.run(_run()) == ["g0", "e0", "g1", "g2", "e1", "g3"]
+
+    def test_envelhecimento_promove_classe_baixa(self):
+        fila = FilaEnvio(pesos=(100, 1, 1), envelhecimento=10)
+
+        async def _run():
+            antigo = _item("r", "reenvio", prioridade=PRIORIDADE_REENVIO)
+            antigo.criado -= 60
+            fila.put_nowait(antigo)
+            for i in range(3):
+                fila.put_nowait(_item(f"g{i}", f"g{i}", prioridade=PRIORIDADE_AGENDADO))
+            return await self._ordem(fila, 2)
+
+        assert "reenvio" in asyncio.run(_run())
+
+    def test_adiar_rebaixa_para_reenvio_mantendo_a_ordem(self):
+        fila = FilaEnvio()
+
+        async def _run():
+            fila.put_nowait(_item("a", "1"))
+            fila.put_nowait(_item("a", "2"))
+            destino = await fila.proximo()
+            fila.adiar(destino)
+            fila.concluir(destino, remover=False)
+            assert fila.primeiro("a").prioridade == PRIORIDADE_REENVIO
+            return await self._ordem(fila, 2)
+
+        assert asyncio.run(_run()) == ["1", "2"]
+
+    def test_drop_oldest_descarta_reenvios_primeiro(self):
+        descartes = []
+        fila = FilaEnvio(
+            capacidade=2,
+            ao_descartar=lambda item, motivo: descartes.append(item.texto),
+        )
+
+        async def _run():
+            fila.put_nowait(_item("a", "fresco"))
+            fila.put_nowait(_item("b", "reenvio", prioridade=PRIORIDADE_REENVIO))
+            fila.put_nowait(_item("c", "novo"))
+
+        asyncio.run(_run())
+        assert descartes == ["reenvio"]
+
+    def test_reenvio_nao_passa_fome_no_destino(self):
+        fila = FilaEnvio(envelhecimento=0.01)
+
+        async def _run():
+            for i in range(3):
+                fila.put_nowait(_item("a", f"e{i}"))
+            reenvio = _item("a", "reenvio", prioridade=PRIORIDADE_REENVIO)
+            reenvio.criado -= 1
+            fila.put_nowait(reenvio)
+            # Fluxo contínuo de encaminhamentos novos para o mesmo destino
+            for i in range(20):
+                fila.put_nowait(_item("a", f"n{i}"))
+                destino = await fila.proximo()
+                if fila.primeiro(destino).texto == "reenvio":
+                    return i
+                fila.concluir(destino)
+            return None
+
+        assert asyncio.run(_run()) is not None
@@ -136,7 +136,7 @@ export function RuleForm({ bots, onSubmit, isLoading }: RuleFormProps) {
                         name="destino"
                         render={({ field }) => (
                             <FormItem>
-                                <FormLabel>Destino (Username ou ID)</FormLabel>
+                                <FormLabel>Destinos (Username ou ID, separar por vírgula)</FormLabel>
                                 <FormControl>
                                     <Input placeholder="@meu_canal" {...field} />
                                 </FormControl>
@@ -1,5 +1,5 @@
 import api from "@/lib/api";
-import type { Rule } from "@/types";
+import type { ModoEnvio, Rule } from "@/types";
 
 export interface RuleCreate {
     nome: string;
@@ -11,6 +11,8 @@ export interface RuleCreate {
     bloqueios?: string;
     somente_se_tiver?: string;
     converter_shopee?: boolean;
+    janela_dedup?: number | null;
+    modo_envio?: ModoEnvio;
 }
 
 export interface RuleUpdate {
@@ -22,6 +24,8 @@ export interface RuleUpdate {
     bloqueios?: string | null;
     somente_se_tiver?: string | null;
     converter_shopee?: boolean;
+    janela_dedup?: number | null;
+    modo_envio?: ModoEnvio;
 }
 
 export const ruleService = {
@@ -33,6 +33,8 @@ export interface Bot {
     created_at?: string;
 }
 
+export type ModoEnvio = "envio" | "encaminhar" | "copiar";
+
 export interface Rule {
     id: number;
     nome: string;
@@ -43,6 +45,8 @@ export interface Rule {
     bloqueios: string | null;
     somente_se_tiver: string | null;
     converter_shopee: boolean;
+    janela_dedup: number | null;
+    modo_envio: ModoEnvio;
     ativo: boolean;
     bot_id: number;
 }